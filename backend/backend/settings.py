@@ -46,6 +46,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'main.authentication.SimpleJWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'main.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 CSRF_TRUSTED_ORIGINS = [
@@ -54,7 +58,7 @@ CSRF_TRUSTED_ORIGINS = [
 
 
 MIDDLEWARE = [
-    
+    'main.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -125,6 +129,22 @@ if tmpPostgres:
 else:
     raise ValueError("DATABASE_URL not found in environment variables.")
 
+# Pub/sub used to fan swap events out to SSE streams. LocalBackend serves a
+# single node; set main.utils.events.RedisBackend when running several.
+SWAP_EVENTS_BACKEND = os.getenv('SWAP_EVENTS_BACKEND', 'main.utils.events.LocalBackend')
+SWAP_EVENTS_REDIS_URL = os.getenv('SWAP_EVENTS_REDIS_URL')
+
+# Serve all-users and my-swap-requests from .values() rows rendered with
+# orjson instead of ModelSerializers; the output is byte-for-byte the same.
+FAST_LIST_RESPONSES = os.getenv('FAST_LIST_RESPONSES', '').lower() in ('1', 'true', 'yes')
+
+# Serve all-users from the precomputed DirectoryCard table. Cards are kept
+# current either way; run rebuild_directory_cards once before turning it on.
+DIRECTORY_CARDS = os.getenv('DIRECTORY_CARDS', '').lower() in ('1', 'true', 'yes')
+
+# Processes hashing passwords during a bulk user import; 0 means one per CPU.
+USER_IMPORT_HASH_WORKERS = int(os.getenv('USER_IMPORT_HASH_WORKERS', '0')) or None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -1,22 +1,63 @@
 from rest_framework.authentication import BaseAuthentication
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from django.db import DEFAULT_DB_ALIAS
 from .models import CustomUser
+from .utils.auth_state import AUTH_USER_FIELDS, auth_state
 from .utils.jwt_utils import decode_jwt
 
+# Model.from_db() expects values in concrete-field order.
+_AUTH_FIELD_NAMES = [f.attname for f in CustomUser._meta.concrete_fields if f.attname in AUTH_USER_FIELDS]
+
+
+class UserNotFound(APIException):
+    # Not AuthenticationFailed: DRF turns that into a 403 without a
+    # WWW-Authenticate scheme, and a token for a deleted account is a 401.
+    status_code = status.HTTP_401_UNAUTHORIZED
+    default_detail = "User not found"
+    default_code = "user_not_found"
+
+
 class SimpleJWTAuthentication(BaseAuthentication):
     def authenticate(self, request):
+        payload = self.get_payload(request)
+        if payload is None:
+            return None
+        user_id = payload["user_id"]
+        return (self.check_user(self.build_user(user_id, auth_state.get(user_id))), None)
+
+    async def aauthenticate(self, request):
+        """Async counterpart of ``authenticate`` for async views."""
+        payload = self.get_payload(request)
+        if payload is None:
+            return None
+        user_id = payload["user_id"]
+        return (self.check_user(self.build_user(user_id, await auth_state.aget(user_id))), None)
+
+    def get_payload(self, request):
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
             return None
 
         token = auth_header.split(" ")[1]
         payload = decode_jwt(token)
-        if not payload:
+        # Tokens from before refresh tokens existed carry no type; they include
+        # long-lived refresh tokens, so none of them is taken as an access token.
+        if not payload or payload.get("type") != "access":
             raise AuthenticationFailed("Invalid or expired token")
+        return payload
 
-        try:
-            user = CustomUser.objects.get(id=payload["user_id"])
-        except CustomUser.DoesNotExist:
-            raise AuthenticationFailed("User not found")
+    def check_user(self, user):
+        if not user.is_active:
+            raise AuthenticationFailed("User account is inactive.")
+        if user.is_banned:
+            raise AuthenticationFailed("User account is banned.")
+        return user
 
-        return (user, None)
+    def build_user(self, user_id, flags):
+        if flags is None:
+            raise UserNotFound()
+        # Remaining fields are deferred and load on first access.
+        is_active, is_banned, is_staff = flags
+        values = {'id': user_id, 'is_active': is_active, 'is_banned': is_banned, 'is_staff': is_staff}
+        return CustomUser.from_db(DEFAULT_DB_ALIAS, _AUTH_FIELD_NAMES, [values[name] for name in _AUTH_FIELD_NAMES])
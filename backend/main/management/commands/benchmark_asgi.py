@@ -0,0 +1,212 @@
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from main.models import CustomUser, PlatformMessage
+from main.utils.auth_state import bump_auth_state_version
+from main.utils.dataset import DatasetGenerator
+from main.utils.jwt_utils import generate_jwt
+from main.utils.skill_index import bump_skill_index_version
+
+from .benchmark_endpoints import percentile
+
+# name -> (method, sync path, async path); bodies are filled in per run.
+ENDPOINTS = {
+    'all-users': ('GET', '/api/all-users/', '/api/async/all-users/'),
+    'user-profile': ('POST', '/api/user-profile/', '/api/async/user-profile/'),
+    'my-swap-requests': ('GET', '/api/my-swap-requests/', '/api/async/my-swap-requests/'),
+    'admin-messages': ('GET', '/api/admin-messages/', '/api/async/admin-messages/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and compare throughput of the read endpoints at a fixed "
+        "concurrency: the DRF views behind the WSGI handler on a thread pool, against their async "
+        "versions behind the ASGI handler on one event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--skills', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=400, help="Requests per endpoint and mode.")
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help="WSGI worker threads, and in-flight requests on the ASGI event loop.")
+        parser.add_argument('--db-latency-ms', type=float, default=0.0,
+                            help="Extra latency added to every SQL query, to model a remote database.")
+        parser.add_argument('--output', default='benchmark-asgi-results.json')
+        parser.add_argument('--keepdb', action='store_true', help="Reuse the test database between runs.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        self.install_latency(options['db_latency_ms'] / 1000)
+        try:
+            if not CustomUser.objects.exists():
+                self.stdout.write(f"Seeding {options['users']} users...")
+                self.seed(options['users'], options['skills'])
+            results = self.run(options['requests'], options['concurrency'])
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark_asgi_latency')
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'users': options['users'],
+                'requests_per_endpoint': options['requests'],
+                'concurrency': options['concurrency'],
+                'db_latency_ms': options['db_latency_ms'],
+            },
+            'endpoints': results,
+        }
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+
+        self.print_table(results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def install_latency(self, seconds):
+        if not seconds:
+            return
+
+        def sleep_then_execute(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            if sleep_then_execute not in connection.execute_wrappers:
+                connection.execute_wrappers.insert(0, sleep_then_execute)
+
+        # Worker threads open their own connections.
+        connection_created.connect(install, weak=False, dispatch_uid='benchmark_asgi_latency')
+        install(None, connection)
+
+    def seed(self, n_users, n_skills):
+        first, _ = DatasetGenerator(
+            users=n_users, skills=n_skills, seed=self.random.random(), log=self.stdout.write,
+        ).generate()
+        CustomUser.objects.filter(id__in=range(first, first + 2)).update(is_active=True, is_banned=False, is_public=True)
+        # .update() sends no signal; have workers reload what these flags feed.
+        bump_auth_state_version()
+        bump_skill_index_version()
+        PlatformMessage.objects.bulk_create(
+            [PlatformMessage(title=f'Announcement {i}', body='Scheduled maintenance tonight.') for i in range(20)])
+
+    # -- driving the handlers -------------------------------------------
+
+    def run(self, n, concurrency):
+        user, other = CustomUser.objects.order_by('id')[:2]
+        token = generate_jwt(user)
+        bodies = {'user-profile': json.dumps({'user_id': other.id}).encode()}
+
+        results = {}
+        wsgi, asgi = WSGIHandler(), ASGIHandler()
+        for name, (method, sync_path, async_path) in ENDPOINTS.items():
+            body = bodies.get(name, b'')
+            results[name] = {
+                'wsgi': self.summarize(*self.run_wsgi(wsgi, method, sync_path, body, token, n, concurrency)),
+                'asgi': self.summarize(*asyncio.run(self.run_asgi(asgi, method, async_path, body, token, n, concurrency))),
+            }
+        return results
+
+    def run_wsgi(self, handler, method, path, body, token, n, concurrency):
+        def call(_):
+            environ = {
+                'REQUEST_METHOD': method, 'PATH_INFO': path, 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f'Bearer {token}',
+                'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+                'wsgi.input': io.BytesIO(body), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            status = []
+            start = time.perf_counter()
+            response = handler(environ, lambda s, headers, exc_info=None: status.append(int(s.split()[0])))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return time.perf_counter() - start, status[0]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(call, range(n)))
+        return samples, time.perf_counter() - start
+
+    async def run_asgi(self, handler, method, path, body, token, n, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+                'headers': [
+                    (b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode()),
+                    (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+                ],
+                'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+            }
+            messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+            disconnected = asyncio.Event()
+            status = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with semaphore:
+                start = time.perf_counter()
+                await handler(scope, receive, send)
+                elapsed = time.perf_counter() - start
+            disconnected.set()
+            return elapsed, status[0]
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(call() for _ in range(n)))
+        return samples, time.perf_counter() - start
+
+    def summarize(self, samples, wall_seconds):
+        timings = sorted(elapsed * 1000 for elapsed, _ in samples)
+        return {
+            'requests_per_second': round(len(samples) / wall_seconds, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'errors': sum(1 for _, status in samples if status != 200),
+        }
+
+    # -- output ----------------------------------------------------------
+
+    def print_table(self, results):
+        self.stdout.write(f"{'endpoint':<20}{'mode':<6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name, modes in results.items():
+            for mode, r in modes.items():
+                self.stdout.write(
+                    f"{name:<20}{mode:<6}{r['requests_per_second']:>9.1f}{r['p50_ms']:>9.2f}"
+                    f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['errors']:>8}"
+                )
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from main.authentication import SimpleJWTAuthentication
+from main.models import CustomUser
+from main.utils.auth_state import auth_state
+from main.utils.jwt_utils import generate_jwt
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare queries and latency of JWT authentication when every request reloads the auth state "
+        "and when it is served from the worker's copy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--user-id', type=int)
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.filter(is_active=True, is_banned=False)
+        if options['user_id']:
+            users = users.filter(id=options['user_id'])
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError("No active, unbanned user to authenticate as.")
+
+        request = RequestFactory().get('/api/all-users/', HTTP_AUTHORIZATION=f'Bearer {generate_jwt(user)}')
+        n = options['requests']
+
+        try:
+            for label, reload in (('reload', True), ('warm', False)):
+                auth_state.invalidate()
+                queries, elapsed = self.run(request, n, reload)
+                self.stdout.write(
+                    f"{label:>7}: {queries / n:.3f} auth queries/request, "
+                    f"{elapsed / n * 1e6:.1f} us/request over {n} requests"
+                )
+        finally:
+            auth_state.invalidate()
+
+    def run(self, request, n, reload):
+        auth = SimpleJWTAuthentication()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for _ in range(n):
+                if reload:
+                    auth_state.invalidate()
+                auth.authenticate(request)
+            elapsed = time.perf_counter() - start
+        return len(ctx.captured_queries), elapsed
@@ -0,0 +1,218 @@
+import json
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import get_resolver
+
+from main.models import CustomUser, Skill, SwapRequest
+from main.utils.auth_state import bump_auth_state_version
+from main.utils.dataset import DATASET_PASSWORD, DatasetGenerator
+from main.utils.jwt_utils import generate_jwt, generate_refresh_jwt
+from main.utils.skill_index import bump_skill_index_version
+
+# Routes that cannot be timed request/response style.
+UNBENCHMARKED = {'swap-events'}  # open-ended SSE stream
+
+# Rows per import-users request.
+IMPORT_ROWS = 5
+IMPORT_CSV_HEADER = 'full_name,email,password,location,is_public,offered_skills,wanted_skills\n'
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and drive every route in main/urls.py through the test client, "
+        "reporting latency percentiles, SQL query counts and response sizes per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--skills', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=50, help="Requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=3, help="Unmeasured requests per endpoint.")
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--keepdb', action='store_true', help="Reuse the test database between runs.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if not CustomUser.objects.exists():
+                self.stdout.write(f"Seeding {options['users']} users...")
+                self.seed(options['users'], options['skills'])
+            results = self.run_scenarios(options['requests'], options['warmup'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'users': options['users'],
+                'skills': options['skills'],
+                'requests_per_endpoint': options['requests'],
+            },
+            'endpoints': results,
+        }
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+
+        self.print_table(results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    # -- dataset ---------------------------------------------------------
+
+    def seed(self, n_users, n_skills):
+        first, _ = DatasetGenerator(
+            users=n_users, skills=n_skills, seed=self.random.random(), log=self.stdout.write,
+        ).generate()
+        # The first users drive the scenarios; keep them listable, and make
+        # the first one an admin.
+        CustomUser.objects.filter(id__in=range(first, first + 3)).update(is_active=True, is_banned=False, is_public=True)
+        CustomUser.objects.filter(id=first).update(is_staff=True)
+        # .update() sends no signal; have workers reload what these flags feed.
+        bump_auth_state_version()
+        bump_skill_index_version()
+
+    # -- scenarios -------------------------------------------------------
+
+    def scenarios(self, n):
+        users = list(CustomUser.objects.order_by('id').values_list('id', flat=True)[:3])
+        admin_id, user_id, other_id = users
+        skill_names = list(Skill.objects.values_list('name', flat=True)[:10])
+
+        # Fresh targets for endpoints that consume state on every call.
+        pending = SwapRequest.objects.bulk_create(
+            [SwapRequest(requester_id=other_id, receiver_id=user_id) for _ in range(n)])
+        accepted = SwapRequest.objects.bulk_create(
+            [SwapRequest(requester_id=user_id, receiver_id=other_id, status='accepted') for _ in range(n)])
+        pending_ids, accepted_ids = iter([s.id for s in pending]), iter([s.id for s in accepted])
+        stamp = int(time.time() * 1000)
+        refresh = generate_refresh_jwt(CustomUser.objects.get(id=user_id))
+
+        def import_csv(i):
+            rows = ''.join(f'Imported {j},import{stamp}-{i}-{j}@example.com,pw12345678,Pune,,'
+                           f'{skill_names[j]},{skill_names[j + 1]}\n' for j in range(IMPORT_ROWS))
+            return 'text/csv', IMPORT_CSV_HEADER + rows
+
+        return user_id, admin_id, [
+            # name, method, path, body factory(i), as admin; a body is a dict
+            # sent as JSON or a (content type, text) pair
+            ('register', 'post', lambda i: '/api/register/',
+             lambda i: {'full_name': 'New', 'email': f'new{stamp}-{i}@example.com', 'password': 'pw12345678'}, False),
+            ('login', 'post', lambda i: '/api/login/',
+             lambda i: {'email': f'user{user_id}@example.com', 'password': DATASET_PASSWORD}, False),
+            ('token-refresh', 'post', lambda i: '/api/token/refresh/', lambda i: {'refresh': refresh}, False),
+            ('update-skills', 'post', lambda i: '/api/update-skills/',
+             lambda i: {'add_offered': self.random.sample(skill_names, 3),
+                        'remove_wanted': self.random.sample(skill_names, 2)}, False),
+            ('create-swap-request', 'post', lambda i: '/api/create-swap-request/',
+             lambda i: {'receiver_id': other_id, 'offered_skills': skill_names[:2],
+                        'wanted_skills': skill_names[2:4]}, False),
+            ('update-swap-request-status', 'post',
+             lambda i: f'/api/update-swap-request-status/{next(pending_ids)}/',
+             lambda i: {'status': 'accepted'}, False),
+            ('feedback-rating', 'post', lambda i: '/api/feedback-rating/',
+             lambda i: {'swap_request': next(accepted_ids), 'rating': 5, 'comment': 'Great'}, False),
+            ('admin-post-message', 'get', lambda i: '/api/admin-post-message/', None, True),
+            ('ban-user', 'post', lambda i: '/api/ban-user/',
+             lambda i: {'user_id': other_id, 'is_banned': False}, True),
+            ('import-users', 'post', lambda i: '/api/import-users/', import_csv, True),
+            ('monitor-swap-requests', 'get', lambda i: '/api/monitor-swap-requests/', None, True),
+            ('user-profile', 'post', lambda i: '/api/user-profile/',
+             lambda i: {'user_id': other_id}, False),
+            ('user-feedback', 'get', lambda i: f'/api/users/{other_id}/feedback/', None, False),
+            ('all-users', 'get', lambda i: '/api/all-users/', None, False),
+            ('my-swap-requests', 'get', lambda i: '/api/my-swap-requests/', None, False),
+            ('admin-messages', 'get', lambda i: '/api/admin-messages/', None, False),
+            ('matches', 'get', lambda i: '/api/matches/', None, False),
+            ('skills-autocomplete', 'get', lambda i: '/api/skills/autocomplete/?q=py', None, False),
+            ('async-user-profile', 'post', lambda i: '/api/async/user-profile/',
+             lambda i: {'user_id': other_id}, False),
+            ('async-all-users', 'get', lambda i: '/api/async/all-users/', None, False),
+            ('async-my-swap-requests', 'get', lambda i: '/api/async/my-swap-requests/', None, False),
+            ('async-admin-messages', 'get', lambda i: '/api/async/admin-messages/', None, False),
+        ]
+
+    def run_scenarios(self, n, warmup):
+        user_id, admin_id, scenarios = self.scenarios(n + warmup)
+        self.warn_uncovered({name for name, *_ in scenarios})
+
+        clients = {
+            False: Client(HTTP_AUTHORIZATION=f'Bearer {generate_jwt(CustomUser.objects.get(id=user_id))}'),
+            True: Client(HTTP_AUTHORIZATION=f'Bearer {generate_jwt(CustomUser.objects.get(id=admin_id))}'),
+        }
+
+        results = {}
+        for name, method, path, body, as_admin in scenarios:
+            client = clients[as_admin]
+            timings, queries, sizes, statuses = [], [], [], {}
+            for i in range(n + warmup):
+                kwargs = {}
+                if body is not None:
+                    data = body(i)
+                    content_type, data = data if isinstance(data, tuple) else ('application/json', json.dumps(data))
+                    kwargs = {'data': data, 'content_type': content_type}
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(path(i), **kwargs)
+                    content = b''.join(response.streaming_content) if response.streaming else response.content
+                    elapsed = time.perf_counter() - start
+                if i < warmup:
+                    continue
+                timings.append(elapsed * 1000)
+                queries.append(len(ctx.captured_queries))
+                sizes.append(len(content))
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            timings.sort()
+            results[name] = {
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'mean_queries': round(sum(queries) / len(queries), 2),
+                'max_queries': max(queries),
+                'mean_bytes': round(sum(sizes) / len(sizes)),
+                'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+            }
+        return results
+
+    def warn_uncovered(self, covered):
+        names = {p.name for p in get_resolver('main.urls').url_patterns if p.name}
+        missing = sorted(names - covered - UNBENCHMARKED)
+        if missing:
+            self.stderr.write(f"No benchmark scenario for: {', '.join(missing)}")
+
+    # -- output ----------------------------------------------------------
+
+    def print_table(self, results):
+        header = f"{'endpoint':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'bytes':>10}  status"
+        self.stdout.write(header)
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<28}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                f"{r['mean_queries']:>9.1f}{r['mean_bytes']:>10}  {r['status_codes']}"
+            )
+
+    def git_commit(self):
+        try:
+            return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
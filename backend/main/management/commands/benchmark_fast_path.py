@@ -0,0 +1,103 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from main.models import CustomUser, SwapRequest, SwapRequestOfferedSkill, SwapRequestWantedSkill, UserSkill
+from main.renderers import ORJSONRenderer
+from main.serializers import SwapRequestSerializer, UserListSerializer
+from main.utils.dataset import DatasetGenerator
+from main.utils.fast_rows import SWAP_VALUES, USER_LIST_VALUES, swap_rows, user_list_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and time building and rendering one page of all-users and "
+        "my-swap-requests rows through the ModelSerializer path and the .values()/orjson fast path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--page-size', type=int, default=200)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--output', default='benchmark-fast-path-results.json')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(f"Seeding {options['users']} users...")
+            DatasetGenerator(users=options['users'], skills=200, seed=random.Random(options['seed']).random(),
+                             log=self.stdout.write).generate()
+            results = self.run(options['page_size'], options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as fh:
+            json.dump({'page_size': options['page_size'], 'iterations': options['iterations'],
+                       'database': connection.vendor, 'endpoints': results}, fh, indent=2, sort_keys=True)
+        self.print_table(results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def run(self, page_size, iterations):
+        user_ids = list(CustomUser.objects.order_by('id').values_list('id', flat=True)[:page_size])
+        swap_ids = list(SwapRequest.objects.order_by('id').values_list('id', flat=True)[:page_size])
+
+        def users_standard():
+            users = CustomUser.objects.filter(id__in=user_ids).order_by('id').select_related('rating_summary').prefetch_related(
+                Prefetch('userskill_set', queryset=UserSkill.objects.select_related('skill').order_by('id')))
+            return JSONRenderer().render(UserListSerializer(users, many=True).data)
+
+        def users_fast():
+            users = CustomUser.objects.filter(id__in=user_ids).order_by('id').values(*USER_LIST_VALUES)
+            return ORJSONRenderer().render(user_list_rows(list(users)))
+
+        def swaps_standard():
+            swaps = SwapRequest.objects.filter(id__in=swap_ids).order_by('id').select_related('requester', 'receiver').prefetch_related(
+                Prefetch('offered_skills', queryset=SwapRequestOfferedSkill.objects.select_related('skill').order_by('id')),
+                Prefetch('wanted_skills', queryset=SwapRequestWantedSkill.objects.select_related('skill').order_by('id')))
+            return JSONRenderer().render(SwapRequestSerializer(swaps, many=True).data)
+
+        def swaps_fast():
+            swaps = SwapRequest.objects.filter(id__in=swap_ids).order_by('id').values(*SWAP_VALUES)
+            return ORJSONRenderer().render(swap_rows(list(swaps)))
+
+        results = {}
+        for name, standard, fast in (('all-users', users_standard, users_fast),
+                                     ('my-swap-requests', swaps_standard, swaps_fast)):
+            if standard() != fast():
+                raise CommandError(f"{name}: fast path output differs from the serializer output.")
+            results[name] = {'standard': self.measure(standard, iterations), 'fast': self.measure(fast, iterations)}
+            results[name]['speedup'] = round(results[name]['standard']['median_ms'] / results[name]['fast']['median_ms'], 2)
+        return results
+
+    def measure(self, build, iterations):
+        timings = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                body = build()
+                timings.append((time.perf_counter() - start) * 1000)
+        return {
+            'median_ms': round(statistics.median(timings), 3),
+            'min_ms': round(min(timings), 3),
+            'queries': len(ctx.captured_queries),
+            'bytes': len(body),
+        }
+
+    def print_table(self, results):
+        self.stdout.write(f"{'endpoint':<20}{'path':<10}{'median ms':>11}{'min ms':>9}{'queries':>9}{'bytes':>9}")
+        for name, r in results.items():
+            for path in ('standard', 'fast'):
+                m = r[path]
+                self.stdout.write(f"{name:<20}{path:<10}{m['median_ms']:>11.2f}{m['min_ms']:>9.2f}{m['queries']:>9}{m['bytes']:>9}")
+            self.stdout.write(f"{'':<20}{'speedup':<10}{r['speedup']:>10.2f}x")
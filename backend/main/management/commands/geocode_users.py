@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from main.models import CustomUser
+from main.utils.gazetteer import geocode
+from main.utils.geo_index import bump_geo_index_version
+
+
+class Command(BaseCommand):
+    help = "Set every user's latitude/longitude from their location and the bundled gazetteer, in batches of users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        users_done = changed = 0
+
+        while True:
+            rows = list(
+                CustomUser.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'location', 'latitude', 'longitude')[:batch_size]
+            )
+            if not rows:
+                break
+            updates = []
+            for user_id, location, latitude, longitude in rows:
+                point = geocode(location) or (None, None)
+                if point != (latitude, longitude):
+                    updates.append(CustomUser(id=user_id, latitude=point[0], longitude=point[1]))
+            CustomUser.objects.bulk_update(updates, ['latitude', 'longitude'])
+            changed += len(updates)
+            last_id = rows[-1][0]
+            users_done += len(rows)
+            self.stdout.write(f"Geocoded {users_done} users (up to user {last_id}).")
+
+        if changed:
+            # Running workers rebuild their geo index on next use.
+            bump_geo_index_version()
+        self.stdout.write(self.style.SUCCESS(f"Done: {changed} of {users_done} users placed or moved."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from main.models import CustomUser
+from main.utils.directory_cards import refresh_directory_cards
+
+
+class Command(BaseCommand):
+    help = "Recompute every DirectoryCard from users, rating summaries and skills in batches of users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        users_done = 0
+
+        while True:
+            user_ids = list(
+                CustomUser.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            refresh_directory_cards(user_ids)
+            last_id = user_ids[-1]
+            users_done += len(user_ids)
+            self.stdout.write(f"Rebuilt {users_done} directory cards (up to user {last_id}).")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {users_done} directory cards rebuilt."))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from main.models import CustomUser, Feedback, UserRatingSummary
+from main.utils.directory_cards import directory_card_refresh
+from main.utils.profile_cache import bump_profile_versions
+
+
+class Command(BaseCommand):
+    help = "Recompute every UserRatingSummary from Feedback in batches of users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        users_done = 0
+
+        while True:
+            user_ids = list(
+                CustomUser.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            self.rebuild_batch(user_ids[0], user_ids[-1], user_ids)
+            last_id = user_ids[-1]
+            users_done += len(user_ids)
+            self.stdout.write(f"Rebuilt {users_done} rating summaries (up to user {last_id}).")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {users_done} rating summaries rebuilt."))
+
+    @transaction.atomic
+    def rebuild_batch(self, first_id, last_id, user_ids):
+        # Range filters keep both queries on the reviewee / user indexes.
+        # Lock the summaries first: a feedback write that lands meanwhile
+        # waits to apply its F() increment until this batch commits, and
+        # the totals below are read after any that committed earlier.
+        summaries = {
+            s.user_id: s
+            for s in UserRatingSummary.objects.select_for_update().filter(
+                user_id__gte=first_id, user_id__lte=last_id,
+            ).only('id', 'user_id', 'rating_sum', 'total_reviews')
+        }
+
+        totals = {
+            reviewee_id: (rating_sum, count)
+            for reviewee_id, rating_sum, count in Feedback.objects.filter(
+                reviewee_id__gte=first_id, reviewee_id__lte=last_id,
+            ).order_by().values('reviewee_id').annotate(
+                rating_sum=Sum('rating'), count=Count('id'),
+            ).values_list('reviewee_id', 'rating_sum', 'count')
+        }
+
+        changed, missing = [], []
+        for user_id in user_ids:
+            rating_sum, count = totals.get(user_id, (0, 0))
+            summary = summaries.get(user_id)
+            if summary is None:
+                missing.append(UserRatingSummary(user_id=user_id, rating_sum=rating_sum, total_reviews=count))
+            elif (summary.rating_sum, summary.total_reviews) != (rating_sum, count):
+                summary.rating_sum, summary.total_reviews = rating_sum, count
+                changed.append(summary)
+
+        if changed:
+            UserRatingSummary.objects.bulk_update(changed, ['rating_sum', 'total_reviews'])
+        if missing:
+            UserRatingSummary.objects.bulk_create(missing, ignore_conflicts=True)
+        # Bulk writes send no signals; drop cached profiles and cards ourselves.
+        bump_profile_versions([s.user_id for s in changed + missing])
+        directory_card_refresh.add([s.user_id for s in changed + missing])
@@ -0,0 +1,62 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .utils.metrics import end_request, registry, start_request
+
+
+class RequestMetricsMiddleware:
+    """Record SQL count/time, render time and response size for every request.
+
+    The numbers are sent back in a ``Server-Timing`` header and folded into
+    the per-view histograms served by ``MetricsView``. SQL is measured by the
+    execute wrapper every connection gets on creation, so only a few clock
+    reads are added to the request path. Queries issued while a streaming
+    response is being consumed happen after this middleware returns and are
+    not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, total):
+        match = request.resolver_match
+        # The route pattern keeps label cardinality bounded by the URLconf.
+        view = match.route if match else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, total, metrics, size)
+
+        app = max(0.0, total - metrics.db_seconds - metrics.render_seconds)
+        response['Server-Timing'] = (
+            f'db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.queries} queries", '
+            f'app;dur={app * 1000:.2f}, '
+            f'render;dur={metrics.render_seconds * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+        return response
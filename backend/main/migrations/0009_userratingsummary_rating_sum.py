@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:31
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_totals(apps, schema_editor):
+    UserRatingSummary = apps.get_model('main', 'UserRatingSummary')
+    Feedback = apps.get_model('main', 'Feedback')
+
+    per_reviewee = Feedback.objects.filter(reviewee=OuterRef('user')).order_by().values('reviewee')
+    UserRatingSummary.objects.update(
+        rating_sum=Coalesce(Subquery(per_reviewee.annotate(s=Sum('rating')).values('s')), 0, output_field=IntegerField()),
+        total_reviews=Coalesce(Subquery(per_reviewee.annotate(c=Count('id')).values('c')), 0, output_field=IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userratingsummary',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='userratingsummary',
+            name='average_rating',
+        ),
+    ]
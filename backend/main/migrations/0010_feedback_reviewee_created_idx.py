@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_userratingsummary_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['reviewee', '-created_at', '-id'], name='feedback_reviewee_created_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('main', '0010_feedback_reviewee_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_banned', False), ('is_public', True)), fields=['id'], name='user_directory_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swaprequest',
+            index=models.Index(fields=['requester', '-created_at'], name='swap_requester_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swaprequest',
+            index=models.Index(fields=['receiver', '-created_at'], name='swap_receiver_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swaprequest',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='swap_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swaprequest',
+            index=models.Index(fields=['-created_at', '-id'], name='swap_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userskill',
+            index=models.Index(fields=['skill', 'type', 'user'], name='userskill_skill_type_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:45
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    SwapRequest = apps.get_model('main', 'SwapRequest')
+    SwapRequest.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='swaprequest',
+            name='swap_requester_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='swaprequest',
+            name='swap_receiver_created_idx',
+        ),
+        migrations.AddField(
+            model_name='swaprequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='swaprequest',
+            index=models.Index(fields=['requester', 'updated_at', 'id'], name='swap_requester_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='swaprequest',
+            index=models.Index(fields=['receiver', 'updated_at', 'id'], name='swap_receiver_updated_idx'),
+        ),
+    ]
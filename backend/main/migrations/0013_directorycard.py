@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_swaprequest_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryCard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='directory_card', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('payload', models.JSONField()),
+                ('is_listed', models.BooleanField()),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('is_listed', True)), fields=['user'], name='directory_card_listed_idx')],
+            },
+        ),
+    ]
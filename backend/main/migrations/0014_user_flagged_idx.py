@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('main', '0013_directorycard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_active', False), ('is_banned', True), ('is_staff', True), _connector='OR'), fields=['id'], name='user_flagged_idx'),
+        ),
+    ]
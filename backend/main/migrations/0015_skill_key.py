@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_user_flagged_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='key',
+            field=models.CharField(editable=False, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:40
+
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def skill_key(name):
+    # Frozen copy of main.models.skill_key.
+    return ' '.join(name.split()).lower()
+
+
+def repoint(model, keep, duplicates, unique_by):
+    """Move ``duplicates``' rows to skill ``keep``, dropping any that would repeat."""
+    seen = set(model.objects.filter(skill_id=keep).values_list(*unique_by))
+    move, drop = [], []
+    for row_id, *identity in model.objects.filter(skill_id__in=duplicates).order_by('id').values_list('id', *unique_by):
+        identity = tuple(identity)
+        if identity in seen:
+            drop.append(row_id)
+        else:
+            seen.add(identity)
+            move.append(row_id)
+    model.objects.filter(id__in=drop).delete()
+    model.objects.filter(id__in=move).update(skill_id=keep)
+
+
+def merge_duplicate_skills(apps, schema_editor):
+    """Fold skills whose names differ only in case or spacing into the oldest one."""
+    Skill = apps.get_model('main', 'Skill')
+    UserSkill = apps.get_model('main', 'UserSkill')
+    SwapRequestOfferedSkill = apps.get_model('main', 'SwapRequestOfferedSkill')
+    SwapRequestWantedSkill = apps.get_model('main', 'SwapRequestWantedSkill')
+
+    groups = defaultdict(list)
+    for skill_id, name in Skill.objects.order_by('id').values_list('id', 'name').iterator(chunk_size=10000):
+        groups[skill_key(name)].append(skill_id)
+
+    keys = []
+    for key, (keep, *duplicates) in groups.items():
+        if duplicates:
+            repoint(UserSkill, keep, duplicates, ('user_id', 'type'))
+            repoint(SwapRequestOfferedSkill, keep, duplicates, ('swap_request_id',))
+            repoint(SwapRequestWantedSkill, keep, duplicates, ('swap_request_id',))
+            Skill.objects.filter(id__in=duplicates).delete()
+        keys.append(Skill(id=keep, key=key))
+    Skill.objects.bulk_update(keys, ['key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_skill_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_skills, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_customuser_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('version', models.BigIntegerField()),
+                ('changes', models.JSONField(null=True)),
+            ],
+            options={
+                'unique_together': {('key', 'version')},
+            },
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.db import models
 from django.utils import timezone
 
+from .utils.gazetteer import geocode
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, full_name, password=None, **extra_fields):
         if not email:
@@ -34,22 +36,75 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     availability = models.CharField(max_length=255, blank=True, null=True)
     is_public = models.BooleanField(default=True)
     is_banned = models.BooleanField(default=False)
+    # Where location is, per the bundled gazetteer; both null when it is not
+    # a known place. Set from location on save; bulk inserts must set them.
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
     # profile_photo = models.ImageField(upload_to="profile_photos/", blank=True, null=True)
 
     date_joined = models.DateTimeField(auto_now_add=True)
 
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            # The public directory: only listable users, walked in id order.
+            models.Index(
+                fields=['id'],
+                name='user_directory_idx',
+                condition=models.Q(is_active=True, is_banned=False, is_public=True),
+            ),
+            # Accounts authentication cannot treat as ordinary; loaded whole
+            # into every worker's auth state.
+            models.Index(
+                fields=['id'],
+                name='user_flagged_idx',
+                condition=models.Q(is_active=False) | models.Q(is_banned=True) | models.Q(is_staff=True),
+            ),
+        ]
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['full_name']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # Whether the stored row is listable, when its flags were loaded; the
+        # post_save handlers compare against it to skip saves that keep it.
+        if {'is_active', 'is_banned', 'is_public'}.issubset(field_names):
+            user._stored_visible = user.is_active and not user.is_banned and user.is_public
+        return user
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'location' in update_fields:
+            self.latitude, self.longitude = geocode(self.location) or (None, None)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
 
 
 
+def skill_key(name):
+    """Case- and whitespace-insensitive identity of a skill name."""
+    return ' '.join(name.split()).lower()
+
+
 class Skill(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # "Python", "python " and "PYTHON" are one skill; name keeps the first
+    # spelling seen. Set from name on save; bulk inserts must set it.
+    key = models.CharField(max_length=100, unique=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.key = skill_key(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'key'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -62,6 +117,10 @@ class UserSkill(models.Model):
 
     class Meta:
         unique_together = ('user', 'skill', 'type')
+        indexes = [
+            # skill -> users lookups; includes user so they are index-only.
+            models.Index(fields=['skill', 'type', 'user'], name='userskill_skill_type_idx'),
+        ]
 
 
 class SwapRequest(models.Model):
@@ -72,35 +131,23 @@ class SwapRequest(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
-    requester = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sent_requests')
-    receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='received_requests')
+    # Indexed by the composite indexes below, which lead with each of them.
+    requester = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sent_requests', db_index=False)
+    receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='received_requests', db_index=False)
     message = models.TextField(blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
-class SwapRequestOfferedSkill(models.Model):
-    swap_request = models.ForeignKey(SwapRequest, on_delete=models.CASCADE, related_name='offered_skills')
-    skill = models.ForeignKey('main.Skill', on_delete=models.CASCADE)
-
-class SwapRequestWantedSkill(models.Model):
-    swap_request = models.ForeignKey(SwapRequest, on_delete=models.CASCADE, related_name='wanted_skills')
-    skill = models.ForeignKey('main.Skill', on_delete=models.CASCADE)
-
-
-
-class SwapRequest(models.Model):
-    STATUS_CHOICES = [
-        ('pending', 'Pending'),
-        ('accepted', 'Accepted'),
-        ('rejected', 'Rejected'),
-        ('cancelled', 'Cancelled'),
-    ]
-
-    requester = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sent_requests')
-    receiver = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='received_requests')
-    message = models.TextField(blank=True)
-    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
-    created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            # Delta sync of a user's own swaps (requester OR receiver).
+            models.Index(fields=['requester', 'updated_at', 'id'], name='swap_requester_updated_idx'),
+            models.Index(fields=['receiver', 'updated_at', 'id'], name='swap_receiver_updated_idx'),
+            # Admin monitor, with and without a status filter.
+            models.Index(fields=['status', '-created_at', '-id'], name='swap_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='swap_created_idx'),
+        ]
 
 class SwapRequestOfferedSkill(models.Model):
     swap_request = models.ForeignKey(SwapRequest, on_delete=models.CASCADE, related_name='offered_skills')
@@ -113,13 +160,41 @@ class SwapRequestWantedSkill(models.Model):
 
 class UserRatingSummary(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='rating_summary')
-    average_rating = models.FloatField(default=0.0)
+    # Exact running totals; the average is derived so rounding never compounds.
+    rating_sum = models.PositiveIntegerField(default=0)
     total_reviews = models.PositiveIntegerField(default=0)
 
+    @property
+    def average_rating(self):
+        return self.compute_average(self.rating_sum, self.total_reviews)
+
+    @staticmethod
+    def compute_average(rating_sum, total_reviews):
+        if not total_reviews:
+            return 0.0
+        return round(rating_sum / total_reviews, 2)
+
     def __str__(self):
         return f"{self.user.email}: {self.average_rating} ({self.total_reviews} reviews)"
     
 
+class DirectoryCard(models.Model):
+    # The finished /all-users/ row for each user, so a directory page is one
+    # range scan. Kept current by main.utils.directory_cards; the
+    # rebuild_directory_cards command recomputes all of them.
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='directory_card')
+    payload = models.JSONField()
+    is_listed = models.BooleanField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user'], name='directory_card_listed_idx', condition=models.Q(is_listed=True)),
+        ]
+
+    def __str__(self):
+        return f"Directory card of user {self.user_id}"
+
+
 class Feedback(models.Model):
     swap_request = models.OneToOneField(SwapRequest, on_delete=models.CASCADE, related_name='feedback')
     reviewer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='given_feedbacks')
@@ -130,6 +205,12 @@ class Feedback(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Backs the per-user feedback stream (newest first).
+            models.Index(fields=['reviewee', '-created_at', '-id'], name='feedback_reviewee_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.reviewer} rated {self.reviewee} {self.rating}/5"
     
@@ -140,4 +221,29 @@ class PlatformMessage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class DataVersion(models.Model):
+    # Monotonic counters that let per-process caches notice writes made by
+    # other workers with a single primary-key read.
+    key = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}@{self.version}"
+
+
+class DataChange(models.Model):
+    # What one DataVersion bump changed, so other workers can apply it by id
+    # instead of reloading. ``changes`` is null for a change they cannot
+    # follow that way.
+    key = models.CharField(max_length=100)
+    version = models.BigIntegerField()
+    changes = models.JSONField(null=True)
+
+    class Meta:
+        unique_together = ('key', 'version')
+
+    def __str__(self):
+        return f"{self.key}@{self.version}"
@@ -0,0 +1,204 @@
+import binascii
+from base64 import b64decode, b64encode
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class AsyncCursorPagination(CursorPagination):
+    """CursorPagination that can also read its page through the async ORM.
+
+    ``paginate_queryset`` is split around its one query: ``page_query``
+    builds it and ``set_page`` works out the page and its cursors from the
+    rows, so ``apaginate_queryset`` differs only in how the rows are read.
+    """
+
+    def page_query(self, queryset, request, view=None):
+        """The sliced queryset holding the page and the row after it, or None if not paginating."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor if self.cursor is not None else (0, False, None)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            order_attr = order.lstrip('-')
+            # (cursor reversed) XOR (queryset reversed)
+            if self.cursor.reverse != order.startswith('-'):
+                queryset = queryset.filter(**{order_attr + '__lt': current_position})
+            else:
+                queryset = queryset.filter(**{order_attr + '__gt': current_position})
+
+        # The extra row tells whether a page follows this one.
+        return queryset[offset:offset + self.page_size + 1]
+
+    def set_page(self, results):
+        offset, reverse, current_position = self.cursor if self.cursor is not None else (0, False, None)
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # Read in reverse; put the page back in order.
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        query = self.page_query(queryset, request, view)
+        return None if query is None else self.set_page(list(query))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        query = self.page_query(queryset, request, view)
+        return None if query is None else self.set_page([row async for row in query])
+
+
+class UserDirectoryPagination(AsyncCursorPagination):
+    # Keyset pagination on the primary key: stable under inserts and an
+    # index range scan no matter how deep the client pages.
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class DirectoryCardPagination(UserDirectoryPagination):
+    # Same keys as UserDirectoryPagination, so cursors work with either.
+    ordering = 'user_id'
+
+
+class FeedbackPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+    def first_page(self, queryset, base_url):
+        """Page one of ``queryset``, with get_next_link() pointing at ``base_url``.
+
+        For embedding the first page in another response, so nothing is read
+        from that response's request.
+        """
+        return self._set_first_page(list(queryset.order_by(*self.ordering)[:self.page_size + 1]), base_url)
+
+    async def afirst_page(self, queryset, base_url):
+        """``first_page`` reading through the async ORM."""
+        rows = [row async for row in queryset.order_by(*self.ordering)[:self.page_size + 1]]
+        return self._set_first_page(rows, base_url)
+
+    def _set_first_page(self, results, base_url):
+        self.base_url = base_url
+        self.cursor = None
+        self.has_previous = False
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > len(self.page)
+        self.next_position = self._get_position_from_instance(results[-1], self.ordering) if self.has_next else None
+        return self.page
+
+
+class SwapMonitorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class PlatformMessagePagination(AsyncCursorPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class SwapSyncPagination:
+    """Keyset pages over ``(updated_at, id)`` for delta sync.
+
+    Unlike CursorPagination the cursor outlives the last page: clients keep
+    the final one and pass it back as ``?since=`` to receive only the rows
+    that changed after it.
+
+    ``updated_at`` is set before the write's transaction commits, so a row
+    can become visible after rows stamped later than it. The cursor
+    therefore only moves past rows older than ``settle_seconds``. Newer rows
+    are still returned, and again on each request until they settle;
+    clients apply rows by id, so the repeats are harmless.
+    """
+
+    page_size = 200
+    settle_seconds = 5
+
+    def decode_cursor(self, value):
+        """Return ``(updated_at, id)`` or None; ValueError on a malformed cursor."""
+        if not value:
+            return None
+        try:
+            timestamp, _, pk = b64decode(value.encode('ascii'), altchars=b'-_', validate=True).decode().partition('|')
+            updated_at = parse_datetime(timestamp)
+            pk = int(pk)
+        except (UnicodeError, binascii.Error, ValueError) as exc:
+            raise ValueError('Invalid cursor.') from exc
+        if updated_at is None:
+            raise ValueError('Invalid cursor.')
+        return updated_at, pk
+
+    def position(self, swap):
+        # Model instances, or .values() rows on the fast path.
+        return (swap['updated_at'], swap['id']) if isinstance(swap, dict) else (swap.updated_at, swap.pk)
+
+    def encode_cursor(self, swap):
+        updated_at, pk = self.position(swap)
+        return b64encode(f'{updated_at.isoformat()}|{pk}'.encode(), altchars=b'-_').decode('ascii')
+
+    def paginate_queryset(self, queryset, position):
+        if position is not None:
+            updated_at, pk = position
+            queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+        return queryset.order_by('updated_at', 'id')[:self.page_size + 1]
+
+    def get_payload(self, rows, data, since):
+        """Response body for the fetched ``rows``; ``data`` serializes the first page_size."""
+        page = rows[:self.page_size]
+        settled_before = timezone.now() - timedelta(seconds=self.settle_seconds)
+        settled = [swap for swap in page if self.position(swap)[0] <= settled_before]
+        return {
+            'results': data,
+            # Nothing settled: the client's cursor stays valid.
+            'cursor': self.encode_cursor(settled[-1]) if settled else since,
+            # Rows are in updated_at order, so past an unsettled row there
+            # are only unsettled rows; they come with the next request.
+            'has_more': len(rows) > self.page_size and len(settled) == len(page),
+        }
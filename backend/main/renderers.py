@@ -0,0 +1,53 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from .utils.metrics import current_metrics
+
+try:
+    import orjson
+except ImportError:  # optional; ORJSONRenderer then falls back to the stdlib
+    orjson = None
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its own duration to the request metrics."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        metrics = current_metrics()
+        if metrics is None:
+            return self.encode(data, accepted_media_type, renderer_context)
+        start = time.perf_counter()
+        try:
+            return self.encode(data, accepted_media_type, renderer_context)
+        finally:
+            metrics.render_seconds += time.perf_counter() - start
+
+    def encode(self, data, accepted_media_type, renderer_context):
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class ORJSONRenderer(TimedJSONRenderer):
+    """Produces the same bytes as JSONRenderer's compact output, using orjson.
+
+    Anything orjson cannot encode identically (indented output, values only
+    DRF's encoder knows, out-of-range integers) goes through JSONRenderer.
+    """
+
+    _options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+    _encoder = encoders.JSONEncoder()
+
+    def encode(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().encode(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._encoder.default, option=self._options)
+        except orjson.JSONEncodeError:
+            return super().encode(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these two so the output is also valid JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
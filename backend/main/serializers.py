@@ -27,12 +27,27 @@ class UpdateSkillsSerializer(serializers.Serializer):
     )
 
 
+MAX_SWAP_RECEIVERS = 100
+
+
 class CreateSwapRequestSerializer(serializers.Serializer):
-    receiver_id = serializers.IntegerField()
+    receiver_id = serializers.IntegerField(required=False)
+    # Broadcast mode: the same offer to several receivers in one call.
+    receiver_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_SWAP_RECEIVERS
+    )
     message = serializers.CharField(required=False, allow_blank=True)
     offered_skills = serializers.ListField(child=serializers.CharField())
     wanted_skills = serializers.ListField(child=serializers.CharField())
 
+    def validate(self, attrs):
+        if ('receiver_id' in attrs) == ('receiver_ids' in attrs):
+            raise serializers.ValidationError("Provide exactly one of receiver_id or receiver_ids.")
+        return attrs
+
 
 class UpdateSwapRequestStatusSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=['accepted', 'rejected', 'cancelled'])
@@ -53,6 +68,26 @@ class BanUserSerializer(serializers.Serializer):
     user_id = serializers.IntegerField()
     is_banned = serializers.BooleanField()
 
+
+class ImportUserRowSerializer(serializers.Serializer):
+    """One row of an admin bulk user import."""
+    full_name = serializers.CharField(max_length=255)
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField(trim_whitespace=False)
+    location = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    availability = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    is_public = serializers.BooleanField(required=False, default=True)
+    offered_skills = serializers.ListField(
+        child=serializers.CharField(max_length=100, allow_blank=True),
+        required=False,
+        default=list
+    )
+    wanted_skills = serializers.ListField(
+        child=serializers.CharField(max_length=100, allow_blank=True),
+        required=False,
+        default=list
+    )
+
 class SwapRequestMonitorSerializer(serializers.ModelSerializer):
     offered_skills = serializers.SerializerMethodField()
     wanted_skills  = serializers.SerializerMethodField()
@@ -79,6 +114,7 @@ class PlatformMessageSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'body', 'created_at']
 
 from .models import CustomUser
+from .pagination import FeedbackPagination
 
 class FeedbackDisplaySerializer(serializers.ModelSerializer):
     reviewer_name = serializers.CharField(source='reviewer.full_name')
@@ -93,30 +129,48 @@ class UserProfileSerializer(serializers.ModelSerializer):
     total_reviews = serializers.IntegerField(source='rating_summary.total_reviews', read_only=True)
     offered_skills = serializers.SerializerMethodField()
     wanted_skills = serializers.SerializerMethodField()
-    is_self = serializers.SerializerMethodField()
     feedbacks = serializers.SerializerMethodField()
+    feedbacks_next = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
         fields = [
             'id', 'full_name', 'email', 'location', 'availability', 'is_public',
             'average_rating', 'total_reviews', 'offered_skills', 'wanted_skills',
-            'is_self', 'feedbacks'
+            'feedbacks', 'feedbacks_next'
         ]
 
+    # The async profile view reads the skills and the first feedback page
+    # through the async ORM beforehand and passes them in the context.
     def get_offered_skills(self, obj):
+        if 'skills' in self.context:
+            return self.context['skills']['offered']
         return list(UserSkill.objects.filter(user=obj, type="offered").values_list("skill__name", flat=True))
 
     def get_wanted_skills(self, obj):
+        if 'skills' in self.context:
+            return self.context['skills']['wanted']
         return list(UserSkill.objects.filter(user=obj, type="wanted").values_list("skill__name", flat=True))
 
-    def get_is_self(self, obj):
-        request_user = self.context.get("request_user")
-        return request_user.id == obj.id if request_user else False
+    # Only the first page of reviews is embedded; the rest is served by the
+    # paginated feedback endpoint linked from feedbacks_next.
+    def _feedback_paginator(self, obj):
+        if 'feedback_paginator' in self.context:
+            return self.context['feedback_paginator']
+        if not hasattr(self, '_feedback_page'):
+            paginator = FeedbackPagination()
+            paginator.first_page(
+                Feedback.objects.filter(reviewee=obj).select_related('reviewer'),
+                self.context.get('feedback_url', ''),
+            )
+            self._feedback_page = paginator
+        return self._feedback_page
 
     def get_feedbacks(self, obj):
-        feedbacks = Feedback.objects.filter(reviewee=obj).select_related('reviewer').order_by('-created_at')
-        return FeedbackDisplaySerializer(feedbacks, many=True).data
+        return FeedbackDisplaySerializer(self._feedback_paginator(obj).page, many=True).data
+
+    def get_feedbacks_next(self, obj):
+        return self._feedback_paginator(obj).get_next_link()
     
 
 class UserListSerializer(serializers.ModelSerializer):
@@ -131,11 +185,13 @@ class UserListSerializer(serializers.ModelSerializer):
         fields = ['id', 'full_name', 'email', 'location', 'availability', 'is_public', 'is_banned',
                   'average_rating', 'total_reviews', 'offered_skills', 'wanted_skills']
 
+    # Read from the prefetched userskill_set so a page costs a fixed number
+    # of queries instead of two extra per user.
     def get_offered_skills(self, obj):
-        return list(obj.userskill_set.filter(type="offered").values_list("skill__name", flat=True))
+        return [us.skill.name for us in obj.userskill_set.all() if us.type == "offered"]
 
     def get_wanted_skills(self, obj):
-        return list(obj.userskill_set.filter(type="wanted").values_list("skill__name", flat=True))
+        return [us.skill.name for us in obj.userskill_set.all() if us.type == "wanted"]
     
 
 
@@ -159,12 +215,13 @@ class SwapRequestSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'requester_id', 'requester_name',
             'receiver_id', 'receiver_name',
-            'message', 'status', 'created_at',
+            'message', 'status', 'created_at', 'updated_at',
             'offered_skills', 'wanted_skills',
         ]
 
+    # Built from the prefetched rows; see UserSwapRequestsView.
     def get_offered_skills(self, obj):
-        return list(obj.offered_skills.values_list('skill__name', flat=True))
+        return [offered.skill.name for offered in obj.offered_skills.all()]
 
     def get_wanted_skills(self, obj):
-        return list(obj.wanted_skills.values_list('skill__name', flat=True))
\ No newline at end of file
+        return [wanted.skill.name for wanted in obj.wanted_skills.all()]
\ No newline at end of file
@@ -0,0 +1,216 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CustomUser, Feedback, PlatformMessage, Skill, UserRatingSummary, UserSkill
+from .utils.auth_state import DEFAULT_FLAGS, auth_state, auth_state_writes
+from .utils.directory_cards import CARD_USER_FIELDS, directory_card_refresh
+from .utils.geo_index import geo_index, geo_index_writes
+from .utils.message_cache import platform_message_writes
+from .utils.metrics import record_query
+from .utils.profile_cache import bump_profile_versions
+from .utils.skill_autocomplete import skill_autocomplete, skill_vocabulary_writes
+from .utils.skill_index import skill_index, skill_index_writes
+from .utils.skill_keys import skill_key_writes, skill_keys
+
+VISIBILITY_FIELDS = {'is_active', 'is_banned', 'is_public'}
+AUTH_FLAG_FIELDS = {'is_active', 'is_banned', 'is_staff'}
+
+
+def is_visible(user):
+    return user.is_active and not user.is_banned and user.is_public
+
+
+def send_post_save_for_bulk(sender, instances):
+    """bulk_create() skips post_save; send it so in-memory indexes stay in step."""
+    for instance in instances:
+        post_save.send(sender=sender, instance=instance, created=True, update_fields=None, raw=False, using=instance._state.db)
+
+
+@receiver(post_save, sender=UserSkill)
+def index_user_skill_saved(sender, instance, created, **kwargs):
+    if created:
+        skill_index_writes.add(lambda: skill_index.add(instance.user_id, instance.skill_id, instance.type),
+                               [instance.user_id, instance.skill_id, instance.type])
+    else:
+        # The previous skill/type is unknown here, so start over.
+        skill_index_writes.add(skill_index.invalidate, None)
+
+
+@receiver(post_delete, sender=UserSkill)
+def index_user_skill_deleted(sender, instance, **kwargs):
+    skill_index_writes.add(lambda: skill_index.remove(instance.user_id, instance.skill_id, instance.type),
+                           [instance.user_id, instance.skill_id, instance.type])
+
+
+@receiver(post_save, sender=CustomUser)
+def index_user_visibility(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not VISIBILITY_FIELDS.intersection(update_fields):
+        return
+
+    visible = is_visible(instance)
+    stored, instance._stored_visible = getattr(instance, '_stored_visible', None), visible
+    if created:
+        if not visible:
+            skill_index_writes.add(lambda: skill_index.set_visibility(instance.id, False), [instance.id])
+        return
+
+    # An unban of a user who was not banned, and the like: nothing to do.
+    if stored == visible:
+        return
+    if skill_index.is_loaded and skill_index.is_hidden(instance.id) != visible:
+        return
+
+    skills = list(UserSkill.objects.filter(user=instance).values_list('skill_id', 'type'))
+    skill_index_writes.add(lambda: skill_index.set_visibility(instance.id, visible, skills), [instance.id])
+
+
+@receiver(post_save, sender=Skill)
+def autocomplete_skill_saved(sender, instance, created, **kwargs):
+    if created:
+        # Other workers read new skills by id, so no version bump.
+        transaction.on_commit(lambda: skill_autocomplete.add_skill(instance.id, instance.name))
+    else:
+        skill_vocabulary_writes.add(lambda: skill_autocomplete.rename_skill(instance.id, instance.name))
+
+
+@receiver(post_delete, sender=Skill)
+def autocomplete_skill_deleted(sender, instance, **kwargs):
+    skill_vocabulary_writes.add(lambda: skill_autocomplete.remove_skill(instance.id))
+
+
+@receiver(post_save, sender=Skill)
+def cache_skill_key(sender, instance, created, **kwargs):
+    if created:
+        # A new key cannot be cached wrongly anywhere, so no version bump.
+        transaction.on_commit(lambda: skill_keys.add_many({instance.key: instance.id}))
+    else:
+        # The old key is unknown here; drop this worker's map and tell the others.
+        skill_key_writes.add(skill_keys.invalidate)
+
+
+@receiver(post_delete, sender=Skill)
+def uncache_skill_key(sender, instance, **kwargs):
+    skill_key_writes.add(lambda: skill_keys.forget(instance.key))
+
+
+@receiver(post_save, sender=UserSkill)
+def autocomplete_usage_added(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: skill_autocomplete.adjust_usage(instance.skill_id, 1))
+
+
+@receiver(post_delete, sender=UserSkill)
+def autocomplete_usage_removed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: skill_autocomplete.adjust_usage(instance.skill_id, -1))
+
+
+@receiver(post_save, sender=CustomUser)
+def update_auth_state(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not AUTH_FLAG_FIELDS.intersection(update_fields):
+        return
+    flags = (instance.is_active, instance.is_banned, instance.is_staff)
+    # Ordinary sign-ups and profile edits leave the state as it is; skipping
+    # them keeps the shared version, and so every worker's copy, untouched.
+    if (created and flags == DEFAULT_FLAGS) or auth_state.is_current(instance.id, flags):
+        return
+    auth_state_writes.add(lambda: auth_state.set(instance.id, flags))
+
+
+@receiver(post_delete, sender=CustomUser)
+def remove_from_auth_state(sender, instance, **kwargs):
+    # delete() clears instance.id before the write runs on commit.
+    user_id = instance.id
+    auth_state_writes.add(lambda: auth_state.remove(user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+def index_user_location(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'location' not in update_fields:
+        return
+    point = None if instance.latitude is None else (instance.latitude, instance.longitude)
+    if created:
+        # Other workers read sign-ups by id, so no version bump.
+        if point is not None:
+            transaction.on_commit(lambda: geo_index.set(instance.id, point))
+        return
+    # Most saves leave the place as it was; skipping them keeps every
+    # worker's copy of the index.
+    if geo_index.is_current(instance.id, point):
+        return
+    geo_index_writes.add(lambda: geo_index.set(instance.id, point))
+
+
+@receiver(post_delete, sender=CustomUser)
+def unindex_user_location(sender, instance, **kwargs):
+    if instance.latitude is not None:
+        # delete() clears instance.id before the write runs on commit.
+        user_id = instance.id
+        geo_index_writes.add(lambda: geo_index.set(user_id, None))
+
+
+@receiver(post_save, sender=UserSkill)
+@receiver(post_delete, sender=UserSkill)
+@receiver(post_save, sender=UserRatingSummary)
+@receiver(post_delete, sender=UserRatingSummary)
+def bump_owner_profile_version(sender, instance, **kwargs):
+    bump_profile_versions([instance.user_id])
+
+
+@receiver(post_save, sender=Feedback)
+@receiver(post_delete, sender=Feedback)
+def bump_reviewee_profile_version(sender, instance, **kwargs):
+    bump_profile_versions([instance.reviewee_id])
+
+
+@receiver(post_save, sender=CustomUser)
+def bump_user_profile_version(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    user_ids = [instance.id]
+    if update_fields is None or 'full_name' in update_fields:
+        # Reviews this user wrote show their name on other profiles.
+        user_ids.extend(Feedback.objects.filter(reviewer=instance).values_list('reviewee_id', flat=True).distinct())
+    bump_profile_versions(user_ids)
+
+
+@receiver(post_save, sender=PlatformMessage)
+@receiver(post_delete, sender=PlatformMessage)
+def invalidate_platform_messages(sender, **kwargs):
+    platform_message_writes.add(lambda: None)
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_user_directory_card(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or CARD_USER_FIELDS.intersection(update_fields):
+        directory_card_refresh.add([instance.id])
+
+
+@receiver(post_save, sender=UserSkill)
+@receiver(post_delete, sender=UserSkill)
+@receiver(post_save, sender=UserRatingSummary)
+@receiver(post_delete, sender=UserRatingSummary)
+def refresh_owner_directory_card(sender, instance, **kwargs):
+    directory_card_refresh.add([instance.user_id])
+
+
+@receiver(post_save, sender=Feedback)
+@receiver(post_delete, sender=Feedback)
+def refresh_reviewee_directory_card(sender, instance, **kwargs):
+    # The rating summary itself is updated with .update(), which sends no signal.
+    directory_card_refresh.add([instance.reviewee_id])
+
+
+@receiver(post_save, sender=Skill)
+def refresh_skill_directory_cards(sender, instance, created, **kwargs):
+    if not created:
+        directory_card_refresh.add(UserSkill.objects.filter(skill=instance).values_list('user_id', flat=True).distinct())
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    # Connections open lazily, possibly inside a connection.execute_wrapper()
+    # block that pops the last wrapper on exit, so go in at the front.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
@@ -1,3 +1,1657 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F, Q
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import CustomUser, DirectoryCard, Feedback, PlatformMessage, Skill, SwapRequest, SwapRequestOfferedSkill, SwapRequestWantedSkill, UserSkill, UserRatingSummary, skill_key
+from .pagination import SwapSyncPagination
+from .utils import geo_index as geo_index_module
+from .utils import skill_autocomplete as skill_autocomplete_module
+from .utils import skill_index as skill_index_module
+from .utils import user_import as user_import_module
+from .utils import versioning as versioning_module
+from .utils.auth_state import AUTH_STATE_VERSION_KEY, auth_state
+from .utils.events import LocalBackend, LocalBus, SwapEventBroker, get_swap_event_broker
+from .utils.gazetteer import geocode
+from .utils.directory_cards import refresh_directory_cards
+from .utils.geo_index import geo_index
+from .utils.jwt_utils import SECRET_KEY, generate_jwt, generate_refresh_jwt
+from .utils.message_cache import PLATFORM_MESSAGES_VERSION_KEY, platform_messages
+from .utils.metrics import registry as metrics_registry
+from .utils.skill_autocomplete import skill_autocomplete
+from .utils.skill_index import bump_skill_index_version, skill_index
+from .utils.skill_keys import skill_keys
+from .utils.user_import import BATCH_FAILED, UserImport
+from .utils.versioning import VersionedCache, bump_version, get_version, log_change
+
+
+def pin_version_checks(test):
+    """Keep the per-process caches from re-reading their shared version for
+    the rest of ``test``, so query counts do not depend on how long it runs.
+    Caches that have not loaded, or were invalidated, still read it."""
+    test.enterContext(mock.patch.object(VersionedCache, 'check_interval', float('inf')))
+
+
+def make_user(email, **extra):
+    user = CustomUser.objects.create_user(email=email, full_name=email.split('@')[0], password='pass12345', **extra)
+    UserRatingSummary.objects.get_or_create(user=user)
+    return user
+
+
+def settle_swaps():
+    """Age every swap past SwapSyncPagination.settle_seconds, so sync cursors pass them."""
+    SwapRequest.objects.update(updated_at=F('updated_at') - timedelta(minutes=1))
+
+
+class AllUsersListViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = make_user('viewer@example.com')
+        python = Skill.objects.create(name='Python')
+        guitar = Skill.objects.create(name='Guitar')
+        for i in range(60):
+            user = make_user(f'user{i}@example.com')
+            UserSkill.objects.create(user=user, skill=python, type='offered')
+            UserSkill.objects.create(user=user, skill=guitar, type='wanted')
+        make_user('hidden@example.com', is_public=False)
+        make_user('banned@example.com', is_banned=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def test_query_count_is_constant_per_page(self):
+        pin_version_checks(self)
+        # users page + prefetched skills; independent of page size
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/all-users/', {'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 50)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 11)
+        self.assertIsNone(response.data['next'])
+
+    def test_skills_built_from_prefetch(self):
+        response = self.client.get('/api/all-users/')
+        row = next(r for r in response.data['results'] if r['email'] == 'user0@example.com')
+        self.assertEqual(row['offered_skills'], ['Python'])
+        self.assertEqual(row['wanted_skills'], ['Guitar'])
+
+    def test_hidden_and_banned_users_excluded(self):
+        response = self.client.get('/api/all-users/', {'page_size': 200})
+        emails = {r['email'] for r in response.data['results']}
+        self.assertNotIn('hidden@example.com', emails)
+        self.assertNotIn('banned@example.com', emails)
+
+
+class MatchesViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        python, guitar, chess = (Skill.objects.create(name=n) for n in ('Python', 'Guitar', 'Chess'))
+        cls.me = make_user('me@example.com')
+        UserSkill.objects.create(user=cls.me, skill=python, type='offered')
+        UserSkill.objects.create(user=cls.me, skill=guitar, type='wanted')
+        UserSkill.objects.create(user=cls.me, skill=chess, type='wanted')
+
+        cls.mutual = make_user('mutual@example.com')
+        UserSkill.objects.create(user=cls.mutual, skill=guitar, type='offered')
+        UserSkill.objects.create(user=cls.mutual, skill=python, type='wanted')
+
+        cls.one_way = make_user('oneway@example.com')
+        UserSkill.objects.create(user=cls.one_way, skill=guitar, type='offered')
+        UserSkill.objects.create(user=cls.one_way, skill=chess, type='offered')
+
+        banned = make_user('banned@example.com', is_banned=True)
+        UserSkill.objects.create(user=banned, skill=guitar, type='offered')
+        make_user('nomatch@example.com')
+
+    def setUp(self):
+        skill_index.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def test_mutual_matches_rank_first_with_overlap(self):
+        response = self.client.get('/api/matches/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['id'] for r in response.data], [self.mutual.id, self.one_way.id])
+
+        top = response.data[0]
+        self.assertTrue(top['is_mutual'])
+        self.assertEqual(top['offers_skills_i_want'], ['Guitar'])
+        self.assertEqual(top['wants_skills_i_offer'], ['Python'])
+        self.assertEqual(top['score'], 2)
+        self.assertEqual(response.data[1]['offers_skills_i_want'], ['Chess', 'Guitar'])
+
+    def test_limit(self):
+        response = self.client.get('/api/matches/', {'limit': 1})
+        self.assertEqual(len(response.data), 1)
+
+    def test_deletes_not_yet_in_index_skipped(self):
+        pin_version_checks(self)
+        skill_index.ensure_fresh()
+        # Deleted through another worker; this index still lists them.
+        CustomUser.objects.filter(id=self.mutual.id).delete()
+        Skill.objects.filter(name='Chess').delete()
+        response = self.client.get('/api/matches/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(r['id'], r['offers_skills_i_want']) for r in response.data], [(self.one_way.id, ['Guitar'])])
+
+
+class SkillIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.python, cls.guitar = Skill.objects.create(name='Python'), Skill.objects.create(name='Guitar')
+        cls.alice = make_user('alice@example.com')
+        cls.bob = make_user('bob@example.com')
+        for user in (cls.alice, cls.bob):
+            UserSkill.objects.create(user=user, skill=cls.python, type='offered')
+        UserSkill.objects.create(user=cls.alice, skill=cls.guitar, type='offered')
+
+    def setUp(self):
+        skill_index.invalidate()
+
+    def test_intersection_served_from_memory(self):
+        pin_version_checks(self)
+        skill_index.ensure_fresh()
+        with self.assertNumQueries(0):
+            self.assertEqual(skill_index.users_offering(self.python.id), [self.alice.id, self.bob.id])
+            self.assertEqual(skill_index.users_offering(self.python.id, self.guitar.id), [self.alice.id])
+            self.assertEqual(skill_index.users_wanting(self.python.id), [])
+
+    def test_user_skill_signals_update_incrementally(self):
+        pin_version_checks(self)
+        skill_index.ensure_fresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSkill.objects.create(user=self.bob, skill=self.guitar, type='offered')
+        with self.assertNumQueries(0):
+            self.assertEqual(skill_index.users_offering(self.guitar.id), [self.alice.id, self.bob.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSkill.objects.filter(user=self.alice, skill=self.guitar).delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(skill_index.users_offering(self.guitar.id), [self.bob.id])
+
+    def test_ban_and_privacy_changes_hide_user(self):
+        skill_index.ensure_fresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob.is_banned = True
+            self.bob.save(update_fields=['is_banned'])
+        self.assertEqual(skill_index.users_offering(self.python.id), [self.alice.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob.is_banned = False
+            self.bob.save(update_fields=['is_banned'])
+        self.assertEqual(skill_index.users_offering(self.python.id), [self.alice.id, self.bob.id])
+
+    def test_unchanged_visibility_leaves_version(self):
+        # Not loaded in this worker, so only the stored flags can tell.
+        version = get_version(skill_index_module.SKILL_INDEX_VERSION_KEY)
+        bob = CustomUser.objects.get(id=self.bob.id)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            bob.is_banned = False
+            bob.save(update_fields=['is_banned'])
+        self.assertFalse([q for q in queries if 'main_userskill' in q['sql']])
+        self.assertEqual(get_version(skill_index_module.SKILL_INDEX_VERSION_KEY), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bob.is_public = False
+            bob.save(update_fields=['is_public'])
+        self.assertEqual(get_version(skill_index_module.SKILL_INDEX_VERSION_KEY), version + 1)
+
+    def test_foreign_write_detected_by_version(self):
+        skill_index.ensure_fresh()
+        # Simulate another worker: data and version change behind our back.
+        UserSkill.objects.bulk_create([UserSkill(user=self.bob, skill=self.guitar, type='wanted')])
+        bump_skill_index_version()
+        self.assertEqual(skill_index.users_wanting(self.guitar.id), [])
+
+        skill_index._checked_at = 0.0
+        self.assertEqual(skill_index.users_wanting(self.guitar.id), [self.bob.id])
+
+    def test_version_bumped_after_commit(self):
+        version = get_version(skill_index_module.SKILL_INDEX_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSkill.objects.create(user=self.bob, skill=self.guitar, type='offered')
+            self.assertEqual(get_version(skill_index_module.SKILL_INDEX_VERSION_KEY), version)
+        self.assertEqual(get_version(skill_index_module.SKILL_INDEX_VERSION_KEY), version + 1)
+
+    def test_foreign_write_applied_from_journal(self):
+        skill_index.ensure_fresh()
+        # Another worker's writes: no signal here, only the journaled bumps.
+        UserSkill.objects.bulk_create([UserSkill(user=self.bob, skill=self.guitar, type='wanted')])
+        log_change(skill_index_module.SKILL_INDEX_VERSION_KEY, [[self.bob.id, self.guitar.id, 'wanted']])
+        CustomUser.objects.filter(id=self.alice.id).update(is_public=False)
+        log_change(skill_index_module.SKILL_INDEX_VERSION_KEY, [[self.alice.id]])
+
+        with mock.patch.object(skill_index, 'check_interval', 0), self.assertNumQueries(4):
+            # version, journal, then the two users' visibility and rows
+            self.assertEqual(skill_index.users_wanting(self.guitar.id), [self.bob.id])
+        self.assertEqual(skill_index.users_offering(self.python.id), [self.bob.id])
+
+    def test_writes_during_a_rebuild_are_kept(self):
+        real_get_version = versioning_module.get_version
+
+        def get_version_then_write(key):
+            # Committed by another request while the rows are being read.
+            skill_index.add(self.bob.id, self.guitar.id, 'wanted')
+            return real_get_version(key)
+
+        with mock.patch.object(versioning_module, 'get_version', get_version_then_write):
+            self.assertEqual(skill_index.users_wanting(self.guitar.id), [self.bob.id])
+
+
+class ProximityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = make_user('me@example.com', location='New Delhi')
+        cls.noida = make_user('noida@example.com', location='Noida, Uttar Pradesh')
+        cls.gurgaon = make_user('gurgaon@example.com', location='gurgaon')
+        cls.mumbai = make_user('mumbai@example.com', location='Mumbai')
+        cls.remote = make_user('remote@example.com', location='Remote')
+        make_user('hidden@example.com', location='Delhi', is_public=False)
+        guitar = Skill.objects.create(name='Guitar')
+        UserSkill.objects.create(user=cls.me, skill=guitar, type='wanted')
+        for user in (cls.noida, cls.gurgaon, cls.mumbai):
+            UserSkill.objects.create(user=user, skill=guitar, type='offered')
+
+    def setUp(self):
+        geo_index.invalidate()
+        skill_index.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def test_locations_are_geocoded(self):
+        self.assertEqual(geocode(' bangalore '), geocode('Bengaluru'))
+        self.assertEqual(geocode('Pune, Maharashtra'), geocode('Pune'))
+        self.assertIsNone(geocode('Remote'))
+        self.assertEqual((self.me.latitude, self.me.longitude), geocode('Delhi'))
+        self.assertIsNone(self.remote.latitude)
+
+        self.remote.location = 'Mumbai'
+        self.remote.save(update_fields=['location'])
+        self.remote.refresh_from_db()
+        self.assertEqual((self.remote.latitude, self.remote.longitude), geocode('Mumbai'))
+
+    def test_directory_near_me(self):
+        response = self.client.get('/api/all-users/', {'near_km': 22})
+        self.assertEqual(response.status_code, 200)
+        rows = {row['id']: row['distance_km'] for row in response.data['results']}
+        self.assertEqual(set(rows), {self.me.id, self.noida.id})
+        self.assertEqual(rows[self.me.id], 0.0)
+        self.assertAlmostEqual(rows[self.noida.id], 19.9, delta=0.5)
+
+        response = self.client.get('/api/all-users/', {'near_km': 30})
+        self.assertEqual({row['id'] for row in response.data['results']}, {self.me.id, self.noida.id, self.gurgaon.id})
+
+    def test_directory_near_me_pages_bind_one_page_of_ids(self):
+        seen, url, params = [], '/api/all-users/', {'near_km': 30, 'page_size': 1}
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            page_query = [q['sql'] for q in queries if 'main_customuser' in q['sql'] and ' IN (' in q['sql']][-1]
+            # The page of ids plus the one that tells whether there is a next page.
+            self.assertLessEqual(page_query.split(' IN (')[1].split(')')[0].count(','), 1)
+            seen += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        self.assertEqual(seen, [self.me.id, self.noida.id, self.gurgaon.id])
+
+        previous = self.client.get(response.data['previous']).data
+        self.assertEqual([row['id'] for row in previous['results']], [self.noida.id])
+
+    def walk_near(self, **params):
+        seen, url, params = [], '/api/all-users/', {'near_km': 30, 'page_size': 1, **params}
+        while url:
+            response = self.client.get(url, params)
+            seen += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        return seen
+
+    def test_unlisted_ids_the_index_still_shows_do_not_end_the_walk(self):
+        pin_version_checks(self)
+        skill_index.ensure_fresh()
+        # Banned with .update(): no signal, so the skill index still lists them.
+        CustomUser.objects.filter(id=self.noida.id).update(is_banned=True)
+        self.assertEqual(self.walk_near(), [self.me.id, self.gurgaon.id])
+
+        call_command('rebuild_directory_cards', stdout=StringIO())
+        with override_settings(DIRECTORY_CARDS=True):
+            self.assertEqual(self.walk_near(), [self.me.id, self.gurgaon.id])
+
+    def test_directory_cards_near_me(self):
+        call_command('rebuild_directory_cards', stdout=StringIO())
+        with override_settings(DIRECTORY_CARDS=True):
+            response = self.client.get('/api/all-users/', {'near_km': 22})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.me.id, self.noida.id])
+
+    def test_matches_near_me(self):
+        response = self.client.get('/api/matches/', {'near_km': 30})
+        self.assertEqual([r['id'] for r in response.data], [self.noida.id, self.gurgaon.id])
+        self.assertIn('distance_km', response.data[0])
+        self.assertEqual(len(self.client.get('/api/matches/').data), 3)
+
+    def test_invalid_requests(self):
+        for radius in ('abc', '0', '-5', '501', 'nan'):
+            response = self.client.get('/api/all-users/', {'near_km': radius})
+            self.assertEqual(response.status_code, 400, radius)
+        self.client.force_authenticate(self.remote)
+        response = self.client.get('/api/matches/', {'near_km': 10})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('detail', response.data)
+
+    def test_only_nearby_cells_are_measured(self):
+        geo_index.ensure_fresh()
+        with mock.patch.object(geo_index_module, 'distance_km', wraps=geo_index_module.distance_km) as measure:
+            geo_index.near(geocode('Delhi'), 30)
+        # New Delhi, Noida and Gurgaon, once each: the hidden user shares the
+        # first place with me. Mumbai is never measured.
+        self.assertEqual(measure.call_count, 3)
+
+    def test_moves_during_a_reload_are_kept(self):
+        geo_index.ensure_fresh()
+        real_get_version = versioning_module.get_version
+
+        def get_version_then_move(key):
+            # Committed by another request while the rows are being read.
+            geo_index.set(self.mumbai.id, geocode('Noida'))
+            return real_get_version(key)
+
+        with mock.patch.object(geo_index, 'reload_interval', 0), \
+                mock.patch.object(versioning_module, 'get_version', get_version_then_move):
+            self.assertIn(self.mumbai.id, geo_index.near(geocode('Noida'), 5))
+
+    def test_moves_update_index_without_rebuild(self):
+        pin_version_checks(self)
+        hidden = CustomUser.objects.get(email='hidden@example.com')
+        geo_index.ensure_fresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mumbai.location = 'Noida'
+            self.mumbai.save()
+            self.noida.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(set(geo_index.near(geocode('Delhi'), 22)), {self.me.id, hidden.id, self.mumbai.id})
+            self.assertEqual(geo_index.point(self.mumbai.id), geocode('Noida'))
+
+        # Saves that leave the place alone do not touch the shared version.
+        version = get_version(geo_index_module.GEO_INDEX_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gurgaon.availability = 'Weekends'
+            self.gurgaon.save()
+        self.assertEqual(get_version(geo_index_module.GEO_INDEX_VERSION_KEY), version)
+
+    def test_sign_ups_elsewhere_added_without_rebuild(self):
+        geo_index.ensure_fresh()
+        version = get_version(geo_index_module.GEO_INDEX_VERSION_KEY)
+        # Registered through another worker: its on-commit write never runs here.
+        newcomer = make_user('newcomer@example.com', location='Noida')
+        self.assertEqual(get_version(geo_index_module.GEO_INDEX_VERSION_KEY), version)
+        with mock.patch.object(geo_index, 'check_interval', 0), self.assertNumQueries(2):
+            # version, then only the users registered since
+            self.assertIn(newcomer.id, geo_index.near(geocode('Noida'), 5))
+
+
+class SkillAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('user@example.com')
+        other = make_user('other@example.com')
+        cls.python = Skill.objects.create(name='Python')
+        cls.pytorch = Skill.objects.create(name='PyTorch')
+        Skill.objects.create(name='Pottery')
+        Skill.objects.create(name='Guitar')
+        UserSkill.objects.create(user=cls.user, skill=cls.pytorch, type='offered')
+        UserSkill.objects.create(user=other, skill=cls.pytorch, type='wanted')
+        UserSkill.objects.create(user=other, skill=cls.python, type='offered')
+
+    def setUp(self):
+        skill_autocomplete.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_prefix_ranked_by_usage(self):
+        response = self.client.get('/api/skills/autocomplete/', {'q': ' PY'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['name'] for r in response.data], ['PyTorch', 'Python'])
+        self.assertEqual(response.data[0]['usage_count'], 2)
+
+        response = self.client.get('/api/skills/autocomplete/', {'q': 'p', 'limit': 1})
+        self.assertEqual([r['name'] for r in response.data], ['PyTorch'])
+
+    def test_new_skill_indexed_without_rebuild(self):
+        pin_version_checks(self)
+        skill_autocomplete.search('g')
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Go')
+        with self.assertNumQueries(0):
+            self.assertEqual([r['name'] for r in skill_autocomplete.search('g')], ['Go', 'Guitar'])
+
+    def test_skills_created_elsewhere_read_by_id(self):
+        skill_autocomplete.search('p')
+        # Created through another worker: no signal reaches this index, and
+        # creates do not bump the version.
+        pottery_wheel = Skill.objects.bulk_create([Skill(name='Pottery Wheel', key='pottery wheel')])[0]
+        UserSkill.objects.create(user=self.user, skill=pottery_wheel, type='wanted')
+        with mock.patch.object(skill_autocomplete, 'check_interval', 0), \
+                CaptureQueriesContext(connection) as queries:
+            results = skill_autocomplete.search('p')
+        # version, then only the skills created since, with their usage
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([(r['name'], r['usage_count']) for r in results],
+                         [('PyTorch', 2), ('Pottery Wheel', 1), ('Python', 1), ('Pottery', 0)])
+
+    def test_rename_elsewhere_keeps_usage_counts(self):
+        skill_autocomplete.search('p')
+        Skill.objects.filter(id=self.python.id).update(name='Pythonic', key='pythonic')
+        bump_version(skill_autocomplete_module.SKILL_VOCABULARY_VERSION_KEY)
+        with mock.patch.object(skill_autocomplete, 'check_interval', 0), \
+                CaptureQueriesContext(connection) as queries:
+            results = skill_autocomplete.search('pyth')
+        # version, skill rows; no skill needed counting
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([(r['name'], r['usage_count']) for r in results], [('Pythonic', 1)])
+
+    def test_rename_applied_in_place(self):
+        pin_version_checks(self)
+        skill_autocomplete.search('p')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pytorch.name = 'Torch'
+            self.pytorch.save()
+        with self.assertNumQueries(0):
+            self.assertEqual([r['name'] for r in skill_autocomplete.search('p')], ['Python', 'Pottery'])
+            self.assertEqual(skill_autocomplete.search('torch')[0]['usage_count'], 2)
+
+    def test_writes_during_a_build_are_kept(self):
+        real_get_version = versioning_module.get_version
+
+        def get_version_then_write(key):
+            # Committed by another request while the rows are being read.
+            skill_autocomplete.adjust_usage(self.python.id, 5)
+            return real_get_version(key)
+
+        with mock.patch.object(versioning_module, 'get_version', get_version_then_write):
+            results = skill_autocomplete.search('python')
+        self.assertEqual(results[0]['usage_count'], 6)
+
+
+class AuthStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('user@example.com')
+        cls.admin = make_user('admin@example.com', is_staff=True)
+
+    def setUp(self):
+        auth_state.invalidate()
+        platform_messages.invalidate()
+
+    def client_for(self, user):
+        return APIClient(HTTP_AUTHORIZATION=f'Bearer {generate_jwt(user)}')
+
+    def test_repeat_requests_skip_user_lookup(self):
+        pin_version_checks(self)
+        client = self.client_for(self.user)
+        # auth version, flagged users, id range and gaps, messages version,
+        # stats and page; then all from memory
+        with self.assertNumQueries(7):
+            client.get('/api/admin-messages/')
+        with self.assertNumQueries(0):
+            client.get('/api/admin-messages/')
+        # Staff status comes from the same state; the one query is the page.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client_for(self.admin).get('/api/monitor-swap-requests/').status_code, 200)
+
+    def test_ban_takes_effect_on_commit(self):
+        pin_version_checks(self)
+        client = self.client_for(self.user)
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+
+        admin = self.client_for(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = admin.post('/api/ban-user/', {'user_id': self.user.id, 'is_banned': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get('/api/admin-messages/').status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.post('/api/ban-user/', {'user_id': self.user.id, 'is_banned': False}, format='json')
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+
+    def test_ban_by_another_worker_noticed_by_version(self):
+        client = self.client_for(self.user)
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+
+        # Written elsewhere: no signal reaches this worker's state.
+        CustomUser.objects.filter(id=self.user.id).update(is_banned=True)
+        bump_version(AUTH_STATE_VERSION_KEY)
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+        with mock.patch.object(auth_state, 'check_interval', 0):
+            self.assertEqual(client.get('/api/admin-messages/').status_code, 403)
+
+    def test_unsignalled_ban_noticed_on_periodic_reload(self):
+        pin_version_checks(self)
+        client = self.client_for(self.user)
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+
+        # No signal and no version bump.
+        CustomUser.objects.filter(id=self.user.id).update(is_banned=True)
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+        with mock.patch.object(auth_state, 'reload_interval', 0):
+            self.assertEqual(client.get('/api/admin-messages/').status_code, 403)
+
+    def test_profile_edits_do_not_bump_version(self):
+        self.client_for(self.user).get('/api/admin-messages/')
+        version = get_version(AUTH_STATE_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.location = 'Lisbon'
+            self.user.save()
+            make_user('new@example.com')
+        self.assertEqual(get_version(AUTH_STATE_VERSION_KEY), version)
+
+    def test_refresh(self):
+        refresh = generate_refresh_jwt(self.user)
+        # A refresh token is not an access token.
+        self.assertEqual(APIClient(HTTP_AUTHORIZATION=f'Bearer {refresh}').get('/api/admin-messages/').status_code, 403)
+
+        response = APIClient().post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        client = APIClient(HTTP_AUTHORIZATION=f'Bearer {response.data["token"]}')
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+
+        response = APIClient().post('/api/token/refresh/', {'refresh': response.data['token']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+        CustomUser.objects.filter(id=self.user.id).update(is_banned=True)
+        response = APIClient().post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_deleted_user_rejected(self):
+        pin_version_checks(self)
+        gone = make_user('gone@example.com')
+        client = self.client_for(gone)
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            gone.delete()
+        response = client.post('/api/update-skills/', {'add_offered': ['Go']}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'], 'User not found')
+
+    def test_deleted_user_noticed_on_reload(self):
+        # Deleted elsewhere, leaving a gap in the ids.
+        gone = make_user('gone@example.com')
+        make_user('after@example.com')
+        client = self.client_for(gone)
+        CustomUser.objects.filter(id=gone.id).delete()
+        self.assertEqual(client.get('/api/admin-messages/').status_code, 401)
+        self.assertEqual(self.client_for(self.user).get('/api/admin-messages/').status_code, 200)
+
+    def test_users_registered_elsewhere_are_checked_once(self):
+        pin_version_checks(self)
+        self.client_for(self.user).get('/api/admin-messages/')
+        # Registered through another worker after this one loaded its state.
+        newcomer = CustomUser.objects.bulk_create([CustomUser(email='new@example.com', full_name='New')])[0]
+        client = self.client_for(newcomer)
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get('/api/admin-messages/').status_code, 200)
+        CustomUser.objects.filter(id=newcomer.id).delete()
+        self.assertEqual(self.client_for(CustomUser(id=newcomer.id + 1)).get('/api/admin-messages/').status_code, 401)
+
+    def test_untyped_tokens_rejected(self):
+        # Issued before tokens carried a type; it may be a 100-day refresh token.
+        token = jwt.encode({'user_id': self.user.id, 'email': self.user.email,
+                            'exp': datetime.utcnow() + timedelta(days=1)}, SECRET_KEY, algorithm='HS256')
+        response = APIClient(HTTP_AUTHORIZATION=f'Bearer {token}').get('/api/admin-messages/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['detail'], 'Invalid or expired token')
+
+    def test_login_returns_refresh_token(self):
+        response = APIClient().post('/api/login/', {'email': 'user@example.com', 'password': 'pass12345'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = APIClient().post('/api/token/refresh/', {'refresh': response.data['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class UpdateSkillsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('user@example.com')
+        cls.chess = Skill.objects.create(name='Chess')
+        UserSkill.objects.create(user=cls.user, skill=cls.chess, type='offered')
+
+    def setUp(self):
+        skill_index.invalidate()
+        skill_keys.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def user_skills(self, skill_type):
+        return set(UserSkill.objects.filter(user=self.user, type=skill_type).values_list('skill__name', flat=True))
+
+    def test_adds_and_removes_in_one_pass(self):
+        response = self.client.post('/api/update-skills/', {
+            'add_offered': ['Python', ' Go ', '', 'Python', 'Chess'],
+            'remove_offered': ['Chess', 'Unknown'],
+            'add_wanted': ['Guitar'],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_skills('offered'), {'Python', 'Go'})
+        self.assertEqual(self.user_skills('wanted'), {'Guitar'})
+        self.assertFalse(Skill.objects.filter(name='Unknown').exists())
+
+    def test_query_count_does_not_grow_with_skill_count(self):
+        pin_version_checks(self)
+        def post(names):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post('/api/update-skills/', {'add_offered': names}, format='json')
+            return len(ctx.captured_queries)
+
+        skill_keys.get_many(())  # reads the version once
+        few = post([f'Skill {i}' for i in range(2)])
+        many = post([f'Skill {i}' for i in range(100, 130)])
+        self.assertEqual(few, many)
+
+    def test_spellings_resolve_to_one_skill(self):
+        response = self.client.post('/api/update-skills/', {
+            'add_offered': ['python', ' PYTHON ', 'Machine  learning'],
+            'add_wanted': ['machine learning'],
+            'remove_offered': ['CHESS'],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_skills('offered'), {'python', 'Machine  learning'})
+        self.assertEqual(self.user_skills('wanted'), {'Machine  learning'})
+        self.assertEqual(Skill.objects.get(name='Machine  learning').key, 'machine learning')
+
+    def test_known_skills_resolve_without_skill_queries(self):
+        pin_version_checks(self)
+        Skill.objects.create(name='Python')
+        with self.captureOnCommitCallbacks(execute=True):  # the first request caches the keys
+            self.client.post('/api/update-skills/', {'remove_wanted': ['python', 'chess']}, format='json')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/update-skills/', {
+                'add_offered': ['PYTHON'], 'remove_offered': ['chess'],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if '"main_skill"' in q['sql']])
+        self.assertEqual(self.user_skills('offered'), {'Python'})
+
+    def test_post_save_sent_only_for_rows_inserted_here(self):
+        saved = []
+        def record(sender, instance, created, **kwargs):
+            saved.append((sender.__name__, getattr(instance, 'name', None) or instance.skill.name, created))
+        for sender in (Skill, UserSkill):
+            post_save.connect(record, sender=sender)
+            self.addCleanup(post_save.disconnect, record, sender=sender)
+        Skill.objects.bulk_create([Skill(name='Go', key='go')])
+        lookups = []
+        filter_skills = Skill.objects.filter
+        def filter_before_go_was_inserted(*args, **kwargs):
+            # The first lookup ran before a concurrent request inserted Go.
+            lookups.append(kwargs)
+            return Skill.objects.none() if len(lookups) == 1 else filter_skills(*args, **kwargs)
+
+        with mock.patch.object(Skill.objects, 'filter', filter_before_go_was_inserted):
+            response = self.client.post('/api/update-skills/', {'add_offered': ['Go', 'Rust', 'Chess']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_skills('offered'), {'Chess', 'Go', 'Rust'})
+        self.assertEqual(sorted(saved), [('Skill', 'Rust', True), ('UserSkill', 'Go', True), ('UserSkill', 'Rust', True)])
+
+    def test_skill_index_sees_bulk_adds(self):
+        skill_index.ensure_fresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/update-skills/', {'add_wanted': ['Guitar']}, format='json')
+        guitar = Skill.objects.get(name='Guitar')
+        self.assertEqual(skill_index.users_wanting(guitar.id), [self.user.id])
+
+
+class CreateSwapRequestViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.requester = make_user('requester@example.com')
+        cls.receivers = [make_user(f'receiver{i}@example.com') for i in range(3)]
+        Skill.objects.create(name='Python')
+
+    def setUp(self):
+        skill_keys.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.requester)
+
+    def test_single_receiver(self):
+        response = self.client.post('/api/create-swap-request/', {
+            'receiver_id': self.receivers[0].id,
+            'offered_skills': ['Python', ' Python '],
+            'wanted_skills': ['Guitar'],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        swap = SwapRequest.objects.get(receiver=self.receivers[0])
+        self.assertEqual(list(swap.offered_skills.values_list('skill__name', flat=True)), ['Python'])
+        self.assertEqual(list(swap.wanted_skills.values_list('skill__name', flat=True)), ['Guitar'])
+
+    def test_broadcast_uses_constant_queries(self):
+        pin_version_checks(self)
+        payload = {'offered_skills': ['Python', 'Go'], 'wanted_skills': ['Guitar', 'Chess']}
+
+        def post(receivers):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post('/api/create-swap-request/', {
+                    **payload, 'receiver_ids': [r.id for r in receivers],
+                }, format='json')
+            self.assertEqual(response.status_code, 201)
+            return len(ctx.captured_queries)
+
+        post(self.receivers[:1])  # creates the missing skills
+        self.assertEqual(post(self.receivers[:1]), post(self.receivers))
+        self.assertEqual(SwapRequest.objects.filter(requester=self.requester).count(), 5)
+        self.assertEqual(SwapRequestWantedSkill.objects.count(), 10)
+
+    def test_known_skills_resolve_without_skill_queries(self):
+        pin_version_checks(self)
+        Skill.objects.create(name='Guitar')
+        with self.captureOnCommitCallbacks(execute=True):  # the first request caches the keys
+            self.client.post('/api/create-swap-request/', {
+                'receiver_id': self.receivers[1].id, 'offered_skills': ['Python'], 'wanted_skills': ['Guitar'],
+            }, format='json')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/create-swap-request/', {
+                'receiver_id': self.receivers[0].id, 'offered_skills': ['python'], 'wanted_skills': [' guitar'],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse([q for q in ctx.captured_queries if '"main_skill"' in q['sql']])
+        self.assertEqual(Skill.objects.count(), 2)
+
+    def test_unknown_receiver_creates_nothing(self):
+        response = self.client.post('/api/create-swap-request/', {
+            'receiver_ids': [self.receivers[0].id, 999999],
+            'offered_skills': ['Python'], 'wanted_skills': ['Guitar'],
+        }, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(SwapRequest.objects.exists())
+
+    def test_requires_exactly_one_receiver_mode(self):
+        response = self.client.post('/api/create-swap-request/', {
+            'receiver_id': self.receivers[0].id, 'receiver_ids': [self.receivers[1].id],
+            'offered_skills': ['Python'], 'wanted_skills': ['Guitar'],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SkillKeyMigrationTests(TransactionTestCase):
+    before = [('main', '0015_skill_key')]
+    after = [('main', '0017_alter_skill_key')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged_into_oldest_skill(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('main', 'CustomUser')
+        Skill = apps.get_model('main', 'Skill')
+        UserSkill = apps.get_model('main', 'UserSkill')
+        SwapRequest = apps.get_model('main', 'SwapRequest')
+        Offered = apps.get_model('main', 'SwapRequestOfferedSkill')
+
+        alice, bob = (User.objects.create(email=f'{n}@example.com', full_name=n) for n in ('alice', 'bob'))
+        python, lower, spaced, go = (Skill.objects.create(name=n) for n in ('Python', 'python', ' PYTHON ', 'Go'))
+        UserSkill.objects.create(user=alice, skill=python, type='offered')
+        UserSkill.objects.create(user=alice, skill=lower, type='offered')
+        UserSkill.objects.create(user=alice, skill=spaced, type='wanted')
+        UserSkill.objects.create(user=bob, skill=lower, type='offered')
+        swap = SwapRequest.objects.create(requester=alice, receiver=bob)
+        Offered.objects.create(swap_request=swap, skill=lower)
+        Offered.objects.create(swap_request=swap, skill=spaced)
+
+        self.migrate(self.after)
+        self.assertEqual(
+            list(Skill.objects.order_by('id').values_list('id', 'name', 'key')),
+            [(python.id, 'Python', 'python'), (go.id, 'Go', 'go')],
+        )
+        self.assertEqual(
+            set(UserSkill.objects.values_list('user__email', 'skill_id', 'type')),
+            {('alice@example.com', python.id, 'offered'), ('alice@example.com', python.id, 'wanted'),
+             ('bob@example.com', python.id, 'offered')},
+        )
+        self.assertEqual(list(SwapRequestOfferedSkill.objects.values_list('skill_id', flat=True)), [python.id])
+
+
+class UserSwapRequestsSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('user@example.com')
+        cls.others = [make_user(f'other{i}@example.com') for i in range(5)]
+        python, guitar = Skill.objects.create(name='Python'), Skill.objects.create(name='Guitar')
+        for other in cls.others:
+            swap = SwapRequest.objects.create(requester=other, receiver=cls.user)
+            SwapRequestOfferedSkill.objects.create(swap_request=swap, skill=python)
+            SwapRequestWantedSkill.objects.create(swap_request=swap, skill=guitar)
+        SwapRequest.objects.create(requester=cls.others[0], receiver=cls.others[1])
+        settle_swaps()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_full_sync_query_count(self):
+        pin_version_checks(self)
+        # etag aggregate + swaps with participants + offered + wanted skills
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/my-swap-requests/')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual(response.data['results'][0]['offered_skills'], ['Python'])
+        self.assertEqual(response.data['results'][0]['wanted_skills'], ['Guitar'])
+
+    def test_since_returns_only_changes(self):
+        cursor = self.client.get('/api/my-swap-requests/').data['cursor']
+        response = self.client.get('/api/my-swap-requests/', {'since': cursor})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['cursor'], cursor)
+
+        swap = SwapRequest.objects.filter(receiver=self.user).first()
+        self.client.post(f'/api/update-swap-request-status/{swap.id}/', {'status': 'accepted'}, format='json')
+        response = self.client.get('/api/my-swap-requests/', {'since': cursor})
+        self.assertEqual([(r['id'], r['status']) for r in response.data['results']], [(swap.id, 'accepted')])
+
+    def test_has_more(self):
+        with mock.patch.object(SwapSyncPagination, 'page_size', 3):
+            first = self.client.get('/api/my-swap-requests/').data
+            second = self.client.get('/api/my-swap-requests/', {'since': first['cursor']}).data
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        ids = [r['id'] for r in first['results'] + second['results']]
+        self.assertEqual(sorted(ids), sorted(SwapRequest.objects.filter(receiver=self.user).values_list('id', flat=True)))
+
+    def test_not_modified(self):
+        pin_version_checks(self)
+        etag = self.client.get('/api/my-swap-requests/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/my-swap-requests/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        SwapRequest.objects.create(requester=self.others[2], receiver=self.user)
+        response = self.client.get('/api/my-swap-requests/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_cursor_waits_for_late_commits(self):
+        cursor = self.client.get('/api/my-swap-requests/').data['cursor']
+        fresh = SwapRequest.objects.create(requester=self.others[2], receiver=self.user)
+        response = self.client.get('/api/my-swap-requests/', {'since': cursor}).data
+        self.assertEqual([r['id'] for r in response['results']], [fresh.id])
+        # Fresh rows are sent, but the cursor does not pass them yet.
+        self.assertEqual(response['cursor'], cursor)
+
+        # Stamped before the fresh row, but committed after it was read.
+        late = SwapRequest.objects.create(requester=self.others[3], receiver=self.user)
+        SwapRequest.objects.filter(id=late.id).update(updated_at=fresh.updated_at - timedelta(milliseconds=1))
+        response = self.client.get('/api/my-swap-requests/', {'since': response['cursor']}).data
+        self.assertEqual([r['id'] for r in response['results']], [late.id, fresh.id])
+
+        # Once settled they are sent one last time and the cursor moves on.
+        settle_swaps()
+        response = self.client.get('/api/my-swap-requests/', {'since': response['cursor']}).data
+        self.assertEqual([r['id'] for r in response['results']], [late.id, fresh.id])
+        self.assertEqual(self.client.get('/api/my-swap-requests/', {'since': response['cursor']}).data['results'], [])
+
+    def test_invalid_since(self):
+        response = self.client.get('/api/my-swap-requests/', {'since': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PlatformMessageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin@example.com', is_staff=True)
+        PlatformMessage.objects.bulk_create([PlatformMessage(title=f'Message {i}', body='Body') for i in range(3)])
+
+    def setUp(self):
+        platform_messages.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_conditional_requests_skip_the_db(self):
+        pin_version_checks(self)
+        response = self.client.get('/api/admin-messages/')
+        self.assertEqual(len(response.data['results']), 3)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/admin-messages/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/api/admin-post-message/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_invalidates(self):
+        etag = self.client.get('/api/admin-messages/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/admin-post-message/', {'title': 'New', 'body': 'Hello'}, format='json')
+        response = self.client.get('/api/admin-messages/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['title'], 'New')
+
+    def test_other_workers_writes_noticed_on_version_check(self):
+        etag = self.client.get('/api/admin-messages/')['ETag']
+        # As written by another worker: no local invalidation, only the bump.
+        PlatformMessage.objects.bulk_create([PlatformMessage(title='Elsewhere', body='Body')])
+        bump_version(PLATFORM_MESSAGES_VERSION_KEY)
+        self.assertEqual(self.client.get('/api/admin-messages/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch.object(platform_messages, 'check_interval', 0):
+            response = self.client.get('/api/admin-messages/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_paginated(self):
+        response = self.client.get('/api/admin-messages/', {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class FastRowsContractTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('viewer@example.com')
+        skills = [Skill.objects.create(name=name) for name in ('Zebra care', 'Ångström', 'C++', '日本語')]
+        people = [
+            make_user('anna@example.com', location=None, availability='Evenings\u2028late'),
+            make_user('bob@example.com', location='Berlin'),
+            # No rating summary row at all.
+            CustomUser.objects.create_user(email='carol@example.com', full_name='Carol', password='pass12345'),
+        ]
+        CustomUser.objects.filter(id=people[0].id).update(full_name='Anna "Quote" Ñ')
+        UserRatingSummary.objects.filter(user=people[1]).update(rating_sum=14, total_reviews=3)
+        for person in people + [cls.user]:
+            for skill in reversed(skills):
+                UserSkill.objects.create(user=person, skill=skill, type='offered')
+            UserSkill.objects.create(user=person, skill=skills[0], type='wanted')
+        for i, person in enumerate(people):
+            swap = SwapRequest.objects.create(requester=person, receiver=cls.user, message=f'Hi \u2029 <{i}> "x"',
+                                              status=['pending', 'accepted', 'cancelled'][i])
+            for skill in skills[i:]:
+                SwapRequestOfferedSkill.objects.create(swap_request=swap, skill=skill)
+            SwapRequestWantedSkill.objects.create(swap_request=swap, skill=skills[-1])
+        SwapRequest.objects.create(requester=cls.user, receiver=people[0])
+        settle_swaps()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertSameBytes(self, path, **params):
+        with self.settings(FAST_LIST_RESPONSES=False):
+            expected = self.client.get(path, params)
+        with self.settings(FAST_LIST_RESPONSES=True):
+            actual = self.client.get(path, params)
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.content, expected.content)
+        return actual
+
+    def test_all_users(self):
+        response = self.assertSameBytes('/api/all-users/')
+        self.assertIn(b'\\u2028', response.content)
+        self.assertSameBytes('/api/all-users/', page_size=2)
+
+    def test_my_swap_requests(self):
+        self.assertSameBytes('/api/my-swap-requests/')
+        with mock.patch.object(SwapSyncPagination, 'page_size', 2):
+            cursor = self.assertSameBytes('/api/my-swap-requests/').json()['cursor']
+            self.assertSameBytes('/api/my-swap-requests/', since=cursor)
+
+    def test_fast_path_queries(self):
+        pin_version_checks(self)
+        with self.settings(FAST_LIST_RESPONSES=True):
+            # users page + grouped skills
+            with self.assertNumQueries(2):
+                self.client.get('/api/all-users/')
+            # etag aggregate + swaps page + offered + wanted
+            with self.assertNumQueries(4):
+                self.client.get('/api/my-swap-requests/')
+
+    def test_renderer_matches_json_renderer(self):
+        from decimal import Decimal
+        from django.utils import timezone
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+        data = {
+            'text': 'ünïcode \u2028 \u2029 "q" \\ </script>', 'int': 2 ** 70, 'float': 4.67, 'none': None,
+            'decimal': Decimal('1.50'), 'when': timezone.now(), 'nested': [{'a': [1, 2, {}]}, True],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(data['nested']), JSONRenderer().render(data['nested']))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class DirectoryCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = make_user('viewer@example.com')
+        cls.python = Skill.objects.create(name='Python')
+        cls.people = [make_user(f'user{i}@example.com', location='Oslo') for i in range(5)]
+        for person in cls.people:
+            UserSkill.objects.create(user=person, skill=cls.python, type='offered')
+        UserRatingSummary.objects.filter(user=cls.people[0]).update(rating_sum=9, total_reviews=2)
+        make_user('hidden@example.com', is_public=False)
+        CustomUser.objects.create_user(email='nosummary@example.com', full_name='No Summary', password='pass12345')
+        call_command('rebuild_directory_cards', batch_size=3, stdout=StringIO())
+
+    def setUp(self):
+        skill_keys.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def assertCardsMatch(self, **params):
+        with self.settings(DIRECTORY_CARDS=False):
+            expected = self.client.get('/api/all-users/', params)
+        with self.settings(DIRECTORY_CARDS=True):
+            actual = self.client.get('/api/all-users/', params)
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.content, expected.content)
+        return actual
+
+    def test_cards_match_serializer(self):
+        pin_version_checks(self)
+        self.assertCardsMatch()
+        next_url = self.assertCardsMatch(page_size=3).data['next']
+        with self.settings(DIRECTORY_CARDS=True):
+            # One range scan over the listed cards.
+            with self.assertNumQueries(1):
+                response = self.client.get(next_url)
+        self.assertEqual(len(response.data['results']), 3)
+
+    @override_settings(DIRECTORY_CARDS=True)
+    def test_cards_follow_writes(self):
+        person = self.people[1]
+        client = APIClient()
+        client.force_authenticate(person)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/update-skills/', {'add_wanted': ['Rust'], 'remove_offered': ['Python']}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            person.location = 'Bergen'
+            person.save()
+        swap = SwapRequest.objects.create(requester=self.people[2], receiver=person, status='accepted')
+        client.force_authenticate(self.people[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/feedback-rating/', {'swap_request': swap.id, 'rating': 4, 'comment': 'Great'},
+                                   format='json')
+        self.assertEqual(response.status_code, 201)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.people[3].is_banned = True
+            self.people[3].save(update_fields=['is_banned'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.filter(id=self.python.id).update(name='Python 3')
+            Skill.objects.get(id=self.python.id).save()
+
+        card = DirectoryCard.objects.get(user=person)
+        self.assertEqual(card.payload['location'], 'Bergen')
+        self.assertEqual((card.payload['offered_skills'], card.payload['wanted_skills']), ([], ['Rust']))
+        self.assertEqual((card.payload['average_rating'], card.payload['total_reviews']), (4.0, 1))
+        self.assertFalse(DirectoryCard.objects.get(user=self.people[3]).is_listed)
+        self.assertEqual(DirectoryCard.objects.get(user=self.people[0]).payload['offered_skills'], ['Python 3'])
+        self.assertCardsMatch()
+
+    @override_settings(DIRECTORY_CARDS=True)
+    def test_bulk_writes_refresh_once(self):
+        pin_version_checks(self)
+        client = APIClient()
+        client.force_authenticate(self.people[1])
+        with self.captureOnCommitCallbacks() as callbacks:
+            client.post('/api/update-skills/', {'add_offered': ['A', 'B', 'C'], 'add_wanted': ['D']}, format='json')
+        with CaptureQueriesContext(connection) as ctx:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(sum('main_directorycard' in q['sql'] for q in ctx.captured_queries), 1)
+
+    @override_settings(DIRECTORY_CARDS=True)
+    def test_sign_up_refreshes_once(self):
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post('/api/register/', {
+                'full_name': 'New', 'email': 'new@example.com', 'password': 'pass12345'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sum('main_directorycard' in q['sql'] for q in ctx.captured_queries), 1)
+        self.assertTrue(DirectoryCard.objects.get(user__email='new@example.com').is_listed)
+
+    def test_writes_leave_cards_alone_when_off(self):
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            APIClient().post('/api/register/', {
+                'full_name': 'New', 'email': 'new@example.com', 'password': 'pass12345'}, format='json')
+            self.people[1].location = 'Bergen'
+            self.people[1].save()
+        self.assertFalse([q for q in ctx.captured_queries if 'main_directorycard' in q['sql']])
+
+    def test_rebuild_command_repairs_drift(self):
+        DirectoryCard.objects.filter(user=self.people[0]).delete()
+        DirectoryCard.objects.filter(user=self.people[1]).update(payload={'stale': True}, is_listed=False)
+        call_command('rebuild_directory_cards', batch_size=2, stdout=StringIO())
+        self.assertEqual(DirectoryCard.objects.count(), CustomUser.objects.count())
+        self.assertCardsMatch()
+
+
+class RatingSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reviewer = make_user('reviewer@example.com')
+        cls.reviewee = make_user('reviewee@example.com')
+
+    def accepted_swap(self):
+        return SwapRequest.objects.create(requester=self.reviewer, receiver=self.reviewee, status='accepted')
+
+    def test_feedback_accumulates_exact_totals(self):
+        client = APIClient()
+        client.force_authenticate(self.reviewer)
+        for rating in (5, 4, 4):
+            response = client.post('/api/feedback-rating/', {
+                'swap_request': self.accepted_swap().id, 'rating': rating, 'comment': 'Great',
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+
+        summary = UserRatingSummary.objects.get(user=self.reviewee)
+        self.assertEqual((summary.rating_sum, summary.total_reviews), (13, 3))
+        self.assertEqual(summary.average_rating, 4.33)
+
+    def test_rebuild_command(self):
+        for rating in (1, 2):
+            Feedback.objects.create(swap_request=self.accepted_swap(), reviewer=self.reviewer,
+                                    reviewee=self.reviewee, rating=rating)
+        UserRatingSummary.objects.filter(user=self.reviewer).delete()
+        UserRatingSummary.objects.filter(user=self.reviewee).update(rating_sum=40, total_reviews=9)
+
+        call_command('rebuild_rating_summaries', batch_size=1, stdout=StringIO())
+
+        summary = UserRatingSummary.objects.get(user=self.reviewee)
+        self.assertEqual((summary.rating_sum, summary.total_reviews), (3, 2))
+        self.assertEqual(UserRatingSummary.objects.get(user=self.reviewer).total_reviews, 0)
+
+
+class UserProfileCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner@example.com')
+        cls.viewer = make_user('viewer@example.com')
+        UserSkill.objects.create(user=cls.owner, skill=Skill.objects.create(name='Python'), type='offered')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def view_profile(self, client=None):
+        return (client or self.client).post('/api/user-profile/', {'user_id': self.owner.id}, format='json')
+
+    def test_repeat_views_only_check_version(self):
+        pin_version_checks(self)
+        first = self.view_profile()
+        self.assertEqual(first.data['offered_skills'], ['Python'])
+        with self.assertNumQueries(1):
+            second = self.view_profile()
+        self.assertEqual(second.data, first.data)
+
+    def test_is_self_computed_per_viewer(self):
+        self.assertFalse(self.view_profile().data['is_self'])
+        owner_client = APIClient()
+        owner_client.force_authenticate(self.owner)
+        self.assertTrue(self.view_profile(owner_client).data['is_self'])
+
+    def test_writes_invalidate(self):
+        self.view_profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSkill.objects.create(user=self.owner, skill=Skill.objects.create(name='Go'), type='wanted')
+        self.assertEqual(self.view_profile().data['wanted_skills'], ['Go'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.is_banned = True
+            self.owner.save(update_fields=['is_banned'])
+        self.assertEqual(self.view_profile().status_code, 403)
+
+
+class UserFeedbackStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reviewer = make_user('reviewer@example.com')
+        cls.reviewee = make_user('reviewee@example.com')
+        for i in range(25):
+            swap = SwapRequest.objects.create(requester=cls.reviewer, receiver=cls.reviewee, status='accepted')
+            Feedback.objects.create(swap_request=swap, reviewer=cls.reviewer, reviewee=cls.reviewee,
+                                    rating=5, comment=f'Review {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reviewer)
+
+    def test_profile_embeds_first_page_and_cursor(self):
+        profile = self.client.post('/api/user-profile/', {'user_id': self.reviewee.id}, format='json').data
+        self.assertEqual(len(profile['feedbacks']), 10)
+        self.assertEqual(profile['feedbacks'][0]['comment'], 'Review 24')
+
+        comments = [f['comment'] for f in profile['feedbacks']]
+        next_url = profile['feedbacks_next']
+        while next_url:
+            page = self.client.get(next_url).data
+            comments += [f['comment'] for f in page['results']]
+            next_url = page['next']
+        self.assertEqual(comments, [f'Review {i}' for i in reversed(range(25))])
+
+    def test_stream_page_size(self):
+        response = self.client.get(f'/api/users/{self.reviewee.id}/feedback/', {'page_size': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(self.client.get('/api/users/999999/feedback/').status_code, 404)
+
+
+@override_settings(USER_IMPORT_HASH_WORKERS=1)
+class ImportUsersViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin@example.com', is_staff=True)
+        make_user('taken@example.com')
+
+    def setUp(self):
+        skill_keys.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, body, content_type='text/csv'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.generic('POST', '/api/import-users/', body.encode(), content_type=content_type)
+
+    @override_settings(DIRECTORY_CARDS=True)
+    def test_csv_import(self):
+        response = self.upload(
+            'full_name,email,password,location,is_public,offered_skills,wanted_skills\n'
+            'Ann,ann@Example.com,secret1,Oslo,,Python; Go,Chess\n'
+            'Ben,ben@example.com,secret2,,no,,\n'
+            'Bad,not-an-email,secret3,,,,\n'
+            'Ann again,ann@example.com,secret4,,,,\n'
+            'Taken,taken@example.com,secret5,,,,\n'
+            'No password,np@example.com,,,,,\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 4))
+        self.assertEqual([(e['row'], list(e['errors'])) for e in response.data['errors']],
+                         [(3, ['email']), (4, ['email']), (5, ['email']), (6, ['password'])])
+
+        ann = CustomUser.objects.get(email='ann@example.com')
+        self.assertTrue(ann.check_password('secret1'))
+        self.assertEqual((ann.location, ann.is_public), ('Oslo', True))
+        self.assertEqual((ann.latitude, ann.longitude), geocode('Oslo'))
+        self.assertEqual(sorted(UserSkill.objects.filter(user=ann).values_list('skill__name', 'type')),
+                         [('Chess', 'wanted'), ('Go', 'offered'), ('Python', 'offered')])
+        ben = CustomUser.objects.get(email='ben@example.com')
+        self.assertEqual((ben.location, ben.is_public), (None, False))
+        self.assertEqual(UserRatingSummary.objects.filter(user__in=[ann, ben]).count(), 2)
+        self.assertEqual(DirectoryCard.objects.filter(user__in=[ann, ben]).count(), 2)
+
+    def test_ndjson_import(self):
+        response = self.upload(
+            '{"full_name": "Cy", "email": "cy@example.com", "password": "pw", "wanted_skills": ["Rust"]}\n'
+            '{not json\n'
+            '\n'
+            '["a", "list"]\n',
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+        self.assertEqual([e['row'] for e in response.data['errors']], [2, 3])
+        self.assertTrue(UserSkill.objects.filter(user__email='cy@example.com', skill__name='Rust').exists())
+
+    def test_new_skill_named_as_first_spelled(self):
+        self.upload('full_name,email,password,offered_skills\n'
+                    'Di,di@example.com,pw,scuba diving\n'
+                    'Ed,ed@example.com,pw,Scuba Diving\n'
+                    'Flo,flo@example.com,pw,SCUBA DIVING\n')
+        self.assertEqual(list(Skill.objects.filter(key=skill_key('scuba diving')).values_list('name', flat=True)),
+                         ['scuba diving'])
+
+    def test_other_integrity_errors_fail_only_their_batch(self):
+        real_insert = UserImport.insert
+
+        def insert(importer, valid, passwords):
+            if any(data['email'] == 'bad@example.com' for _, data in valid):
+                raise IntegrityError('some other constraint')
+            return real_insert(importer, valid, passwords)
+
+        rows = [{'full_name': name, 'email': f'{name}@example.com', 'password': 'pw'}
+                for name in ('one', 'two', 'bad', 'four', 'five')]
+        with mock.patch.object(UserImport, 'insert', insert), self.captureOnCommitCallbacks(execute=True):
+            report = UserImport(batch_size=2, hash_workers=1).run(iter(rows))
+        self.assertEqual((report['created'], report['failed']), (3, 2))
+        self.assertEqual([(e['row'], e['errors']) for e in report['errors']],
+                         [(3, {'non_field_errors': [BATCH_FAILED]}), (4, {'non_field_errors': [BATCH_FAILED]})])
+        self.assertEqual(set(CustomUser.objects.filter(email__in=[row['email'] for row in rows])
+                             .values_list('full_name', flat=True)), {'one', 'two', 'five'})
+
+    def test_queries_do_not_grow_with_rows(self):
+        pin_version_checks(self)
+        def body(prefix, n):
+            return 'full_name,email,password,offered_skills\n' + ''.join(
+                f'{prefix}{i},{prefix}{i}@example.com,pw,Python\n' for i in range(n))
+
+        # First import creates the skill and the shared version counters.
+        self.upload(body('warmup', 1))
+        with CaptureQueriesContext(connection) as small:
+            self.upload(body('a', 3))
+        with CaptureQueriesContext(connection) as large:
+            self.upload(body('b', 30))
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+        self.assertEqual(CustomUser.objects.filter(email__endswith='@example.com').count(), 36)
+
+    @override_settings(USER_IMPORT_HASH_WORKERS=2)
+    @mock.patch.object(user_import_module, 'POOL_MIN_PASSWORDS', 2)
+    def test_passwords_hashed_in_process_pool(self):
+        hasher = user_import_module.password_hasher(2)
+        self.addCleanup(hasher.close)
+        body = 'full_name,email,password\n' + ''.join(f'P{i},p{i}@example.com,pw{i}\n' for i in range(4))
+        self.assertEqual(self.upload(body).data['created'], 4)
+        self.assertTrue(CustomUser.objects.get(email='p3@example.com').check_password('pw3'))
+        pool = hasher._pool
+        self.assertIsNotNone(pool)
+        body = 'full_name,email,password\n' + ''.join(f'Q{i},q{i}@example.com,pw{i}\n' for i in range(4))
+        self.assertEqual(self.upload(body).data['created'], 4)
+        self.assertIs(hasher._pool, pool)
+
+    @override_settings(USER_IMPORT_HASH_WORKERS=2)
+    def test_small_uploads_hashed_in_thread(self):
+        hasher = user_import_module.password_hasher(2)
+        self.addCleanup(hasher.close)
+        body = 'full_name,email,password\nSmall,small@example.com,pw\n'
+        self.assertEqual(self.upload(body).data['created'], 1)
+        self.assertIsNone(hasher._pool)
+
+    def test_rejected_uploads(self):
+        self.assertEqual(self.upload('email,password\nx@example.com,pw\n').status_code, 400)
+        self.assertEqual(self.upload('{}', content_type='application/json').status_code, 415)
+        self.client.force_authenticate(CustomUser.objects.get(email='taken@example.com'))
+        self.assertEqual(self.upload('full_name,email,password\n').status_code, 403)
+
+
+class MonitorSwapRequestsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin@example.com', is_staff=True)
+        python, guitar = Skill.objects.create(name='Python'), Skill.objects.create(name='Guitar')
+        for i in range(30):
+            requester = make_user(f'requester{i}@example.com')
+            swap = SwapRequest.objects.create(requester=requester, receiver=cls.admin, message=f'msg {i}',
+                                              status='pending' if i % 2 else 'accepted')
+            SwapRequestOfferedSkill.objects.create(swap_request=swap, skill=python)
+            SwapRequestWantedSkill.objects.create(swap_request=swap, skill=guitar)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_page_query_count_is_constant(self):
+        pin_version_checks(self)
+        # swaps with requester/receiver joined + offered + wanted skills
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/monitor-swap-requests/', {'page_size': 20})
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][0]['offered_skills'], ['Python'])
+
+        response = self.client.get('/api/monitor-swap-requests/', {'status': 'pending', 'page_size': 100})
+        self.assertEqual(len(response.data['results']), 15)
+
+    def test_ndjson_export(self):
+        response = self.client.get('/api/monitor-swap-requests/', {'export': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows[0]['wanted_skills'], ['Guitar'])
+
+    def test_csv_export(self):
+        response = self.client.get('/api/monitor-swap-requests/', {'export': 'csv', 'status': 'accepted'})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:3], ['id', 'requester_email', 'receiver_email'])
+        self.assertEqual(len(rows), 16)
+        self.assertEqual(rows[1][3], 'Python')
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN each hot query and fail unless it reads the index meant for it.
+
+    On PostgreSQL sequential scans are disabled for the test so the planner
+    uses an index whenever one can serve the query; a Seq Scan in the plan
+    then means no suitable index exists, and another index in it means the
+    intended one cannot serve the query.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        skills = [Skill.objects.create(name=f'Skill {i}') for i in range(20)]
+        users = [make_user(f'plan{i}@example.com', is_public=bool(i % 5)) for i in range(40)]
+        for i, user in enumerate(users):
+            UserSkill.objects.create(user=user, skill=skills[i % 20], type='offered')
+            UserSkill.objects.create(user=user, skill=skills[(i + 7) % 20], type='wanted')
+            swap = SwapRequest.objects.create(requester=user, receiver=users[(i + 1) % 40],
+                                              status=['pending', 'accepted', 'rejected', 'cancelled'][i % 4])
+            Feedback.objects.create(swap_request=swap, reviewer=user, reviewee=users[(i + 1) % 40], rating=4)
+        cls.user = users[3]
+        cls.skill = skills[3]
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, table, *indexes):
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            self.assertNotIn(f'Seq Scan on {table}', plan, plan)
+        elif connection.vendor == 'sqlite':
+            full_scans = [line for line in plan.splitlines()
+                          if f'SCAN {table}' in line and 'USING' not in line]
+            self.assertEqual(full_scans, [], plan)
+        else:
+            self.skipTest(f'No plan check for {connection.vendor}')
+        for index in indexes:
+            self.assertIn(index, plan, plan)
+
+    def test_user_swaps_by_participant(self):
+        qs = SwapRequest.objects.filter(Q(requester=self.user) | Q(receiver=self.user)).order_by('updated_at', 'id')
+        self.assertUsesIndex(qs, 'main_swaprequest', 'swap_requester_updated_idx', 'swap_receiver_updated_idx')
+
+    def test_swaps_by_status(self):
+        qs = SwapRequest.objects.filter(status='pending').order_by('-created_at', '-id')[:50]
+        self.assertUsesIndex(qs, 'main_swaprequest', 'swap_status_created_idx')
+
+    def test_user_skills_by_skill_and_type(self):
+        qs = UserSkill.objects.filter(skill=self.skill, type='offered').values_list('user_id', flat=True)
+        self.assertUsesIndex(qs, 'main_userskill', 'userskill_skill_type_idx')
+
+    def test_feedback_by_reviewee(self):
+        qs = Feedback.objects.filter(reviewee=self.user).order_by('-created_at', '-id')[:10]
+        self.assertUsesIndex(qs, 'main_feedback', 'feedback_reviewee_created_idx')
+
+    def test_user_directory(self):
+        qs = CustomUser.objects.filter(is_active=True, is_banned=False, is_public=True).order_by('id')[:50]
+        self.assertUsesIndex(qs, 'main_customuser', 'user_directory_idx')
+
+    def test_directory_cards(self):
+        qs = DirectoryCard.objects.filter(is_listed=True).order_by('user_id')[:50]
+        self.assertUsesIndex(qs, 'main_directorycard', 'directory_card_listed_idx')
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        platform_messages.invalidate()
+        self.admin = make_user('admin@example.com', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing_header(self):
+        PlatformMessage.objects.create(title='Hello', body='World')
+        response = self.client.get('/api/admin-messages/')
+        timing = response['Server-Timing']
+        # messages version, stats and page
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="3 queries"')
+        self.assertIn('render;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/admin-messages/')
+        self.client.get('/api/admin-messages/')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('http_requests_total{view="api/admin-messages/",method="GET",status="200"} 2', body)
+        # The second request is served from the message cache.
+        self.assertIn('http_request_db_queries_bucket{view="api/admin-messages/",method="GET",le="0"} 1', body)
+        self.assertIn('http_request_db_queries_bucket{view="api/admin-messages/",method="GET",le="3"} 2', body)
+        self.assertIn('http_response_size_bytes_count{view="api/admin-messages/",method="GET"} 2', body)
+
+    def test_metrics_requires_admin(self):
+        self.client.force_authenticate(make_user('user@example.com'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+
+class AsyncViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('user@example.com')
+        cls.other = make_user('other@example.com')
+        python = Skill.objects.create(name='Python')
+        for user in (cls.user, cls.other):
+            UserSkill.objects.create(user=user, skill=python, type='offered')
+        swap = SwapRequest.objects.create(requester=cls.user, receiver=cls.other, status='accepted')
+        SwapRequestOfferedSkill.objects.create(swap_request=swap, skill=python)
+        Feedback.objects.create(swap_request=swap, reviewer=cls.user, reviewee=cls.other, rating=4)
+        PlatformMessage.objects.create(title='Maintenance', body='Tonight')
+        make_user('banned@example.com', is_banned=True)
+        refresh_directory_cards([cls.user.id, cls.other.id])
+
+    def setUp(self):
+        cache.clear()
+        auth_state.invalidate()
+        platform_messages.invalidate()
+        self.auth = {'headers': {'Authorization': f'Bearer {generate_jwt(self.user)}'}}
+
+    async def test_responses_match_sync_views(self):
+        requests = [
+            ('get', 'all-users/', None),
+            ('get', 'all-users/?page_size=1', None),
+            ('get', 'my-swap-requests/', None),
+            ('get', 'admin-messages/', None),
+            ('post', 'user-profile/', {'user_id': self.other.id}),
+            ('post', 'user-profile/', {'is_self': True}),
+            ('post', 'user-profile/', {'user_id': 999999}),
+        ]
+        variants = [{}, {'FAST_LIST_RESPONSES': True}, {'DIRECTORY_CARDS': True}]
+        for method, path, body in requests:
+            kwargs = {'content_type': 'application/json', **self.auth}
+            if body is not None:
+                kwargs['data'] = body
+            for variant in variants:
+                with self.settings(**variant):
+                    expected = await sync_to_async(getattr(self.client, method))(f'/api/{path}', **kwargs)
+                    # Build the async response itself, not from the profile cache.
+                    await sync_to_async(cache.clear)()
+                    actual = await getattr(self.async_client, method)(f'/api/async/{path}', **kwargs)
+                self.assertEqual(actual.status_code, expected.status_code, (path, variant))
+                self.assertEqual(actual['Content-Type'], 'application/json')
+                # Page links point back at the endpoint that served them.
+                self.assertEqual(json.loads(actual.content.replace(b'/api/async/', b'/api/')),
+                                 json.loads(expected.content), (path, variant))
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get('/api/async/admin-messages/')
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get('/api/async/admin-messages/', headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(json.loads(response.content), {'detail': 'Invalid or expired token'})
+
+    async def test_banned_user_rejected(self):
+        banned = await CustomUser.objects.aget(email='banned@example.com')
+        response = await self.async_client.get('/api/async/all-users/',
+                                                headers={'Authorization': f'Bearer {generate_jwt(banned)}'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(json.loads(response.content), {'detail': 'User account is banned.'})
+
+    async def test_deleted_user_rejected(self):
+        gone = await CustomUser.objects.acreate(email='gone@example.com', full_name='Gone')
+        token = generate_jwt(gone)
+        await CustomUser.objects.filter(id=gone.id).adelete()
+        response = await self.async_client.get('/api/async/all-users/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(json.loads(response.content), {'detail': 'User not found'})
+
+
+class SwapEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.requester = make_user('requester@example.com')
+        cls.receiver = make_user('receiver@example.com')
+
+    def setUp(self):
+        auth_state.invalidate()
+        skill_keys.invalidate()
+        self.published = []
+        bus = get_swap_event_broker().backend.bus
+        bus.nodes.append(self.published.append)
+        self.addCleanup(bus.nodes.remove, self.published.append)
+
+    def published_events(self):
+        return [(json.loads(p)['user_ids'], json.loads(p)['event']) for p in self.published]
+
+    def test_create_and_update_publish_to_both_participants(self):
+        client = APIClient()
+        client.force_authenticate(self.requester)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/create-swap-request/', {
+                'receiver_id': self.receiver.id, 'offered_skills': ['Python'], 'wanted_skills': ['Go'],
+            }, format='json')
+        swap = SwapRequest.objects.get()
+
+        client.force_authenticate(self.receiver)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(f'/api/update-swap-request-status/{swap.id}/', {'status': 'accepted'}, format='json')
+
+        participants = sorted([self.requester.id, self.receiver.id])
+        self.assertEqual([(ids, event['type']) for ids, event in self.published_events()],
+                         [(participants, 'swap.created'), (participants, 'swap.accepted')])
+        self.assertEqual(self.published_events()[1][1]['swap_request']['status'], 'accepted')
+
+    def test_nothing_published_for_rejected_input(self):
+        client = APIClient()
+        client.force_authenticate(self.receiver)
+        swap = SwapRequest.objects.create(requester=self.requester, receiver=self.receiver, status='rejected')
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(f'/api/update-swap-request-status/{swap.id}/', {'status': 'accepted'}, format='json')
+        self.assertEqual(self.published, [])
+
+    async def test_events_cross_nodes(self):
+        bus = LocalBus()
+        node_a, node_b = SwapEventBroker(LocalBackend(bus)), SwapEventBroker(LocalBackend(bus))
+        subscription = node_b.subscribe(self.receiver.id)
+        node_a.publish([self.requester.id, self.receiver.id], {'type': 'swap.created'})
+        node_a.publish([self.requester.id], {'type': 'swap.cancelled'})
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 1), {'type': 'swap.created'})
+        await asyncio.sleep(0)
+        self.assertTrue(subscription.queue.empty())
+
+    async def test_stream(self):
+        response = await self.async_client.get(
+            '/api/swap-events/', headers={'Authorization': f'Bearer {generate_jwt(self.receiver)}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+
+        get_swap_event_broker().publish([self.receiver.id], {'type': 'swap.created', 'swap_request': {'id': 1}})
+        chunk = await asyncio.wait_for(anext(chunks), 1)
+        self.assertEqual(chunk, b'event: swap.created\ndata: {"type": "swap.created", "swap_request": {"id": 1}}\n\n')
+        await chunks.aclose()
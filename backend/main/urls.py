@@ -1,17 +1,29 @@
 from django.urls import path
-from .views import AdminMessagesView, UserSwapRequestsView, AllUsersListView, UserProfileView, RegisterView, LoginView, UpdateSkillsView, CreateSwapRequestView, UpdateSwapRequestStatusView, SubmitFeedbackView, BanUserView, MonitorSwapRequestsView, PlatformMessageView
+from .views import AdminMessagesView, UserSwapRequestsView, AllUsersListView, UserProfileView, RegisterView, LoginView, TokenRefreshView, UpdateSkillsView, CreateSwapRequestView, UpdateSwapRequestStatusView, SubmitFeedbackView, BanUserView, ImportUsersView, MonitorSwapRequestsView, PlatformMessageView, MatchesView, SkillAutocompleteView, UserFeedbackView, AsyncAllUsersListView, AsyncUserProfileView, AsyncUserSwapRequestsView, AsyncAdminMessagesView, SwapEventsView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('update-skills/', UpdateSkillsView.as_view(), name='update-skills'),
     path('create-swap-request/', CreateSwapRequestView.as_view(), name='create-swap-request'),
     path('update-swap-request-status/<int:swap_id>/', UpdateSwapRequestStatusView.as_view(), name='update-swap-request-status'),
     path('feedback-rating/', SubmitFeedbackView.as_view(), name='feedback-rating'),
     path('admin-post-message/', PlatformMessageView.as_view(), name='admin-post-message'),
     path('ban-user/', BanUserView.as_view(), name='ban-user'),
+    path('import-users/', ImportUsersView.as_view(), name='import-users'),
+    path('monitor-swap-requests/', MonitorSwapRequestsView.as_view(), name='monitor-swap-requests'),
     path('user-profile/', UserProfileView.as_view(), name='user-profile'),
+    path('users/<int:user_id>/feedback/', UserFeedbackView.as_view(), name='user-feedback'),
     path('all-users/', AllUsersListView.as_view(), name='all-users'),
     path('my-swap-requests/', UserSwapRequestsView.as_view(), name='my-swap-requests'),
     path('admin-messages/', AdminMessagesView.as_view()),
+    path('matches/', MatchesView.as_view(), name='matches'),
+    path('skills/autocomplete/', SkillAutocompleteView.as_view(), name='skills-autocomplete'),
+    # Async variants of the hot read paths, for deployments served over ASGI.
+    path('async/user-profile/', AsyncUserProfileView.as_view(), name='async-user-profile'),
+    path('async/all-users/', AsyncAllUsersListView.as_view(), name='async-all-users'),
+    path('async/my-swap-requests/', AsyncUserSwapRequestsView.as_view(), name='async-my-swap-requests'),
+    path('async/admin-messages/', AsyncAdminMessagesView.as_view(), name='async-admin-messages'),
+    path('swap-events/', SwapEventsView.as_view(), name='swap-events'),
 ]
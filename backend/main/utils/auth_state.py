@@ -0,0 +1,173 @@
+from bisect import bisect_right
+
+from django.db.models import F, Max, Min, Q, Window
+from django.db.models.functions import Lead
+
+from ..models import CustomUser
+from .versioning import LOAD, DeferredWrites, VersionedCache, aget_version, bump_version, get_version
+
+AUTH_STATE_VERSION_KEY = 'auth_state'
+
+AUTH_USER_FIELDS = ('id', 'is_active', 'is_banned', 'is_staff')
+
+# (is_active, is_banned, is_staff) of an ordinary account.
+DEFAULT_FLAGS = (True, False, False)
+
+# The loaded copy cannot tell whether the user exists.
+_UNKNOWN = object()
+
+
+def flagged_users():
+    """Users whose account flags differ from DEFAULT_FLAGS; few, and indexed."""
+    return CustomUser.objects.filter(Q(is_active=False) | Q(is_banned=True) | Q(is_staff=True))
+
+
+def id_gaps():
+    """``(before, after)`` pairs of consecutive user ids with missing ids between."""
+    return CustomUser.objects.annotate(
+        next_id=Window(Lead('id'), order_by=F('id').asc()),
+    ).filter(next_id__gt=F('id') + 1).order_by('id').values_list('id', 'next_id')
+
+
+ID_RANGE = {'first': Min('id'), 'last': Max('id')}
+
+
+class AuthState(VersionedCache):
+    """Per-process copy of the account flags authentication checks.
+
+    Only the users in ``flagged_users()`` have their flags held; any other
+    existing id is an active, unbanned, non-staff account. Which ids exist is
+    held as the id range and the gaps in it, so it stays small however many
+    users there are; ids above the range, registered since the load, are
+    looked up once each. Together with the signed token this authenticates a
+    request without a query. Local writes are applied on commit by the
+    signal handlers in ``main.signals``; writes made by other workers are
+    noticed through a shared ``DataVersion`` counter.
+    """
+
+    version_key = AUTH_STATE_VERSION_KEY
+    # check_interval is also the longest a ban made through another worker
+    # can go unnoticed here.
+    reload_interval = 300.0
+
+    def __init__(self):
+        super().__init__()
+        self._flags = None
+        self._first_id = self._last_id = 0
+        self._gap_starts = []
+        self._gap_ends = []
+        self._deleted = set()
+        self._registered = set()
+
+    @property
+    def is_loaded(self):
+        return self._flags is not None
+
+    def _clear(self):
+        self._flags = None
+
+    def _stale(self):
+        """LOAD, CHECK, or None when the copy can be used without reading the version."""
+        with self._lock:
+            return self._due()
+
+    def _store(self, version, rows, span, gaps):
+        with self._lock:
+            self._flags = {user_id: (is_active, is_banned, is_staff) for user_id, is_active, is_banned, is_staff in rows}
+            self._first_id, self._last_id = span['first'] or 0, span['last'] or 0
+            self._gap_starts = [before for before, _ in gaps]
+            self._gap_ends = [after for _, after in gaps]
+            self._deleted = set()
+            self._registered = set()
+            self._mark_loaded(version)
+
+    def _rows(self):
+        return flagged_users().values_list(*AUTH_USER_FIELDS)
+
+    def _lookup(self, user_id):
+        """The user's flags, None if they do not exist, or _UNKNOWN."""
+        with self._lock:
+            if self._flags is None:
+                return _UNKNOWN
+            if user_id in self._deleted:
+                return None
+            if user_id in self._flags:
+                return self._flags[user_id]
+            if user_id > self._last_id:
+                return DEFAULT_FLAGS if user_id in self._registered else _UNKNOWN
+            if user_id < self._first_id:
+                return None
+            i = bisect_right(self._gap_starts, user_id) - 1
+            if i >= 0 and self._gap_starts[i] < user_id < self._gap_ends[i]:
+                return None
+            return DEFAULT_FLAGS
+
+    def _user_flags(self, user_id):
+        return CustomUser.objects.filter(id=user_id).values_list(*AUTH_USER_FIELDS[1:])
+
+    def _found(self, user_id, flags):
+        """Remember a user registered since the load; ``flags`` None if there is none."""
+        with self._lock:
+            if flags is not None and flags == DEFAULT_FLAGS and self._flags is not None and user_id > self._last_id:
+                self._registered.add(user_id)
+        return flags
+
+    def get(self, user_id):
+        """``(is_active, is_banned, is_staff)`` of ``user_id``, None if there is no such user."""
+        due = self._stale()
+        if due is not None:
+            # Read the version before the rows, so a concurrent write can
+            # only make the copy newer than its version.
+            version = get_version(AUTH_STATE_VERSION_KEY)
+            if due is LOAD or not self._is_current(version):
+                self._store(version, list(self._rows()), CustomUser.objects.aggregate(**ID_RANGE), list(id_gaps()))
+        flags = self._lookup(user_id)
+        if flags is _UNKNOWN:
+            return self._found(user_id, self._user_flags(user_id).first())
+        return flags
+
+    async def aget(self, user_id):
+        due = self._stale()
+        if due is not None:
+            version = await aget_version(AUTH_STATE_VERSION_KEY)
+            if due is LOAD or not self._is_current(version):
+                self._store(version, [row async for row in self._rows()],
+                            await CustomUser.objects.aaggregate(**ID_RANGE),
+                            [gap async for gap in id_gaps()])
+        flags = self._lookup(user_id)
+        if flags is _UNKNOWN:
+            return self._found(user_id, await self._user_flags(user_id).afirst())
+        return flags
+
+    def is_current(self, user_id, flags):
+        """True if the loaded copy already holds ``flags`` for ``user_id``."""
+        with self._lock:
+            return self._flags is not None and self._flags.get(user_id, DEFAULT_FLAGS) == flags
+
+    def set(self, user_id, flags):
+        with self._lock:
+            if self._flags is None:
+                return
+            self._deleted.discard(user_id)
+            if user_id > self._last_id:
+                self._registered.add(user_id)
+            if flags == DEFAULT_FLAGS:
+                self._flags.pop(user_id, None)
+            else:
+                self._flags[user_id] = flags
+
+    def remove(self, user_id):
+        with self._lock:
+            if self._flags is None:
+                return
+            self._flags.pop(user_id, None)
+            self._registered.discard(user_id)
+            self._deleted.add(user_id)
+
+
+auth_state = AuthState()
+auth_state_writes = DeferredWrites(AUTH_STATE_VERSION_KEY, auth_state.mark_written)
+
+
+def bump_auth_state_version():
+    return bump_version(AUTH_STATE_VERSION_KEY)
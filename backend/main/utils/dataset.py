@@ -0,0 +1,203 @@
+import csv
+import io
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import (
+    CustomUser, Feedback, Skill, SwapRequest, SwapRequestOfferedSkill, SwapRequestWantedSkill,
+    UserRatingSummary, UserSkill, skill_key,
+)
+from .auth_state import bump_auth_state_version
+from .gazetteer import geocode
+from .geo_index import bump_geo_index_version
+from .skill_autocomplete import bump_skill_vocabulary_version
+from .skill_index import bump_skill_index_version
+
+DATASET_PASSWORD = 'dataset-password'
+
+STATUS_WEIGHTS = {'pending': 35, 'accepted': 40, 'rejected': 15, 'cancelled': 10}
+RATING_WEIGHTS = [3, 5, 12, 35, 45]  # 1..5 stars, skewed positive like real reviews
+
+SKILL_WORDS = [
+    'Python', 'JavaScript', 'Guitar', 'Piano', 'Spanish', 'French', 'Cooking', 'Baking', 'Yoga', 'Chess',
+    'Photography', 'Drawing', 'Painting', 'Writing', 'Marketing', 'Design', 'Excel', 'SQL', 'Rust', 'Go',
+    'Singing', 'Dancing', 'Running', 'Swimming', 'Knitting', 'Pottery', 'Gardening', 'Public Speaking',
+    'Calculus', 'Statistics', 'Physics', 'Chemistry', 'Woodworking', 'Video Editing', 'Accounting', 'German',
+]
+
+
+class DatasetGenerator:
+    """Bulk-load a synthetic but realistically shaped dataset.
+
+    Skills are drawn from a Zipf distribution so a few are very common and
+    most form a long tail. Rows are written with PostgreSQL COPY when the
+    driver supports it and with bulk_create otherwise; primary keys are
+    assigned up front so neither path needs rows read back.
+    """
+
+    def __init__(self, users, skills=2000, skills_per_user=(1, 6), swaps_per_user=2.0,
+                 feedback_rate=0.7, zipf_s=1.1, batch_size=10000, use_copy=True, seed=None, log=None):
+        self.n_users = users
+        self.n_skills = skills
+        self.skills_per_user = skills_per_user
+        self.swaps_per_user = swaps_per_user
+        self.feedback_rate = feedback_rate
+        self.zipf_s = zipf_s
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        self.random = random.Random(seed)
+        self.log = log or (lambda message: None)
+
+    def generate(self):
+        self.now = timezone.now()
+        self.password = make_password(DATASET_PASSWORD)
+
+        self.skill_ids = self.load_skills()
+        weights = [1 / rank ** self.zipf_s for rank in range(1, len(self.skill_ids) + 1)]
+        self.skill_cum_weights = list(itertools.accumulate(weights))
+
+        first_user, last_user = self.load_users()
+        self.load_swaps(first_user, last_user)
+
+        self.reset_sequences()
+        self.log("Rebuilding rating summaries...")
+        call_command('rebuild_rating_summaries', batch_size=self.batch_size, stdout=io.StringIO())
+        self.log("Rebuilding directory cards...")
+        call_command('rebuild_directory_cards', batch_size=self.batch_size, stdout=io.StringIO())
+        # Running workers rebuild their in-memory indexes on next use.
+        bump_skill_index_version()
+        bump_skill_vocabulary_version()
+        bump_geo_index_version()
+        bump_auth_state_version()
+        return first_user, last_user
+
+    # -- phases ----------------------------------------------------------
+
+    def load_skills(self):
+        existing = set(Skill.objects.values_list('key', flat=True))
+        names = []
+        for i in itertools.count():
+            if len(names) + len(existing) >= self.n_skills:
+                break
+            word = SKILL_WORDS[i % len(SKILL_WORDS)]
+            name = word if i < len(SKILL_WORDS) else f'{word} {i // len(SKILL_WORDS)}'
+            if skill_key(name) not in existing:
+                names.append(name)
+        start = self.next_id(Skill)
+        self.insert(Skill, ['id', 'name', 'key'], [(start + i, name, skill_key(name)) for i, name in enumerate(names)])
+        # Rank order decides popularity: the first skills get the fattest head.
+        return list(Skill.objects.order_by('id').values_list('id', flat=True))
+
+    def load_users(self):
+        first = self.next_id(CustomUser)
+        last = first + self.n_users - 1
+        user_columns = [
+            'id', 'password', 'is_superuser', 'full_name', 'email', 'is_active', 'is_staff',
+            'location', 'latitude', 'longitude', 'availability', 'is_public', 'is_banned', 'date_joined',
+        ]
+        locations = ['Remote', 'Delhi', 'Mumbai', 'Bengaluru', 'London', 'New York', 'Berlin', None]
+        availability = ['Weekends', 'Evenings', 'Weekdays', 'Flexible', None]
+
+        for chunk_start in range(first, last + 1, self.batch_size):
+            ids = range(chunk_start, min(chunk_start + self.batch_size, last + 1))
+            with transaction.atomic():
+                self.insert(CustomUser, user_columns, (
+                    (uid, self.password, False, f'User {uid}', f'user{uid}@example.com', True, False,
+                     location, *(geocode(location) or (None, None)), self.random.choice(availability),
+                     self.random.random() < 0.9, self.random.random() < 0.01, self.now)
+                    for uid, location in ((uid, self.random.choice(locations)) for uid in ids)
+                ))
+                self.insert(UserRatingSummary, ['user_id', 'rating_sum', 'total_reviews'],
+                            ((uid, 0, 0) for uid in ids))
+                self.insert(UserSkill, ['user_id', 'skill_id', 'type'], self.user_skill_rows(ids))
+            self.log(f"Users: {ids[-1] - first + 1}/{self.n_users}")
+        return first, last
+
+    def load_swaps(self, first_user, last_user):
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        n_swaps = int(self.n_users * self.swaps_per_user)
+        first = self.next_id(SwapRequest)
+
+        for chunk_start in range(first, first + n_swaps, self.batch_size):
+            ids = range(chunk_start, min(chunk_start + self.batch_size, first + n_swaps))
+            swaps, offered, wanted, feedback = [], [], [], []
+            for swap_id in ids:
+                requester = self.random.randint(first_user, last_user)
+                receiver = self.random.randint(first_user, last_user - 1)
+                if receiver >= requester:
+                    receiver += 1
+                status = self.random.choices(statuses, status_weights)[0]
+                swaps.append((swap_id, requester, receiver, '', status, self.now, self.now))
+                offered.extend((swap_id, sid) for sid in self.sample_skills(1, 2))
+                wanted.extend((swap_id, sid) for sid in self.sample_skills(1, 2))
+                if status == 'accepted' and self.random.random() < self.feedback_rate:
+                    rating = self.random.choices(range(1, 6), RATING_WEIGHTS)[0]
+                    feedback.append((swap_id, requester, receiver, rating, '', self.now))
+
+            with transaction.atomic():
+                self.insert(SwapRequest, ['id', 'requester_id', 'receiver_id', 'message', 'status', 'created_at', 'updated_at'],
+                            swaps)
+                self.insert(SwapRequestOfferedSkill, ['swap_request_id', 'skill_id'], offered)
+                self.insert(SwapRequestWantedSkill, ['swap_request_id', 'skill_id'], wanted)
+                self.insert(Feedback, ['swap_request_id', 'reviewer_id', 'reviewee_id', 'rating', 'comment', 'created_at'],
+                            feedback)
+            self.log(f"Swaps: {ids[-1] - first + 1}/{n_swaps}")
+
+    # -- helpers ---------------------------------------------------------
+
+    def sample_skills(self, low, high):
+        k = self.random.randint(low, high)
+        return set(self.random.choices(self.skill_ids, cum_weights=self.skill_cum_weights, k=k))
+
+    def user_skill_rows(self, user_ids):
+        low, high = self.skills_per_user
+        for uid in user_ids:
+            offered = self.sample_skills(low, high)
+            wanted = self.sample_skills(low, high) - offered
+            for sid in offered:
+                yield (uid, sid, 'offered')
+            for sid in wanted:
+                yield (uid, sid, 'wanted')
+
+    def next_id(self, model):
+        return (model.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+
+    def reset_sequences(self):
+        models = [Skill, CustomUser, UserRatingSummary, UserSkill, SwapRequest,
+                  SwapRequestOfferedSkill, SwapRequestWantedSkill, Feedback]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+    def insert(self, model, columns, rows):
+        if self.use_copy:
+            self.copy(model, columns, rows)
+        else:
+            model.objects.bulk_create(
+                (model(**dict(zip(columns, row))) for row in rows), batch_size=self.batch_size,
+            )
+
+    def copy(self, model, attnames, rows):
+        fields = {f.attname: f.column for f in model._meta.concrete_fields}
+        columns = ', '.join(connection.ops.quote_name(fields[name]) for name in attnames)
+        sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN'
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy'):  # psycopg 3
+                with raw.copy(sql) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:  # psycopg2
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow(['\\N' if value is None else value for value in row])
+                buffer.seek(0)
+                raw.copy_expert(f"{sql} WITH (FORMAT csv, NULL '\\N')", buffer)
@@ -0,0 +1,84 @@
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import CustomUser, DirectoryCard
+from .fast_rows import USER_LIST_VALUES, user_list_rows
+from .versioning import _open_batch
+
+# Profile fields that appear on a card or decide whether it is listed.
+CARD_USER_FIELDS = {'full_name', 'email', 'location', 'availability', 'is_public', 'is_banned', 'is_active'}
+
+# UserListSerializer's field order; jsonb does not keep the stored order.
+CARD_FIELDS = (
+    'id', 'full_name', 'email', 'location', 'availability', 'is_public', 'is_banned',
+    'average_rating', 'total_reviews', 'offered_skills', 'wanted_skills',
+)
+
+
+def directory_cards_enabled():
+    return getattr(settings, 'DIRECTORY_CARDS', False)
+
+
+def card_rows(cards):
+    """The /all-users/ rows of ``cards``, dicts holding a ``payload``."""
+    return [{field: card['payload'][field] for field in CARD_FIELDS} for card in cards]
+
+
+def refresh_directory_cards(user_ids):
+    """Recompute the cards of ``user_ids`` from the source tables.
+
+    Three queries whatever the number of users: the users with their rating
+    summaries, their skills, and one upsert.
+    """
+    users = list(CustomUser.objects.filter(id__in=user_ids).order_by('id').values(*USER_LIST_VALUES, 'is_active'))
+    if not users:
+        return 0
+    cards = [
+        DirectoryCard(user_id=user['id'], payload=row,
+                      is_listed=user['is_active'] and not user['is_banned'] and user['is_public'])
+        for user, row in zip(users, user_list_rows(users))
+    ]
+    DirectoryCard.objects.bulk_create(
+        cards, update_conflicts=True, unique_fields=['user'], update_fields=['payload', 'is_listed'],
+    )
+    return len(cards)
+
+
+class DirectoryCardRefresh:
+    """Refresh the cards of every user a transaction touched once it commits.
+
+    Users are collected per transaction so a bulk change costs one refresh.
+    A card can briefly lag a commit, or stay stale if its refresh fails;
+    rebuild_directory_cards repairs any drift.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def add(self, user_ids):
+        if not directory_cards_enabled():
+            # Nothing reads the cards; rebuild_directory_cards fills them in
+            # when the feature is turned on.
+            return
+        connection = transaction.get_connection()
+        batch = getattr(self._local, 'batch', None)
+        # Unlike DeferredWrites, join the pending batch at any savepoint
+        # depth, so writes nested in get_or_create() and the like share one
+        # refresh. A refresh recomputes cards from the committed rows, so
+        # users whose change a savepoint rolled back are merely refreshed
+        # for nothing.
+        if batch is not None and not batch.flushed and any(entry[1] is batch.flush for entry in connection.run_on_commit):
+            batch.extend(user_ids)
+            return
+        batch = _open_batch(self._local, connection, self._flush)
+        batch.extend(user_ids)
+        # Outside a transaction this runs straight away.
+        transaction.on_commit(batch.flush, robust=True)
+
+    def _flush(self, user_ids):
+        refresh_directory_cards(set(user_ids))
+
+
+directory_card_refresh = DirectoryCardRefresh()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+SUBSCRIPTION_QUEUE_SIZE = 100
+REDIS_CHANNEL = 'swap-events'
+
+
+class LocalBus:
+    """In-process stand-in for a message broker shared by several nodes."""
+
+    def __init__(self):
+        self.nodes = []
+
+
+class LocalBackend:
+    """Delivers published events to brokers attached to the same bus.
+
+    With its own private bus this is the single-node backend; tests attach
+    several brokers to one bus to model a multi-node deployment.
+    """
+
+    def __init__(self, bus=None):
+        self.bus = bus or LocalBus()
+
+    def start(self, deliver):
+        self.bus.nodes.append(deliver)
+
+    def publish(self, payload):
+        for deliver in list(self.bus.nodes):
+            deliver(payload)
+
+
+class RedisBackend:
+    """Fans events out to every node through a Redis pub/sub channel."""
+
+    def __init__(self, url=None, channel=REDIS_CHANNEL):
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured("RedisBackend requires the 'redis' package.") from exc
+        url = url or getattr(settings, 'SWAP_EVENTS_REDIS_URL', None)
+        if not url:
+            raise ImproperlyConfigured("RedisBackend requires SWAP_EVENTS_REDIS_URL.")
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def start(self, deliver):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda message: deliver(message['data'])})
+        pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, payload):
+        self.client.publish(self.channel, payload)
+
+
+class Subscription:
+    """Bounded queue of events for one stream, fed from any thread."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(SUBSCRIPTION_QUEUE_SIZE)
+        # Set when events were dropped; the client must refetch its state.
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:  # event loop already closed
+            pass
+
+    def _put(self, event):
+        if self.queue.full():
+            self.overflowed = True
+        else:
+            self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class SwapEventBroker:
+    """Routes swap events to the open streams of the users involved.
+
+    Every event goes through the backend, including on a single node, so
+    one code path serves both deployments.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._started = False
+
+    def _ensure_started(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self.backend.start(self._deliver)
+
+    def publish(self, user_ids, event):
+        self._ensure_started()
+        self.backend.publish(json.dumps({'user_ids': sorted(set(user_ids)), 'event': event}, cls=DjangoJSONEncoder))
+
+    def _deliver(self, payload):
+        message = json.loads(payload)
+        with self._lock:
+            subscriptions = [sub for user_id in message['user_ids'] for sub in self._subscribers.get(user_id, ())]
+        for subscription in subscriptions:
+            subscription.push(message['event'])
+
+    def subscribe(self, user_id):
+        """Open a subscription; must be called from the consuming event loop."""
+        self._ensure_started()
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_swap_event_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            backend = import_string(getattr(settings, 'SWAP_EVENTS_BACKEND', 'main.utils.events.LocalBackend'))
+            _broker = SwapEventBroker(backend())
+        return _broker
+
+
+def swap_event(event_type, swap):
+    return {
+        'type': event_type,
+        'swap_request': {
+            'id': swap.id,
+            'requester_id': swap.requester_id,
+            'receiver_id': swap.receiver_id,
+            'status': swap.status,
+        },
+    }
+
+
+def publish_swap_events(event_type, swaps):
+    """Notify both participants of each swap once the transaction commits."""
+    events = [(swap.requester_id, swap.receiver_id, swap_event(event_type, swap)) for swap in swaps]
+
+    def publish():
+        broker = get_swap_event_broker()
+        for requester_id, receiver_id, event in events:
+            broker.publish([requester_id, receiver_id], event)
+
+    # A broker outage must not turn an already committed write into an error.
+    transaction.on_commit(publish, robust=True)
@@ -0,0 +1,96 @@
+from django.conf import settings
+from rest_framework.fields import DateTimeField
+
+from ..models import SwapRequestOfferedSkill, SwapRequestWantedSkill, UserRatingSummary, UserSkill
+
+# Builds the response rows of the list endpoints straight from .values()
+# plus one grouped skill lookup per page, skipping per-row serializer and
+# model instantiation. The output must stay identical to UserListSerializer
+# and SwapRequestSerializer; FastRowsContractTests compares the bytes.
+
+USER_LIST_VALUES = (
+    'id', 'full_name', 'email', 'location', 'availability', 'is_public', 'is_banned',
+    'rating_summary__rating_sum', 'rating_summary__total_reviews',
+)
+
+SWAP_VALUES = (
+    'id', 'requester_id', 'requester__full_name', 'receiver_id', 'receiver__full_name',
+    'message', 'status', 'created_at', 'updated_at',
+)
+
+# DRF's own formatting (ISO 8601, 'Z' suffix, current time zone).
+_datetime = DateTimeField()
+
+
+def fast_list_responses():
+    return getattr(settings, 'FAST_LIST_RESPONSES', False)
+
+
+def _group(pairs, keys):
+    grouped = {key: [] for key in keys}
+    for key, name in pairs:
+        grouped[key].append(name)
+    return grouped
+
+
+def user_skill_rows(users):
+    """``(user_id, type, skill name)`` of the skills of ``users``, dicts of USER_LIST_VALUES."""
+    return UserSkill.objects.filter(user_id__in=[user['id'] for user in users]).order_by('id').values_list(
+        'user_id', 'type', 'skill__name')
+
+
+def user_list_rows(users, skill_rows=None):
+    """UserListSerializer output for ``users``, dicts of USER_LIST_VALUES.
+
+    ``skill_rows`` are their ``user_skill_rows()`` when already read.
+    """
+    ids = [user['id'] for user in users]
+    skills = {'offered': {user_id: [] for user_id in ids}, 'wanted': {user_id: [] for user_id in ids}}
+    if skill_rows is None:
+        skill_rows = user_skill_rows(users)
+    for user_id, kind, name in skill_rows:
+        skills[kind][user_id].append(name)
+    offered, wanted = skills['offered'], skills['wanted']
+
+    rows = []
+    for user in users:
+        total_reviews = user['rating_summary__total_reviews']
+        # No summary row: DRF renders a missing related object as null.
+        average_rating = None if total_reviews is None else float(
+            UserRatingSummary.compute_average(user['rating_summary__rating_sum'], total_reviews))
+        rows.append({
+            'id': user['id'],
+            'full_name': user['full_name'],
+            'email': user['email'],
+            'location': user['location'],
+            'availability': user['availability'],
+            'is_public': user['is_public'],
+            'is_banned': user['is_banned'],
+            'average_rating': average_rating,
+            'total_reviews': total_reviews,
+            'offered_skills': offered[user['id']],
+            'wanted_skills': wanted[user['id']],
+        })
+    return rows
+
+
+def swap_rows(swaps):
+    """SwapRequestSerializer output for ``swaps``, dicts of SWAP_VALUES."""
+    ids = [swap['id'] for swap in swaps]
+    offered = _group(SwapRequestOfferedSkill.objects.filter(swap_request_id__in=ids).order_by('id')
+                     .values_list('swap_request_id', 'skill__name'), ids)
+    wanted = _group(SwapRequestWantedSkill.objects.filter(swap_request_id__in=ids).order_by('id')
+                    .values_list('swap_request_id', 'skill__name'), ids)
+    return [{
+        'id': swap['id'],
+        'requester_id': swap['requester_id'],
+        'requester_name': swap['requester__full_name'],
+        'receiver_id': swap['receiver_id'],
+        'receiver_name': swap['receiver__full_name'],
+        'message': swap['message'],
+        'status': swap['status'],
+        'created_at': _datetime.to_representation(swap['created_at']),
+        'updated_at': _datetime.to_representation(swap['updated_at']),
+        'offered_skills': offered[swap['id']],
+        'wanted_skills': wanted[swap['id']],
+    } for swap in swaps]
@@ -0,0 +1,50 @@
+import csv
+import os
+import threading
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'gazetteer.csv')
+ALIAS_SEPARATOR = '|'
+
+_places = None
+_lock = threading.Lock()
+
+
+def place_key(text):
+    return ' '.join(text.split()).lower()
+
+
+def _load():
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as fh:
+        for row in csv.DictReader(fh):
+            point = (float(row['latitude']), float(row['longitude']))
+            for name in [row['name'], *row['aliases'].split(ALIAS_SEPARATOR)]:
+                if name.strip():
+                    places[place_key(name)] = point
+    return places
+
+
+def places():
+    """{normalized place name: (latitude, longitude)}, read once per process."""
+    global _places
+    if _places is None:
+        with _lock:
+            if _places is None:
+                _places = _load()
+    return _places
+
+
+def geocode(location):
+    """``(latitude, longitude)`` of a free-text location, or None.
+
+    Tries the whole text, then its first comma-separated part, so
+    "Pune, Maharashtra" and "Pune" both resolve. "Remote" and unknown places
+    stay unplaced.
+    """
+    if not location:
+        return None
+    known = places()
+    key = place_key(location)
+    if key in known:
+        return known[key]
+    return known.get(place_key(key.split(',')[0]))
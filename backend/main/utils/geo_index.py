@@ -0,0 +1,158 @@
+import math
+
+from ..models import CustomUser
+from .versioning import DeferredWrites, VersionedIndex, bump_version
+
+GEO_INDEX_VERSION_KEY = 'geo_index'
+
+# Grid cells are CELL_DEGREES on a side: about 55 km north-south, narrower
+# east-west away from the equator.
+CELL_DEGREES = 0.5
+CELL_COLUMNS = int(360 / CELL_DEGREES)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+MAX_NEAR_KM = 500
+
+
+def distance_km(a, b):
+    """Great-circle distance between two ``(latitude, longitude)`` points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def cell_of(point):
+    latitude, longitude = point
+    return math.floor(latitude / CELL_DEGREES), math.floor((longitude + 180) / CELL_DEGREES) % CELL_COLUMNS
+
+
+def _cells_within(point, radius_km):
+    """The grid cells a circle of ``radius_km`` around ``point`` can touch."""
+    latitude, longitude = point
+    dlat = radius_km / KM_PER_DEGREE
+    rows = range(math.floor((latitude - dlat) / CELL_DEGREES), math.floor((latitude + dlat) / CELL_DEGREES) + 1)
+    # Parallels are shortest at the box edge furthest from the equator.
+    edge = min(90.0, abs(latitude) + dlat)
+    cos_edge = math.cos(math.radians(edge))
+    if cos_edge < 1e-6 or radius_km / (KM_PER_DEGREE * cos_edge) >= 180:
+        columns = range(CELL_COLUMNS)
+    else:
+        dlon = radius_km / (KM_PER_DEGREE * cos_edge)
+        first = math.floor((longitude - dlon + 180) / CELL_DEGREES)
+        last = math.floor((longitude + dlon + 180) / CELL_DEGREES)
+        columns = {column % CELL_COLUMNS for column in range(first, last + 1)}
+    return [(row, column) for row in rows for column in columns]
+
+
+class _Grid:
+    """The distinct points in each grid cell and the users placed at each point."""
+
+    def __init__(self, rows):
+        self.cells, self.users, self.points = {}, {}, {}
+        for user_id, latitude, longitude in rows:
+            self.set(user_id, (latitude, longitude))
+        self.last_id = max(self.points, default=0)
+
+    def set(self, user_id, point):
+        old = self.points.pop(user_id, None)
+        if old is not None:
+            here = self.users[old]
+            here.discard(user_id)
+            if not here:
+                del self.users[old]
+                cell = self.cells[cell_of(old)]
+                cell.discard(old)
+                if not cell:
+                    del self.cells[cell_of(old)]
+        if point is not None:
+            self.points[user_id] = point
+            if point not in self.users:
+                self.users[point] = set()
+                self.cells.setdefault(cell_of(point), set()).add(point)
+            self.users[point].add(user_id)
+
+    def add_registered(self, rows):
+        for user_id, latitude, longitude in rows:
+            self.set(user_id, (latitude, longitude))
+            self.last_id = max(self.last_id, user_id)
+
+
+class GeoIndex(VersionedIndex):
+    """Per-process grid index: grid cell -> the places users are at in it.
+
+    Every user with coordinates is indexed; callers apply visibility as they
+    already do. Geocoded users share a handful of places, so a radius query
+    measures each distinct place in the cells the circle overlaps once,
+    however many users are there. Local writes are applied by the signal
+    handlers in ``main.signals``. Other workers' moves and deletes are
+    picked up through a shared ``DataVersion`` counter; their sign-ups, the
+    common write, do not bump it and are read by id at each version check
+    instead.
+    """
+
+    version_key = GEO_INDEX_VERSION_KEY
+    # A sign-up that commits after a higher id was already read is caught by
+    # the periodic full reload.
+    reload_interval = 300.0
+
+    def _placed(self, after_id=0):
+        return CustomUser.objects.filter(
+            id__gt=after_id, latitude__isnull=False, longitude__isnull=False,
+        ).order_by('id').values_list('id', 'latitude', 'longitude')
+
+    def _load(self):
+        return _Grid(self._placed().iterator(chunk_size=10000))
+
+    def _poll(self, grid):
+        """Place users registered since the last read, here or elsewhere."""
+        rows = list(self._placed(grid.last_id))
+        if not rows:
+            return None
+
+        def update(grid):
+            grid.add_registered(rows)
+            return grid
+        return update
+
+    # -- incremental updates --------------------------------------------
+
+    def is_current(self, user_id, point):
+        """True if the loaded index already places ``user_id`` at ``point``."""
+        with self._lock:
+            return self._data is not None and self._data.points.get(user_id) == point
+
+    def set(self, user_id, point):
+        """Place ``user_id`` at ``point``, or unplace them when it is None."""
+        self._write('set', user_id, point)
+
+    # -- lookups ---------------------------------------------------------
+
+    def point(self, user_id):
+        self.ensure_fresh()
+        with self._lock:
+            return self._data.points.get(user_id) if self._data is not None else None
+
+    def near(self, point, radius_km):
+        """``{user_id: km}`` for the users within ``radius_km`` of ``point``."""
+        self.ensure_fresh()
+        with self._lock:
+            grid = self._data
+            found = {}
+            if grid is None:
+                return found
+            for cell in _cells_within(point, radius_km):
+                for place in grid.cells.get(cell, ()):
+                    km = distance_km(point, place)
+                    if km <= radius_km:
+                        found.update(dict.fromkeys(grid.users[place], km))
+            return found
+
+
+geo_index = GeoIndex()
+geo_index_writes = DeferredWrites(GEO_INDEX_VERSION_KEY, geo_index.mark_written)
+
+
+def bump_geo_index_version():
+    return bump_version(GEO_INDEX_VERSION_KEY)
@@ -12,17 +12,26 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY not set in environment variables.")
 
-JWT_EXPIRATION_DELTA = timedelta(days=100)
+# Access tokens are checked against the in-process auth state only, so keep
+# them short; refresh tokens are exchanged for new ones after a DB check.
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=15)
+REFRESH_TOKEN_LIFETIME = timedelta(days=100)
 
-def generate_jwt(user):
+def _encode(user, token_type, lifetime):
     payload = {
         "user_id": user.id,
         "email": user.email,
-        "exp": datetime.utcnow() + JWT_EXPIRATION_DELTA,
+        "type": token_type,
+        "exp": datetime.utcnow() + lifetime,
         "iat": datetime.utcnow()
     }
-    token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
-    return token
+    return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+
+def generate_jwt(user):
+    return _encode(user, "access", ACCESS_TOKEN_LIFETIME)
+
+def generate_refresh_jwt(user):
+    return _encode(user, "refresh", REFRESH_TOKEN_LIFETIME)
 
 def decode_jwt(token):
     try:
@@ -0,0 +1,81 @@
+import heapq
+from collections import defaultdict
+
+from ..models import CustomUser, Skill, UserSkill
+from .skill_index import skill_index
+
+DEFAULT_MATCH_LIMIT = 20
+MAX_MATCH_LIMIT = 100
+
+
+def _skill_holders(skill_ids, skill_type, exclude_user_id):
+    """Walk the in-memory skill -> users index for the given skills only.
+
+    Returns {user_id: {skill_id, ...}} over visible users, so the cost depends
+    on how many people hold these skills, not on the size of the user table.
+    """
+    holders = defaultdict(set)
+    for skill_id in skill_ids:
+        for user_id in skill_index.holders(skill_id, skill_type):
+            if user_id != exclude_user_id:
+                holders[user_id].add(skill_id)
+    return holders
+
+
+def find_matches(user, limit=DEFAULT_MATCH_LIMIT, near=None):
+    """Ranked matches for ``user``; only those in ``near``, ``{user_id: km}``, if given."""
+    my_offered, my_wanted = set(), set()
+    for skill_id, skill_type in UserSkill.objects.filter(user=user).values_list('skill_id', 'type'):
+        (my_offered if skill_type == 'offered' else my_wanted).add(skill_id)
+
+    # People who offer what I want, and people who want what I offer.
+    they_offer = _skill_holders(my_wanted, 'offered', user.id)
+    they_want = _skill_holders(my_offered, 'wanted', user.id)
+
+    def rank(user_id):
+        offered = len(they_offer.get(user_id, ()))
+        wanted = len(they_want.get(user_id, ()))
+        # Two-way matches first, then by total overlap, then oldest account.
+        return (bool(offered and wanted), offered + wanted, -user_id)
+
+    candidates = set(they_offer) | set(they_want)
+    if near is not None:
+        candidates &= near.keys()
+    top_ids = heapq.nlargest(limit, candidates, key=rank)
+    if not top_ids:
+        return []
+
+    users = CustomUser.objects.filter(id__in=top_ids).select_related('rating_summary').in_bulk()
+    skill_ids = set()
+    for user_id in top_ids:
+        skill_ids |= they_offer.get(user_id, set()) | they_want.get(user_id, set())
+    skill_names = dict(Skill.objects.filter(id__in=skill_ids).values_list('id', 'name'))
+
+    results = []
+    for user_id in top_ids:
+        # The index can still list users and skills deleted since its last
+        # version check; leave them out.
+        match = users.get(user_id)
+        if match is None:
+            continue
+        summary = getattr(match, 'rating_summary', None)
+        offered = sorted(skill_names[s] for s in they_offer.get(user_id, ()) if s in skill_names)
+        wanted = sorted(skill_names[s] for s in they_want.get(user_id, ()) if s in skill_names)
+        if not (offered or wanted):
+            continue
+        result = {
+            'id': match.id,
+            'full_name': match.full_name,
+            'location': match.location,
+            'availability': match.availability,
+            'average_rating': summary.average_rating if summary else 0.0,
+            'total_reviews': summary.total_reviews if summary else 0,
+            'offers_skills_i_want': offered,
+            'wants_skills_i_offer': wanted,
+            'is_mutual': bool(offered and wanted),
+            'score': len(offered) + len(wanted),
+        }
+        if near is not None:
+            result['distance_km'] = round(near[user_id], 1)
+        results.append(result)
+    return results
@@ -0,0 +1,111 @@
+
+from django.db.models import Count, Max
+from django.utils.cache import quote_etag
+
+from ..models import PlatformMessage
+from .versioning import LOAD, DeferredWrites, VersionedCache, aget_version, get_version
+
+PLATFORM_MESSAGES_VERSION_KEY = 'platform_messages'
+
+MESSAGE_STATS = {'latest': Max('created_at'), 'count': Count('id')}
+
+# Distinct pages (cursor x page size) kept per worker.
+MAX_CACHED_PAGES = 256
+
+
+class PlatformMessageCache(VersionedCache):
+    """Per-process cache of the platform message validators and pages.
+
+    Messages change rarely but are read on every page load. Between writes
+    a request is answered from memory: a 304 when the client's ETag or
+    Last-Modified still matches, otherwise a cached serialized page. Writes
+    made through this worker invalidate on commit; other workers' writes are
+    noticed through a shared ``DataVersion`` counter.
+    """
+
+    version_key = PLATFORM_MESSAGES_VERSION_KEY
+
+    def __init__(self):
+        super().__init__()
+        self._validators = None
+        self._pages = {}
+        self._generation = 0
+
+    @property
+    def is_loaded(self):
+        return self._validators is not None
+
+    def _clear(self):
+        self._validators = None
+        self._pages = {}
+        self._generation += 1
+
+    def mark_written(self, new_version):
+        # Our own writes change the validators too.
+        self.invalidate()
+
+    def _store(self, version, stats):
+        latest = stats['latest']
+        last_modified = int(latest.timestamp()) if latest else None
+        # created_at and the count catch additions and deletions; the version
+        # also catches edits made through the admin site.
+        etag = quote_etag(f"{stats['count']}-{latest.timestamp() if latest else 0}-{version}")
+        with self._lock:
+            self._clear()
+            self._validators = (etag, last_modified)
+            self._mark_loaded(version)
+        return etag, last_modified
+
+    def _stale(self):
+        """``(due, validators, version)``; see VersionedCache._due."""
+        with self._lock:
+            return self._due(), self._validators, self._version
+
+    def validators(self):
+        """Return ``(etag, last_modified)`` for the current message set.
+
+        Between version checks conditional requests are answered without
+        touching the DB.
+        """
+        due, validators, version = self._stale()
+        if due is None:
+            return validators
+        latest = get_version(PLATFORM_MESSAGES_VERSION_KEY)
+        if due is LOAD or latest != version:
+            return self._store(latest, PlatformMessage.objects.aggregate(**MESSAGE_STATS))
+        return validators
+
+    async def avalidators(self):
+        due, validators, version = self._stale()
+        if due is None:
+            return validators
+        latest = await aget_version(PLATFORM_MESSAGES_VERSION_KEY)
+        if due is LOAD or latest != version:
+            return self._store(latest, await PlatformMessage.objects.aaggregate(**MESSAGE_STATS))
+        return validators
+
+    def _cached(self, key):
+        with self._lock:
+            return self._pages.get(key), self._generation
+
+    def _keep(self, key, data, generation):
+        with self._lock:
+            # Drop pages built from data that was invalidated meanwhile.
+            if generation == self._generation:
+                if len(self._pages) >= MAX_CACHED_PAGES:
+                    self._pages = {}
+                self._pages[key] = data
+        return data
+
+    def page(self, key, build):
+        """Cached page for ``key``; ``build`` serializes it on a miss."""
+        data, generation = self._cached(key)
+        return data if data is not None else self._keep(key, build(), generation)
+
+    async def apage(self, key, build):
+        """``page`` with ``build`` a coroutine function."""
+        data, generation = self._cached(key)
+        return data if data is not None else self._keep(key, await build(), generation)
+
+platform_messages = PlatformMessageCache()
+platform_message_writes = DeferredWrites(PLATFORM_MESSAGES_VERSION_KEY, platform_messages.mark_written)
@@ -0,0 +1,147 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings collected while one request is being handled."""
+
+    __slots__ = ('queries', 'db_seconds', 'render_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection (see signals).
+
+    The metrics object lives in a context variable rather than on the
+    connection, so queries run by the async ORM in a worker thread are
+    attributed to the request that issued them.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_seconds += time.perf_counter() - start
+        metrics.queries += 1
+
+
+def current_metrics():
+    return _current.get()
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def expose(self, label_names):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self._series.items()):
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+
+    def inc(self, labels):
+        self._series[labels] = self._series.get(labels, 0) + 1
+
+    def expose(self, label_names):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._series.items()):
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(label_names, labels))
+            lines.append(f'{self.name}{{{base}}} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """Per-process request histograms, exposed in Prometheus text format."""
+
+    LABELS = ('view', 'method')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter('http_requests_total', 'Requests handled, by view, method and status.')
+        self.duration = Histogram('http_request_duration_seconds', 'Total time spent handling the request.',
+                                  LATENCY_BUCKETS)
+        self.db_time = Histogram('http_request_db_seconds', 'Time spent executing SQL.', LATENCY_BUCKETS)
+        self.view_time = Histogram('http_request_view_seconds',
+                                   'Time in the view and its serializers, excluding SQL.', LATENCY_BUCKETS)
+        self.render_time = Histogram('http_request_render_seconds', 'Time spent rendering the response body.',
+                                     LATENCY_BUCKETS)
+        self.queries = Histogram('http_request_db_queries', 'SQL queries executed per request.',
+                                 QUERY_COUNT_BUCKETS)
+        self.size = Histogram('http_response_size_bytes', 'Response body size.', SIZE_BUCKETS)
+
+    def observe(self, view, method, status, total, metrics, size):
+        labels = (view, method)
+        with self._lock:
+            self.requests.inc((view, method, str(status)))
+            self.duration.observe(labels, total)
+            self.db_time.observe(labels, metrics.db_seconds)
+            self.view_time.observe(labels, max(0.0, total - metrics.db_seconds - metrics.render_seconds))
+            self.render_time.observe(labels, metrics.render_seconds)
+            self.queries.observe(labels, metrics.queries)
+            if size is not None:
+                self.size.observe(labels, size)
+
+    def expose(self):
+        with self._lock:
+            lines = self.requests.expose(self.LABELS + ('status',))
+            for histogram in (self.duration, self.db_time, self.view_time, self.render_time, self.queries, self.size):
+                lines.extend(histogram.expose(self.LABELS))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.__init__()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,46 @@
+from django.core.cache import cache
+
+from .versioning import VersionBumps, aget_version, get_version
+
+PROFILE_CACHE_TIMEOUT = 60 * 60
+
+_profile_bumps = VersionBumps()
+
+
+def profile_version_key(user_id):
+    return f'profile:{user_id}'
+
+
+def bump_profile_versions(user_ids):
+    _profile_bumps.bump(profile_version_key(user_id) for user_id in user_ids)
+
+
+def get_profile_payload(user_id, build):
+    """Return the viewer-independent profile payload for ``user_id``.
+
+    Entries are keyed by the user's profile version, so any write that bumps
+    it makes the old entry unreachable. ``build`` returns the payload or None
+    when the user does not exist; misses are not cached.
+    """
+    # Read the version before the data: a concurrent write can then only make
+    # the cached payload newer than its key, never older.
+    version = get_version(profile_version_key(user_id))
+    cache_key = f'user-profile:{user_id}:{version}'
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = build()
+        if payload is not None:
+            cache.set(cache_key, payload, PROFILE_CACHE_TIMEOUT)
+    return payload
+
+
+async def aget_profile_payload(user_id, build):
+    """Async ``get_profile_payload``; ``build`` is a coroutine function."""
+    version = await aget_version(profile_version_key(user_id))
+    cache_key = f'user-profile:{user_id}:{version}'
+    payload = await cache.aget(cache_key)
+    if payload is None:
+        payload = await build()
+        if payload is not None:
+            await cache.aset(cache_key, payload, PROFILE_CACHE_TIMEOUT)
+    return payload
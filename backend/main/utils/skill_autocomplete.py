@@ -0,0 +1,191 @@
+import heapq
+from bisect import bisect_left, insort
+
+from django.db.models import Count
+
+from ..models import Skill, skill_key
+from .versioning import DeferredWrites, VersionedIndex, bump_version
+
+SKILL_VOCABULARY_VERSION_KEY = 'skill_vocabulary'
+
+# Skills whose usage is counted per query when the skill rows are re-read.
+COUNT_BATCH_SIZE = 500
+
+DEFAULT_AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 25
+
+# Short prefixes cover most of the vocabulary, so their ranked results are
+# memoised until the next write.
+MEMO_PREFIX_LENGTH = 2
+
+
+class _Vocabulary:
+    """Sorted ``(key, skill_id)`` pairs plus each skill's name and usage count."""
+
+    def __init__(self, rows):
+        self.keys, self.names, self.usage = [], {}, {}
+        for skill_id, name, key, count in rows:
+            self.keys.append((key, skill_id))
+            self.names[skill_id] = name
+            self.usage[skill_id] = count
+        self.keys.sort()
+        self.last_id = max(self.names, default=0)
+
+    def add_skill(self, skill_id, name, usage=0):
+        if skill_id in self.names:
+            return
+        insort(self.keys, (skill_key(name), skill_id))
+        self.names[skill_id] = name
+        self.usage[skill_id] = usage
+        self.last_id = max(self.last_id, skill_id)
+
+    def sync(self, skills, usage):
+        """Match the ``(id, name)`` pairs in ``skills``; ``usage`` counts the skills not held."""
+        for skill_id in self.names.keys() - {skill_id for skill_id, _ in skills}:
+            self.remove_skill(skill_id)
+        for skill_id, name in skills:
+            if skill_id not in self.names:
+                self.add_skill(skill_id, name, usage.get(skill_id, 0))
+            elif self.names[skill_id] != name:
+                self.rename_skill(skill_id, name)
+
+    def remove_skill(self, skill_id):
+        if skill_id not in self.names:
+            return
+        key = skill_key(self.names.pop(skill_id))
+        i = bisect_left(self.keys, (key, skill_id))
+        if i < len(self.keys) and self.keys[i] == (key, skill_id):
+            del self.keys[i]
+        self.usage.pop(skill_id, None)
+
+    def rename_skill(self, skill_id, name):
+        if skill_id not in self.names:
+            return
+        usage = self.usage[skill_id]
+        self.remove_skill(skill_id)
+        self.add_skill(skill_id, name)
+        self.usage[skill_id] = usage
+
+    def adjust_usage(self, skill_id, delta):
+        if skill_id in self.usage:
+            self.usage[skill_id] = max(0, self.usage[skill_id] + delta)
+
+
+class SkillAutocompleteIndex(VersionedIndex):
+    """Sorted-array prefix index over ``Skill.key`` ranked by usage.
+
+    Skills created by other workers are read by id at each version check,
+    with their usage; creates do not bump the version. When another worker
+    renames or deletes a skill only the skill rows are re-read and usage
+    counts are kept, so the ``Count`` over UserSkill runs just for skills
+    not held yet and on the periodic full reload.
+    """
+
+    version_key = SKILL_VOCABULARY_VERSION_KEY
+    # Usage counts are maintained locally from UserSkill signals; other
+    # workers' changes to them, and a skill that commits after a higher id
+    # was already read, are folded in by the periodic full reload.
+    reload_interval = 300.0
+
+    def __init__(self):
+        super().__init__()
+        self._memo = {}
+
+    def _set_data(self, data):
+        self._data = data
+        self._memo = {}
+
+    def _write(self, method, *args):
+        with self._lock:
+            super()._write(method, *args)
+            self._memo = {}
+
+    def _counted(self, skills):
+        return skills.annotate(usage=Count('userskill')).values_list('id', 'name', 'key', 'usage')
+
+    def _load(self):
+        return _Vocabulary(self._counted(Skill.objects.all()).iterator(chunk_size=10000))
+
+    def _poll(self, vocab):
+        """Add the skills created since the last read, here or elsewhere."""
+        rows = list(self._counted(Skill.objects.filter(id__gt=vocab.last_id)))
+        if not rows:
+            return None
+
+        def update(vocab):
+            for skill_id, name, _, usage in rows:
+                vocab.add_skill(skill_id, name, usage)
+            return vocab
+        return update
+
+    def _catch_up(self, vocab, known, version):
+        """Re-read the skill rows, counting usage only for skills not held."""
+        skills = list(Skill.objects.values_list('id', 'name'))
+        with self._lock:
+            new = [skill_id for skill_id, _ in skills if skill_id not in vocab.names]
+        usage = {}
+        for i in range(0, len(new), COUNT_BATCH_SIZE):
+            usage.update(Skill.objects.filter(id__in=new[i:i + COUNT_BATCH_SIZE])
+                         .annotate(usage=Count('userskill')).values_list('id', 'usage'))
+
+        def update(vocab):
+            vocab.sync(skills, usage)
+            return vocab
+        return update
+
+    def _replay(self, vocab, pending, kept):
+        # Usage changes made during an in-place update already counted.
+        super()._replay(vocab, [(method, args) for method, args in pending
+                                if not (kept and method == 'adjust_usage')], kept)
+
+    # -- incremental updates --------------------------------------------
+
+    def add_skill(self, skill_id, name):
+        self._write('add_skill', skill_id, name)
+
+    def remove_skill(self, skill_id):
+        self._write('remove_skill', skill_id)
+
+    def rename_skill(self, skill_id, name):
+        self._write('rename_skill', skill_id, name)
+
+    def adjust_usage(self, skill_id, delta):
+        self._write('adjust_usage', skill_id, delta)
+
+    # -- lookups ---------------------------------------------------------
+
+    def search(self, query, limit=DEFAULT_AUTOCOMPLETE_LIMIT):
+        prefix = skill_key(query)
+        if not prefix:
+            return []
+        self.ensure_fresh()
+        with self._lock:
+            vocab = self._data
+            if vocab is None:
+                return []
+            memo_key = (prefix, limit)
+            if memo_key in self._memo:
+                return self._memo[memo_key]
+
+            lo = bisect_left(vocab.keys, (prefix,))
+            hi = bisect_left(vocab.keys, (prefix + '\uffff',), lo)
+            matches = heapq.nsmallest(
+                limit,
+                (skill_id for _, skill_id in vocab.keys[lo:hi]),
+                key=lambda skill_id: (-vocab.usage.get(skill_id, 0), vocab.names[skill_id].lower(), skill_id),
+            )
+            results = [
+                {'id': skill_id, 'name': vocab.names[skill_id], 'usage_count': vocab.usage.get(skill_id, 0)}
+                for skill_id in matches
+            ]
+            if len(prefix) <= MEMO_PREFIX_LENGTH:
+                self._memo[memo_key] = results
+            return results
+
+
+skill_autocomplete = SkillAutocompleteIndex()
+skill_vocabulary_writes = DeferredWrites(SKILL_VOCABULARY_VERSION_KEY, skill_autocomplete.mark_written)
+
+
+def bump_skill_vocabulary_version():
+    return bump_version(SKILL_VOCABULARY_VERSION_KEY)
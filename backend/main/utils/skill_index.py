@@ -0,0 +1,171 @@
+from array import array
+from bisect import bisect_left, insort
+
+from ..models import CustomUser, UserSkill
+from .versioning import JournaledWrites, VersionedIndex, bump_version, changes_since
+
+SKILL_INDEX_VERSION_KEY = 'skill_index'
+
+SKILL_TYPES = ('offered', 'wanted')
+
+# Users whose rows a worker re-reads to catch up; further behind it reloads.
+CATCH_UP_USERS = 1000
+
+
+def _contains(arr, value):
+    i = bisect_left(arr, value)
+    return i < len(arr) and arr[i] == value
+
+
+class _Postings:
+    """Sorted user ids per skill and type, plus the ids of hidden users."""
+
+    def __init__(self, rows, hidden):
+        self.postings = {skill_type: {} for skill_type in SKILL_TYPES}
+        for skill_id, skill_type, user_id in rows:
+            bucket = self.postings[skill_type].get(skill_id)
+            if bucket is None:
+                bucket = self.postings[skill_type][skill_id] = array('q')
+            bucket.append(user_id)
+        self.hidden = set(hidden)
+
+    def add(self, user_id, skill_id, skill_type):
+        if user_id in self.hidden:
+            return
+        bucket = self.postings[skill_type].setdefault(skill_id, array('q'))
+        if not _contains(bucket, user_id):
+            insort(bucket, user_id)
+
+    def remove(self, user_id, skill_id, skill_type):
+        bucket = self.postings[skill_type].get(skill_id)
+        if bucket is None:
+            return
+        i = bisect_left(bucket, user_id)
+        if i < len(bucket) and bucket[i] == user_id:
+            del bucket[i]
+            if not bucket:
+                del self.postings[skill_type][skill_id]
+
+    def set_visibility(self, user_id, visible, skills=()):
+        if visible:
+            self.hidden.discard(user_id)
+            for skill_id, skill_type in skills:
+                self.add(user_id, skill_id, skill_type)
+        else:
+            for skill_id, skill_type in skills:
+                self.remove(user_id, skill_id, skill_type)
+            self.hidden.add(user_id)
+
+
+class SkillIndex(VersionedIndex):
+    """Per-process inverted index: skill id -> sorted user ids, per skill type.
+
+    Only active, unbanned, public users are indexed. Local writes are applied
+    incrementally by the signal handlers in ``main.signals``. Writes made by
+    other workers are noticed through a shared ``DataVersion`` counter and
+    applied from its journal: each entry names a ``[user_id, skill_id, type]``
+    row or a ``[user_id]`` whose visibility changed, and only those users'
+    rows are re-read.
+    """
+
+    version_key = SKILL_INDEX_VERSION_KEY
+    # Writes that send no signal (queryset .update(), bulk_create()) are
+    # picked up by the periodic full reload.
+    reload_interval = 300.0
+
+    def _load(self):
+        rows = UserSkill.objects.filter(
+            user__is_active=True, user__is_banned=False, user__is_public=True,
+        ).order_by('skill_id', 'user_id').values_list('skill_id', 'type', 'user_id')
+        hidden = CustomUser.objects.exclude(
+            is_active=True, is_banned=False, is_public=True,
+        ).values_list('id', flat=True)
+        return _Postings(rows.iterator(chunk_size=10000), hidden)
+
+    def _catch_up(self, index, known, version):
+        changes = changes_since(SKILL_INDEX_VERSION_KEY, known, version)
+        if changes is None:
+            return None
+        user_ids = {change[0] for change in changes}
+        if len(user_ids) > CATCH_UP_USERS:
+            return None
+        visible = set(CustomUser.objects.filter(
+            id__in=user_ids, is_active=True, is_banned=False, is_public=True,
+        ).values_list('id', flat=True))
+        held = {}
+        for user_id, skill_id, skill_type in UserSkill.objects.filter(
+                user_id__in=user_ids).values_list('user_id', 'skill_id', 'type'):
+            held.setdefault(user_id, set()).add((skill_id, skill_type))
+
+        def update(index):
+            # Visibility first: add() leaves out hidden users.
+            for user_id in {change[0] for change in changes if len(change) == 1}:
+                index.set_visibility(user_id, user_id in visible, held.get(user_id, ()))
+            for user_id, skill_id, skill_type in (change for change in changes if len(change) == 3):
+                if (skill_id, skill_type) in held.get(user_id, ()):
+                    index.add(user_id, skill_id, skill_type)
+                else:
+                    index.remove(user_id, skill_id, skill_type)
+            return index
+        return update
+
+    # -- incremental updates --------------------------------------------
+
+    def add(self, user_id, skill_id, skill_type):
+        self._write('add', user_id, skill_id, skill_type)
+
+    def remove(self, user_id, skill_id, skill_type):
+        self._write('remove', user_id, skill_id, skill_type)
+
+    def is_hidden(self, user_id):
+        index = self._data
+        return index is not None and user_id in index.hidden
+
+    def set_visibility(self, user_id, visible, skills=()):
+        """Show or hide a user; ``skills`` are their (skill_id, type) rows."""
+        self._write('set_visibility', user_id, visible, skills)
+
+    # -- lookups ---------------------------------------------------------
+
+    def holders(self, skill_id, skill_type):
+        """Sorted user ids holding ``skill_id`` as ``skill_type``."""
+        self.ensure_fresh()
+        with self._lock:
+            if self._data is None:
+                return array('q')
+            return array('q', self._data.postings[skill_type].get(skill_id, ()))
+
+    def intersect(self, skill_ids, skill_type):
+        """User ids holding every skill in ``skill_ids``, ascending."""
+        self.ensure_fresh()
+        with self._lock:
+            if self._data is None:
+                return []
+            return self._intersect(self._data.postings[skill_type], skill_ids)
+
+    def _intersect(self, postings, skill_ids):
+        buckets = [postings.get(skill_id) for skill_id in set(skill_ids)]
+        if not buckets or any(not b for b in buckets):
+            return []
+        # Probe the rarest skill's users into the larger lists.
+        buckets.sort(key=len)
+        result = list(buckets[0])
+        for bucket in buckets[1:]:
+            result = [user_id for user_id in result if _contains(bucket, user_id)]
+            if not result:
+                break
+        return result
+
+    def users_offering(self, *skill_ids):
+        return self.intersect(skill_ids, 'offered')
+
+    def users_wanting(self, *skill_ids):
+        return self.intersect(skill_ids, 'wanted')
+
+
+skill_index = SkillIndex()
+skill_index_writes = JournaledWrites(SKILL_INDEX_VERSION_KEY, skill_index.mark_written)
+
+
+def bump_skill_index_version():
+    return bump_version(SKILL_INDEX_VERSION_KEY)
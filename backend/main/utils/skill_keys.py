@@ -0,0 +1,56 @@
+from .versioning import DeferredWrites, VersionedCache, get_version
+
+SKILL_KEYS_VERSION_KEY = 'skill_keys'
+
+
+class SkillKeyCache(VersionedCache):
+    """Per-process ``Skill.key`` -> id map of the skills this worker has seen.
+
+    Entries are added one at a time: skills a lookup found, once the
+    transaction that read them commits, and skills created here. A key that
+    is missing costs the query it would have cost anyway, so skills created
+    by other workers need no notice. Renames and deletes could leave a wrong
+    id behind, so they bump a shared ``DataVersion`` counter, and a worker
+    that sees the counter move drops its map.
+    """
+
+    version_key = SKILL_KEYS_VERSION_KEY
+
+    def __init__(self):
+        super().__init__()
+        self._ids = {}
+
+    @property
+    def is_loaded(self):
+        return self._version is not None
+
+    def _clear(self):
+        self._ids = {}
+
+    def _check_version(self):
+        with self._lock:
+            if self._due() is None:
+                return
+        version = get_version(SKILL_KEYS_VERSION_KEY)
+        with self._lock:
+            if version != self._version:
+                self._ids = {}
+                self._mark_loaded(version)
+
+    def get_many(self, keys):
+        """``{key: skill_id}`` for the cached skills among ``keys``."""
+        self._check_version()
+        with self._lock:
+            return {key: self._ids[key] for key in keys if key in self._ids}
+
+    def add_many(self, ids):
+        with self._lock:
+            self._ids.update(ids)
+
+    def forget(self, key):
+        with self._lock:
+            self._ids.pop(key, None)
+
+
+skill_keys = SkillKeyCache()
+skill_key_writes = DeferredWrites(SKILL_KEYS_VERSION_KEY, skill_keys.mark_written)
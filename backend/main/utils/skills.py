@@ -0,0 +1,73 @@
+from django.db import IntegrityError, transaction
+
+from ..models import Skill, skill_key
+from ..signals import send_post_save_for_bulk
+from .skill_keys import skill_keys
+
+
+def clean_skill_names(names):
+    """Strip names, drop blanks and names with a key already seen, keep first-seen order."""
+    cleaned = {}
+    for name in names:
+        name = name.strip()
+        if name:
+            cleaned.setdefault(skill_key(name), name)
+    return list(cleaned.values())
+
+
+def resolve_skill_ids(names, create=()):
+    """Map skill names to ids by their normalized key.
+
+    Skills this worker has already seen come from ``skill_keys`` without a
+    query; only the other keys are looked up. Names in ``create`` that do not
+    exist yet are bulk-inserted under the first spelling given; other unknown
+    names are left out of the result.
+    """
+    keys = {name: skill_key(name) for name in [*names, *create]}
+    if not keys:
+        return {}
+
+    ids = skill_keys.get_many(set(keys.values()))
+    unknown = set(keys.values()) - ids.keys()
+    if unknown:
+        found = dict(Skill.objects.filter(key__in=unknown).values_list('key', 'id'))
+        # Cache them only once they are known to be committed.
+        transaction.on_commit(lambda: skill_keys.add_many(found))
+        ids.update(found)
+    missing = {}
+    for name in create:
+        if keys[name] not in ids:
+            missing.setdefault(keys[name], name)
+    if missing:
+        created = _insert_skills(missing)
+        ids.update((skill.key, skill.id) for skill in created)
+        # Keys a concurrent request inserted first.
+        taken = missing.keys() - ids.keys()
+        if taken:
+            found = dict(Skill.objects.filter(key__in=taken).values_list('key', 'id'))
+            transaction.on_commit(lambda: skill_keys.add_many(found))
+            ids.update(found)
+    return {name: ids[key] for name, key in keys.items() if key in ids}
+
+
+def _insert_skills(missing):
+    """Insert a skill per ``{key: name}`` item; return the ones inserted here.
+
+    post_save goes out only for those, so a skill a concurrent request
+    inserted first is not announced twice.
+    """
+    try:
+        with transaction.atomic():
+            created = Skill.objects.bulk_create([Skill(name=name, key=key) for key, name in missing.items()])
+    except IntegrityError:
+        # Some key was taken meanwhile; insert the rest one at a time.
+        created = []
+        for name in missing.values():
+            try:
+                with transaction.atomic():
+                    created.append(Skill.objects.create(name=name))
+            except IntegrityError:
+                pass
+    else:
+        send_post_save_for_bulk(Skill, created)
+    return created
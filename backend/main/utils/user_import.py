@@ -0,0 +1,225 @@
+import csv
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from ..models import CustomUser, UserRatingSummary, UserSkill
+from ..serializers import ImportUserRowSerializer
+from ..signals import send_post_save_for_bulk
+from .gazetteer import geocode
+from .profile_cache import bump_profile_versions
+from .skills import clean_skill_names, resolve_skill_ids
+
+IMPORT_BATCH_SIZE = 500
+SKILL_SEPARATOR = ';'
+# Smallest batch of passwords worth sending to the process pool.
+POOL_MIN_PASSWORDS = 32
+REQUIRED_CSV_COLUMNS = {'full_name', 'email', 'password'}
+BATCH_FAILED = 'Not imported: the database rejected the batch holding this row.'
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole cannot be read."""
+
+
+def csv_rows(lines):
+    """Row dicts from CSV ``lines``; skill columns hold ';'-separated names."""
+    reader = csv.DictReader(lines)
+    missing = REQUIRED_CSV_COLUMNS - set(reader.fieldnames or ())
+    if missing:
+        raise ImportFormatError(f"CSV header is missing: {', '.join(sorted(missing))}.")
+    for row in reader:
+        # Empty cells, and the missing ones of short rows, are absent values.
+        row = {key: value for key, value in row.items() if key is not None and value}
+        for column in ('offered_skills', 'wanted_skills'):
+            if column in row:
+                row[column] = row[column].split(SKILL_SEPARATOR)
+        yield row
+
+
+def ndjson_rows(lines):
+    """Row dicts from NDJSON ``lines``; unreadable lines yield None."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+class PasswordHasher:
+    """Hash passwords on a process pool, started on first use.
+
+    Workers only run make_password; django.setup() gives them the hasher
+    settings when they are spawned rather than forked. Fewer than
+    POOL_MIN_PASSWORDS are hashed in the calling thread, where sending them
+    to the pool would cost more than it saves.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            # A pool inherited through fork() has no workers of its own.
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup)
+                self._pid = os.getpid()
+            return self._pool
+
+    def hash(self, passwords):
+        if self.workers == 1 or len(passwords) < POOL_MIN_PASSWORDS:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._get_pool().map(make_password, passwords, chunksize=chunksize))
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+
+
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def password_hasher(workers=None):
+    """The process's PasswordHasher for ``workers``, so imports share one pool."""
+    with _hashers_lock:
+        if workers not in _hashers:
+            _hashers[workers] = PasswordHasher(workers)
+        return _hashers[workers]
+
+
+class UserImport:
+    """Create accounts from a stream of row dicts, one batch at a time.
+
+    Each batch is validated, checked against existing accounts with one
+    ``IN`` query, hashed on the shared process pool and written with
+    bulk_create in its own transaction, so memory stays flat however large the upload.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, hash_workers=None):
+        self.batch_size = batch_size
+        self.hasher = password_hasher(hash_workers)
+        self.created = 0
+        self.errors = []
+        self._seen_emails = set()
+
+    def run(self, rows):
+        batch = []
+        for number, row in enumerate(rows, start=1):
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report()
+
+    def report(self):
+        # Rows fail at different stages of their batch; report them in upload order.
+        errors = sorted(self.errors, key=lambda error: error['row'])
+        return {'created': self.created, 'failed': len(errors), 'errors': errors}
+
+    def fail(self, number, errors, email=None):
+        self.errors.append({'row': number, 'email': email, 'errors': errors})
+
+    def import_batch(self, batch):
+        valid = []
+        for number, row in batch:
+            if row is None:
+                self.fail(number, {'non_field_errors': ['Row is not a JSON object.']})
+                continue
+            serializer = ImportUserRowSerializer(data=row)
+            if not serializer.is_valid():
+                self.fail(number, serializer.errors, row.get('email'))
+                continue
+            data = serializer.validated_data
+            data['email'] = CustomUser.objects.normalize_email(data['email'])
+            if data['email'] in self._seen_emails:
+                self.fail(number, {'email': ['Duplicate email in this upload.']}, data['email'])
+                continue
+            self._seen_emails.add(data['email'])
+            valid.append((number, data))
+
+        valid = self.drop_taken(valid)
+        if not valid:
+            return
+        passwords = self.hasher.hash([data['password'] for _, data in valid])
+        try:
+            self.insert(valid, passwords)
+            return
+        except IntegrityError:
+            pass
+        # Most likely an account was registered between the check and the
+        # insert; retry without it. Any other conflict fails this batch
+        # only, as earlier batches are already committed.
+        kept = self.drop_taken(valid)
+        kept_numbers = {number for number, _ in kept}
+        try:
+            if len(kept) < len(valid):
+                self.insert(kept, [password for (number, _), password in zip(valid, passwords) if number in kept_numbers])
+                return
+        except IntegrityError:
+            pass
+        for number, data in kept:
+            self.fail(number, {'non_field_errors': [BATCH_FAILED]}, data['email'])
+
+    def drop_taken(self, valid):
+        """``valid`` without the rows whose email is already registered."""
+        taken = set(CustomUser.objects.filter(
+            email__in=[data['email'] for _, data in valid],
+        ).values_list('email', flat=True))
+        for number, data in valid:
+            if data['email'] in taken:
+                self.fail(number, {'email': ['Email already registered.']}, data['email'])
+        return [(number, data) for number, data in valid if data['email'] not in taken]
+
+    def insert(self, valid, passwords):
+        if not valid:
+            return
+        rows = [data for _, data in valid]
+        # bulk_create skips CustomUser.save(), which places the location.
+        points = [geocode(data.get('location')) or (None, None) for data in rows]
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create([
+                CustomUser(
+                    full_name=data['full_name'], email=data['email'], password=password,
+                    location=data.get('location') or None, availability=data.get('availability') or None,
+                    latitude=latitude, longitude=longitude, is_public=data['is_public'],
+                )
+                for data, password, (latitude, longitude) in zip(rows, passwords, points)
+            ])
+            summaries = UserRatingSummary.objects.bulk_create([UserRatingSummary(user=user) for user in users])
+
+            skills = [
+                (user, skill_type, clean_skill_names(data[f'{skill_type}_skills']))
+                for user, data in zip(users, rows) for skill_type in ('offered', 'wanted')
+            ]
+            # A list, so a new skill is created under its first spelling in the upload.
+            skill_ids = resolve_skill_ids((), create=list(dict.fromkeys(name for _, _, names in skills for name in names)))
+            user_skills = UserSkill.objects.bulk_create([
+                UserSkill(user=user, skill_id=skill_ids[name], type=skill_type)
+                for user, skill_type, names in skills for name in names
+            ])
+
+            # bulk_create skips post_save; the in-memory indexes, directory
+            # cards and caches rely on it. Bumping every profile version in
+            # one go first leaves the per-row handlers nothing to bump.
+            bump_profile_versions([user.id for user in users])
+            send_post_save_for_bulk(CustomUser, users)
+            send_post_save_for_bulk(UserRatingSummary, summaries)
+            send_post_save_for_bulk(UserSkill, user_skills)
+        self.created += len(users)
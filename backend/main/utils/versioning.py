@@ -0,0 +1,394 @@
+import threading
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ..models import DataChange, DataVersion
+
+
+def get_version(key):
+    return DataVersion.objects.filter(key=key).values_list('version', flat=True).first() or 0
+
+
+async def aget_version(key):
+    return await DataVersion.objects.filter(key=key).values_list('version', flat=True).afirst() or 0
+
+
+def get_versions(keys):
+    versions = dict(DataVersion.objects.filter(key__in=keys).values_list('key', 'version'))
+    return {key: versions.get(key, 0) for key in keys}
+
+
+def bump_version(key):
+    """Increment the counter for ``key`` and return its new value."""
+    if not DataVersion.objects.filter(key=key).update(version=F('version') + 1):
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(key=key, version=1)
+            return 1
+        except IntegrityError:
+            DataVersion.objects.filter(key=key).update(version=F('version') + 1)
+    return get_version(key)
+
+
+def bump_versions(keys):
+    """Increment several counters with one UPDATE (plus one INSERT for new keys)."""
+    keys = set(keys)
+    if not keys:
+        return
+    DataVersion.objects.filter(key__in=keys).update(version=F('version') + 1)
+    existing = set(DataVersion.objects.filter(key__in=keys).values_list('key', flat=True))
+    if keys - existing:
+        DataVersion.objects.bulk_create(
+            [DataVersion(key=key, version=1) for key in keys - existing], ignore_conflicts=True,
+        )
+
+
+class _Batch(list):
+    flush = None
+    savepoint_ids = None
+    flushed = False
+
+
+def _current_batch(local, connection):
+    """The batch opened by this thread in the current savepoint, if still pending."""
+    batch = getattr(local, 'batch', None)
+    # Only join a batch opened at the same savepoint depth, so a rolled back
+    # savepoint cannot leave its updates behind in an outer batch.
+    if batch is None or batch.flushed or batch.savepoint_ids != connection.savepoint_ids:
+        return None
+    if not any(entry[1] is batch.flush for entry in connection.run_on_commit):
+        return None
+    return batch
+
+
+def _open_batch(local, connection, on_flush):
+    batch = local.batch = _Batch()
+    batch.savepoint_ids = list(connection.savepoint_ids)
+
+    def flush():
+        batch.flushed = True
+        on_flush(batch)
+
+    batch.flush = flush
+    return batch
+
+
+class DeferredWrites:
+    """Apply in-memory index updates after commit behind one version bump.
+
+    Every write inside the same transaction joins the pending batch, so a
+    bulk change of N rows costs one bump instead of N. Outside a transaction
+    the batch is flushed straight away.
+    """
+
+    def __init__(self, key, mark_written):
+        self.key = key
+        self.mark_written = mark_written
+        self._local = threading.local()
+
+    def add(self, apply):
+        connection = transaction.get_connection()
+        batch = _current_batch(self._local, connection)
+        if batch is not None:
+            batch.append(apply)
+            return
+
+        version = None
+
+        def on_flush(pending):
+            for apply in pending:
+                apply()
+            self.mark_written(version)
+
+        batch = _open_batch(self._local, connection, on_flush)
+        batch.append(apply)
+        version = bump_version(self.key)
+        transaction.on_commit(batch.flush)
+
+
+# Journal entries kept per key; a worker further behind reloads in full.
+JOURNAL_LENGTH = 1000
+
+
+def log_change(key, changes):
+    """Bump ``key`` and journal ``changes`` under the new version, in one short transaction."""
+    with transaction.atomic():
+        version = bump_version(key)
+        DataChange.objects.create(key=key, version=version, changes=changes)
+    if version % 100 == 0:
+        DataChange.objects.filter(key=key, version__lte=version - JOURNAL_LENGTH).delete()
+    return version
+
+
+def changes_since(key, known, version):
+    """The changes journaled for ``key`` after ``known`` up to ``version``.
+
+    None if any of them is missing, was pruned, or cannot be followed by id:
+    the reader then has to reload.
+    """
+    entries = dict(DataChange.objects.filter(
+        key=key, version__gt=known, version__lte=version,
+    ).values_list('version', 'changes'))
+    if len(entries) != version - known or None in entries.values():
+        return None
+    return [change for version in sorted(entries) for change in entries[version]]
+
+
+class JournaledWrites:
+    """``DeferredWrites`` that bump after commit and journal what changed.
+
+    A bump inside the transaction holds the counter's row lock until commit,
+    so every write to the same key would queue behind it. Here the bump and
+    a ``DataChange`` entry go in after commit instead; other workers notice
+    the change a moment later and apply it from the journal. ``change`` is
+    any JSON value the reader understands, or None for one it can only
+    follow by reloading.
+    """
+
+    def __init__(self, key, mark_written):
+        self.key = key
+        self.mark_written = mark_written
+        self._local = threading.local()
+
+    def add(self, apply, change):
+        connection = transaction.get_connection()
+        batch = _current_batch(self._local, connection)
+        if batch is None:
+            batch = _open_batch(self._local, connection, self._flush)
+            batch.append((apply, change))
+            transaction.on_commit(batch.flush)
+        else:
+            batch.append((apply, change))
+
+    def _flush(self, pending):
+        for apply, _ in pending:
+            apply()
+        changes = [change for _, change in pending]
+        self.mark_written(log_change(self.key, None if None in changes else changes))
+
+
+class VersionBumps:
+    """Bump each key at most once per transaction."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def bump(self, keys):
+        connection = transaction.get_connection()
+        batch = _current_batch(self._local, connection)
+        if batch is None:
+            batch = _open_batch(self._local, connection, lambda pending: None)
+            transaction.on_commit(batch.flush)
+            # Outside a transaction the batch is already closed; that is fine,
+            # every call then bumps.
+        fresh = set(keys) - set(batch)
+        if fresh:
+            batch.extend(fresh)
+            bump_versions(fresh)
+
+
+# What a VersionedCache needs before its copy can be used.
+LOAD = 'load'
+CHECK = 'check'
+
+
+class VersionedCache:
+    """Per-process copy of shared data kept fresh through a ``DataVersion`` counter.
+
+    The counter is read at most every ``check_interval`` seconds; in between
+    the copy is used as it is. Writes made through this worker are applied
+    on commit by ``DeferredWrites``, which reports its bump to
+    ``mark_written``; any other movement of the counter means another worker
+    wrote. With ``reload_interval`` set the copy is also reloaded that often,
+    which bounds how long writes that send no signal (queryset .update(),
+    raw SQL) can be missed.
+    """
+
+    version_key = None
+    check_interval = 2.0
+    reload_interval = None
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+
+    @property
+    def is_loaded(self):
+        raise NotImplementedError
+
+    def _clear(self):
+        """Drop the loaded copy; called with the lock held."""
+        raise NotImplementedError
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+            self._version = None
+            self._checked_at = 0.0
+
+    def _due(self):
+        """LOAD, CHECK or None; called with the lock held.
+
+        A CHECK counts as done from here on, so concurrent callers keep using
+        the copy while one of them reads the version.
+        """
+        now = time.monotonic()
+        if not self.is_loaded:
+            return LOAD
+        if self.reload_interval is not None and now - self._loaded_at >= self.reload_interval:
+            return LOAD
+        if now - self._checked_at < self.check_interval:
+            return None
+        self._checked_at = now
+        return CHECK
+
+    def _is_current(self, version):
+        with self._lock:
+            return self.is_loaded and version == self._version
+
+    def _mark_loaded(self, version):
+        """Record a full load read at ``version``; called with the lock held."""
+        self._version = version
+        self._checked_at = self._loaded_at = time.monotonic()
+
+    def mark_written(self, new_version):
+        """Record a version bump made by this worker, its write already applied.
+
+        If the counter moved by more than our own bump, someone else wrote in
+        between and the next use has to catch up.
+        """
+        with self._lock:
+            if not self.is_loaded:
+                return
+            if self._version is not None and new_version == self._version + 1:
+                self._version = new_version
+            else:
+                self._missed_writes()
+
+    def _missed_writes(self):
+        """Others wrote since the copy's version; called with the lock held."""
+        self._checked_at = 0.0
+
+
+class VersionedIndex(VersionedCache):
+    """A VersionedCache whose copy is updated without holding the lock.
+
+    One thread reads the database and swaps the result in, so lookups keep
+    using the current copy meanwhile; only the first load makes callers
+    wait. Writes that land during an update go through ``_write`` and are
+    replayed onto its result.
+
+    Subclasses hold the copy in ``_data`` and implement ``_load``;
+    ``_catch_up`` and ``_poll`` let them update it more cheaply.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._build_lock = threading.Lock()
+        self._data = None
+        self._pending = None
+
+    @property
+    def is_loaded(self):
+        return self._data is not None
+
+    def _clear(self):
+        self._set_data(None)
+
+    def _set_data(self, data):
+        """Install a new copy; called with the lock held."""
+        self._data = data
+
+    def _write(self, method, *args):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((method, args))
+            if self._data is not None:
+                getattr(self._data, method)(*args)
+
+    def _load(self):
+        """A new copy read from the database; called without the lock."""
+        raise NotImplementedError
+
+    def _catch_up(self, data, known, version):
+        """An update past the writes others made after ``known`` up to ``version``, or None to load.
+
+        Called without the lock, with the current copy. The update takes the
+        copy and returns the new one, and runs with the lock held; local
+        writes made meanwhile are then passed to ``_replay``.
+        """
+        return None
+
+    def _poll(self, data):
+        """An update, as for ``_catch_up``, for changes the version does not track."""
+        return None
+
+    def _replay(self, data, pending, kept):
+        """Apply the local writes made during an update to its result.
+
+        ``kept`` is true when the update changed the copy in place; those
+        writes are then applied to it twice, which the default assumes is
+        harmless.
+        """
+        for method, args in pending:
+            getattr(data, method)(*args)
+
+    def ensure_fresh(self):
+        with self._lock:
+            due = self._due()
+            loaded = self.is_loaded
+        if due is None:
+            return
+        # One thread updates; the others keep using the current copy, and
+        # only wait when there is none yet.
+        if not self._build_lock.acquire(blocking=not loaded):
+            return
+        try:
+            if loaded or not self.is_loaded:
+                self._update(due)
+        finally:
+            self._build_lock.release()
+
+    def _update(self, due):
+        with self._lock:
+            self._pending = []
+            data, known = self._data, self._version
+        try:
+            # Read the version before the data, so a concurrent write can
+            # only make the copy newer than its version.
+            version = get_version(self.version_key)
+            update = None
+            if due is CHECK:
+                update = self._poll(data) if version == known else self._catch_up(data, known, version)
+                if update is None and version == known:
+                    with self._lock:
+                        self._pending = None
+                    return
+            if update is None:
+                fresh = self._load()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if update is None:
+                result = fresh
+            elif self._data is data:
+                result = update(data)
+            else:
+                # Dropped by invalidate() meanwhile; the next use loads.
+                return
+            self._replay(result, pending, result is data)
+            self._set_data(result)
+            # A bump of our own during the update can leave the version
+            # behind; the next check then catches up once more.
+            if update is None:
+                self._mark_loaded(version)
+            else:
+                self._version = version
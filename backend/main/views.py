@@ -1,15 +1,29 @@
+import csv
+import io
+import json
+
 from django.contrib.auth import get_user_model, authenticate
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .utils.jwt_utils import generate_jwt
+from .utils.jwt_utils import decode_jwt, generate_jwt, generate_refresh_jwt
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from .models import Skill, UserSkill, SwapRequest, SwapRequestOfferedSkill, SwapRequestWantedSkill, CustomUser, Feedback, PlatformMessage
+from .models import UserSkill, SwapRequest, SwapRequestOfferedSkill, SwapRequestWantedSkill, CustomUser, Feedback, PlatformMessage, UserRatingSummary
 from .serializers import UpdateSkillsSerializer, CreateSwapRequestSerializer, UpdateSwapRequestStatusSerializer, FeedbackSerializer, BanUserSerializer, PlatformMessageSerializer, SwapRequestMonitorSerializer
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
+from django.urls import reverse
+from django.db.models import F, Prefetch
 from .utils.admin_perm import IsAdminUser
+from .utils.skills import clean_skill_names, resolve_skill_ids
+from .utils.profile_cache import get_profile_payload
+from .pagination import SwapMonitorPagination
+from .signals import send_post_save_for_bulk
+from .utils.events import publish_swap_events
+from django.db import models
 
 User = get_user_model()
 
@@ -38,21 +52,23 @@ class RegisterView(APIView):
         else:
             is_public = True
 
-        user = User.objects.create_user(
-            full_name=full_name,
-            email=email,
-            password=password,
-            location=location,
-            availability=availability,
-            is_public=is_public
-        )
+        # One transaction, so the on-commit work both writes trigger (the
+        # directory card refresh among it) runs once.
+        with transaction.atomic():
+            user = User.objects.create_user(
+                full_name=full_name,
+                email=email,
+                password=password,
+                location=location,
+                availability=availability,
+                is_public=is_public
+            )
 
-        # Ensure rating summary exists
-        from .models import UserRatingSummary
-        UserRatingSummary.objects.get_or_create(user=user)
+            # Ensure rating summary exists
+            UserRatingSummary.objects.get_or_create(user=user)
 
         token = generate_jwt(user)
-        return Response({'token': token}, status=status.HTTP_201_CREATED)
+        return Response({'token': token, 'refresh': generate_refresh_jwt(user)}, status=status.HTTP_201_CREATED)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -79,7 +95,32 @@ class LoginView(APIView):
             return Response({'detail': 'User account is banned.'}, status=status.HTTP_403_FORBIDDEN)
 
         token = generate_jwt(user)
-        return Response({'token': token}, status=status.HTTP_200_OK)
+        return Response({'token': token, 'refresh': generate_refresh_jwt(user)}, status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TokenRefreshView(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request):
+        payload = decode_jwt(request.data.get('refresh') or '')
+        if not payload or payload.get('type') != 'refresh':
+            return Response({'detail': 'Invalid or expired refresh token.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        # Refreshes are rare, so check the account itself rather than the
+        # auth state access tokens rely on.
+        user = User.objects.filter(id=payload['user_id']).only('id', 'email', 'is_active', 'is_banned').first()
+        if user is None:
+            return Response({'detail': 'User not found.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if not user.is_active:
+            return Response({'detail': 'User account is inactive.'}, status=status.HTTP_403_FORBIDDEN)
+
+        if user.is_banned:
+            return Response({'detail': 'User account is banned.'}, status=status.HTTP_403_FORBIDDEN)
+
+        return Response({'token': generate_jwt(user)}, status=status.HTTP_200_OK)
 
 
 class UpdateSkillsView(APIView):
@@ -93,22 +134,38 @@ class UpdateSkillsView(APIView):
         user = request.user
         data = serializer.validated_data
 
-        def handle_skills(skill_names, action, skill_type):
-            # Skip empty strings and whitespace-only values
-            cleaned_skill_names = [name.strip() for name in skill_names if name.strip()]
+        skill_types = ("offered", "wanted")
+        to_add = {t: clean_skill_names(data.get(f"add_{t}", [])) for t in skill_types}
+        to_remove = {t: set(clean_skill_names(data.get(f"remove_{t}", []))) for t in skill_types}
 
-            for name in cleaned_skill_names:
-                skill, _ = Skill.objects.get_or_create(name=name)
-
-                if action == "add":
-                    UserSkill.objects.get_or_create(user=user, skill=skill, type=skill_type)
-                elif action == "remove":
-                    UserSkill.objects.filter(user=user, skill=skill, type=skill_type).delete()
+        with transaction.atomic():
+            skill_ids = resolve_skill_ids(
+                set().union(*to_remove.values()),
+                create=[name for names in to_add.values() for name in names],
+            )
 
-        handle_skills(data.get("add_offered", []), "add", "offered")
-        handle_skills(data.get("remove_offered", []), "remove", "offered")
-        handle_skills(data.get("add_wanted", []), "add", "wanted")
-        handle_skills(data.get("remove_wanted", []), "remove", "wanted")
+            # Removals win over adds of the same skill, however it is spelled.
+            removed_rows = {(skill_ids[name], t) for t in skill_types for name in to_remove[t] if name in skill_ids}
+            wanted_rows = {(skill_ids[name], t) for t in skill_types for name in to_add[t]} - removed_rows
+            # Hold the user's row so a concurrent update cannot insert rows
+            # between this read and the insert; every new row is then ours
+            # and gets exactly one post_save.
+            CustomUser.objects.select_for_update().filter(pk=user.pk).exists()
+            existing_rows = set(UserSkill.objects.filter(user=user).values_list("skill_id", "type"))
+            new_rows = [
+                UserSkill(user=user, skill_id=skill_id, type=t) for skill_id, t in wanted_rows - existing_rows
+            ]
+            if new_rows:
+                UserSkill.objects.bulk_create(new_rows)
+                send_post_save_for_bulk(UserSkill, new_rows)
+
+            remove_filter = models.Q()
+            for t in skill_types:
+                remove_ids = [skill_id for skill_id, row_type in removed_rows if row_type == t]
+                if remove_ids:
+                    remove_filter |= models.Q(skill_id__in=remove_ids, type=t)
+            if remove_filter:
+                UserSkill.objects.filter(remove_filter, user=user).delete()
 
         return Response({"detail": "Skills updated successfully."}, status=status.HTTP_200_OK)
 
@@ -121,30 +178,40 @@ class CreateSwapRequestView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        receiver_id = serializer.validated_data['receiver_id']
-        offered_skills = serializer.validated_data['offered_skills']
-        wanted_skills = serializer.validated_data['wanted_skills']
-        message = serializer.validated_data.get('message', '')
-
-        try:
-            receiver = CustomUser.objects.get(id=receiver_id)
-        except CustomUser.DoesNotExist:
-            return Response({"detail": "Receiver not found."}, status=404)
-
-        swap = SwapRequest.objects.create(
-            requester=request.user,
-            receiver=receiver,
-            message=message
-        )
-
-        for skill_name in offered_skills:
-            skill, _ = Skill.objects.get_or_create(name=skill_name.strip())
-            SwapRequestOfferedSkill.objects.create(swap_request=swap, skill=skill)
+        data = serializer.validated_data
+        receiver_ids = list(dict.fromkeys(data.get('receiver_ids') or [data['receiver_id']]))
+        offered_skills = clean_skill_names(data['offered_skills'])
+        wanted_skills = clean_skill_names(data['wanted_skills'])
+        message = data.get('message', '')
 
-        for skill_name in wanted_skills:
-            skill, _ = Skill.objects.get_or_create(name=skill_name.strip())
-            SwapRequestWantedSkill.objects.create(swap_request=swap, skill=skill)
+        receivers = CustomUser.objects.in_bulk(receiver_ids)
+        missing = [receiver_id for receiver_id in receiver_ids if receiver_id not in receivers]
+        if missing:
+            detail = "Receiver not found." if 'receiver_id' in data else f"Receivers not found: {missing}."
+            return Response({"detail": detail}, status=404)
 
+        with transaction.atomic():
+            skill_ids = resolve_skill_ids((), create=offered_skills + wanted_skills)
+
+            swaps = SwapRequest.objects.bulk_create([
+                SwapRequest(requester=request.user, receiver=receivers[receiver_id], message=message)
+                for receiver_id in receiver_ids
+            ])
+            SwapRequestOfferedSkill.objects.bulk_create([
+                SwapRequestOfferedSkill(swap_request=swap, skill_id=skill_ids[name])
+                for swap in swaps for name in offered_skills
+            ])
+            SwapRequestWantedSkill.objects.bulk_create([
+                SwapRequestWantedSkill(swap_request=swap, skill_id=skill_ids[name])
+                for swap in swaps for name in wanted_skills
+            ])
+            publish_swap_events('swap.created', swaps)
+
+        if len(swaps) > 1:
+            return Response({
+                "detail": f"{len(swaps)} swap requests created successfully.",
+                "swap_request_ids": [swap.id for swap in swaps],
+            }, status=status.HTTP_201_CREATED)
         return Response({"detail": "Swap request created successfully."}, status=status.HTTP_201_CREATED)
 
 
@@ -169,6 +236,7 @@ class UpdateSwapRequestStatusView(APIView):
 
         swap.status = new_status
         swap.save()
+        publish_swap_events(f'swap.{new_status}', [swap])
 
         return Response({"detail": f"Swap request status updated to {new_status}."}, status=200)
 
@@ -207,14 +275,15 @@ class SubmitFeedbackView(APIView):
                 comment=serializer.validated_data['comment']
             )
 
-            # Update rating summary
-            summary = reviewee.rating_summary
-            total_reviews = summary.total_reviews + 1
-            new_average = ((summary.average_rating * summary.total_reviews) + rating_value) / total_reviews
-
-            summary.total_reviews = total_reviews
-            summary.average_rating = round(new_average, 2)
-            summary.save(update_fields=["total_reviews", "average_rating"])
+            # Update rating summary in the database so concurrent reviews
+            # for the same user cannot overwrite each other.
+            totals = {
+                "rating_sum": F("rating_sum") + rating_value,
+                "total_reviews": F("total_reviews") + 1,
+            }
+            if not UserRatingSummary.objects.filter(user=reviewee).update(**totals):
+                UserRatingSummary.objects.get_or_create(user=reviewee)
+                UserRatingSummary.objects.filter(user=reviewee).update(**totals)
 
         return Response({"detail": "Feedback submitted successfully."}, status=201)
     
@@ -249,25 +318,109 @@ class BanUserView(APIView):
         return Response({'detail': f'User {action}.'}, status=200)
 
 
+import codecs
+from django.conf import settings
+from .utils.user_import import ImportFormatError, UserImport, csv_rows, ndjson_rows
+
+class ImportUsersView(APIView):
+    """Create accounts in bulk from a CSV or NDJSON request body.
+
+    The body is read line by line as it arrives and imported in batches;
+    the response reports how many accounts were created and why each
+    rejected row failed.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    READERS = {'text/csv': csv_rows, 'application/x-ndjson': ndjson_rows}
+
+    def post(self, request):
+        reader = self.READERS.get(request.content_type.split(';')[0].strip().lower())
+        if reader is None:
+            return Response({"detail": "Content-Type must be 'text/csv' or 'application/x-ndjson'."},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        if request.stream is None:
+            return Response({"detail": "Upload is empty."}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = UserImport(hash_workers=settings.USER_IMPORT_HASH_WORKERS)
+        try:
+            report = importer.run(reader(codecs.iterdecode(request.stream, 'utf-8-sig')))
+        except ImportFormatError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            # Batches before the bad line are already imported.
+            return Response({"detail": "Upload must be UTF-8 encoded.", **importer.report()},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+
 class MonitorSwapRequestsView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    EXPORT_CHUNK_SIZE = 2000
+    CSV_COLUMNS = ['id', 'requester_email', 'receiver_email', 'offered_skills', 'wanted_skills', 'message', 'status', 'created_at']
+
     def get(self, request):
         status_filter = request.query_params.get('status')
-        qs = SwapRequest.objects.all()
+        qs = SwapRequest.objects.select_related('requester', 'receiver').prefetch_related(
+            Prefetch('offered_skills', queryset=SwapRequestOfferedSkill.objects.select_related('skill')),
+            Prefetch('wanted_skills', queryset=SwapRequestWantedSkill.objects.select_related('skill')),
+        )
         if status_filter in dict(SwapRequest.STATUS_CHOICES):
             qs = qs.filter(status=status_filter)
-        serializer = SwapRequestMonitorSerializer(qs.order_by('-created_at'), many=True)
-        return Response(serializer.data, status=200)
+
+        export = request.query_params.get('export')
+        if export == 'ndjson':
+            response = StreamingHttpResponse(self.ndjson_rows(qs), content_type='application/x-ndjson')
+        elif export == 'csv':
+            response = StreamingHttpResponse(self.csv_rows(qs), content_type='text/csv')
+        elif export:
+            return Response({"detail": "export must be 'ndjson' or 'csv'."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            paginator = SwapMonitorPagination()
+            page = paginator.paginate_queryset(qs, request, view=self)
+            serializer = SwapRequestMonitorSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        response['Content-Disposition'] = f'attachment; filename="swap-requests.{export}"'
+        return response
+
+    def export_rows(self, qs):
+        # iterator() fetches and prefetches one chunk at a time, so memory
+        # stays flat however many swaps there are.
+        serializer = SwapRequestMonitorSerializer()
+        for swap in qs.order_by('-created_at', '-id').iterator(chunk_size=self.EXPORT_CHUNK_SIZE):
+            yield serializer.to_representation(swap)
+
+    def ndjson_rows(self, qs):
+        for row in self.export_rows(qs):
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+    def csv_rows(self, qs):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return value
+
+        writer.writerow(self.CSV_COLUMNS)
+        yield flush()
+        for row in self.export_rows(qs):
+            row['offered_skills'] = '; '.join(row['offered_skills'])
+            row['wanted_skills'] = '; '.join(row['wanted_skills'])
+            writer.writerow([row[column] for column in self.CSV_COLUMNS])
+            yield flush()
 
 
 class PlatformMessageView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        msgs = PlatformMessage.objects.order_by('-created_at')
-        serializer = PlatformMessageSerializer(msgs, many=True)
-        return Response(serializer.data, status=200)
+        data, etag, last_modified = platform_messages_page(request, self)
+        response = HttpResponseNotModified() if data is None else Response(data, status=200)
+        return platform_messages_response(response, etag, last_modified)
 
     def post(self, request):
         serializer = PlatformMessageSerializer(data=request.data)
@@ -278,62 +431,549 @@ class PlatformMessageView(APIView):
     
 
 from .serializers import UserProfileSerializer
+from .pagination import FeedbackPagination
+
+def profile_target(data, viewer):
+    """Return ``(target_id, is_self, error)`` for a user-profile request body."""
+    if data.get("is_self", False):
+        return viewer.id, True, None
+    user_id = data.get("user_id")
+    if not user_id:
+        return None, False, ({"detail": "user_id is required if is_self is false."}, 400)
+    try:
+        return int(user_id), False, None
+    except (TypeError, ValueError):
+        return None, False, ({"detail": "User not found."}, 404)
+
+
+def profile_user_queryset():
+    return CustomUser.objects.select_related('rating_summary')
+
+
+def profile_payload(target_user, context):
+    serializer = UserProfileSerializer(target_user, context=context)
+    return {"is_banned": target_user.is_banned, "data": serializer.data}
+
+
+def build_profile(request, target_id):
+    try:
+        target_user = profile_user_queryset().get(id=target_id)
+    except CustomUser.DoesNotExist:
+        return None
+    feedback_url = request.build_absolute_uri(reverse('user-feedback', args=[target_id]))
+    return profile_payload(target_user, {"feedback_url": feedback_url})
+
+
+async def abuild_profile(request, target_id):
+    """``build_profile`` reading through the async ORM."""
+    try:
+        target_user = await profile_user_queryset().aget(id=target_id)
+    except CustomUser.DoesNotExist:
+        return None
+    feedback_url = request.build_absolute_uri(reverse('user-feedback', args=[target_id]))
+    skills = {}
+    for kind in ("offered", "wanted"):
+        names = UserSkill.objects.filter(user=target_user, type=kind).values_list("skill__name", flat=True)
+        skills[kind] = [name async for name in names]
+    feedback_paginator = FeedbackPagination()
+    await feedback_paginator.afirst_page(
+        Feedback.objects.filter(reviewee=target_user).select_related('reviewer'), feedback_url,
+    )
+    return profile_payload(target_user, {
+        "feedback_url": feedback_url, "skills": skills, "feedback_paginator": feedback_paginator,
+    })
+
+
+def profile_result(payload, target_id, is_self_flag, viewer):
+    """Return ``(data, status)`` for a cached profile payload."""
+    if payload is None:
+        return {"detail": "User not found."}, 404
+    if not is_self_flag and payload["is_banned"]:
+        return {"detail": "This user is banned."}, 403
+    # is_self depends on the viewer, so it stays out of the shared entry.
+    return {**payload["data"], "is_self": target_id == viewer.id}, 200
+
 
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        user_id = request.data.get("user_id")
-        is_self_flag = request.data.get("is_self", False)
+        target_id, is_self_flag, error = profile_target(request.data, request.user)
+        if error:
+            return Response(*error)
+        payload = get_profile_payload(target_id, lambda: build_profile(request, target_id))
+        return Response(*profile_result(payload, target_id, is_self_flag, request.user))
+    
 
-        if is_self_flag:
-            target_user = request.user
+from .serializers import UserListSerializer
+from .pagination import DirectoryCardPagination, UserDirectoryPagination
+from rest_framework.renderers import BrowsableAPIRenderer
+from .renderers import ORJSONRenderer
+from .models import DirectoryCard
+from .utils.directory_cards import card_rows, directory_cards_enabled
+from .utils.fast_rows import SWAP_VALUES, USER_LIST_VALUES, fast_list_responses, swap_rows, user_list_rows, user_skill_rows
+from rest_framework.exceptions import NotFound, ParseError
+from .utils.geo_index import MAX_NEAR_KM, geo_index
+from .utils.skill_index import skill_index
+from bisect import bisect_left, bisect_right
+from asgiref.sync import sync_to_async
+
+def directory_queryset():
+    return CustomUser.objects.filter(is_active=True, is_banned=False, is_public=True)
+
+
+def near_me(request):
+    """``{user_id: km}`` within ``?near_km=`` of the requester, or None if not asked.
+
+    Served from the geo index: only users in grid cells the circle touches
+    are measured.
+    """
+    raw = request.query_params.get('near_km')
+    if raw is None:
+        return None
+    try:
+        radius = float(raw)
+    except ValueError:
+        raise ParseError("near_km must be a number.")
+    if not 0 < radius <= MAX_NEAR_KM:
+        raise ParseError(f"near_km must be greater than 0 and at most {MAX_NEAR_KM}.")
+    point = geo_index.point(request.user.id)
+    if point is None:
+        raise ParseError("Your location is not a place we can find, so there is nothing to be near.")
+    return geo_index.near(point, radius)
+
+
+# Most ids the listability probe in near_page_ids binds at once.
+NEAR_ID_BATCH = 1000
+
+
+def near_page_ids(paginator, request, near, listed_ids):
+    """The listed ids in ``near`` that the page at the request's cursor can hold.
+
+    Ids are walked from the cursor in memory, dropping users the skill index
+    holds as hidden; ``listed_ids(ids)`` then confirms them against the table
+    the page is read from, in growing batches, until there are enough for a
+    page and the row that tells whether a next page exists. So every query
+    binds a bounded number of ids however many users are near, and ids the
+    index does not yet know to be unlisted cannot cut the directory short.
+    """
+    skill_index.ensure_fresh()
+    ids = sorted(user_id for user_id in near if not skill_index.is_hidden(user_id))
+    cursor = paginator.decode_cursor(request)
+    need = paginator.get_page_size(request) + 1 + (cursor.offset if cursor else 0)
+    if cursor is not None and cursor.position is not None:
+        try:
+            position = int(cursor.position)
+        except ValueError:
+            raise NotFound(paginator.invalid_cursor_message)
+        if cursor.reverse:
+            ids = ids[:bisect_left(ids, position)][::-1]
         else:
-            if not user_id:
-                return Response({"detail": "user_id is required if is_self is false."}, status=400)
+            ids = ids[bisect_right(ids, position):]
+
+    found, start, batch = [], 0, need
+    while len(found) < need and start < len(ids):
+        chunk = ids[start:start + batch]
+        start += len(chunk)
+        listed = set(listed_ids(chunk))
+        found.extend(user_id for user_id in chunk if user_id in listed)
+        batch = min(batch * 2, NEAR_ID_BATCH)
+    return found[:need]
+
+
+def add_distances(rows, near):
+    for row in rows:
+        row['distance_km'] = round(near[row['id']], 1)
+    return rows
+
+
+def directory_paginator():
+    return DirectoryCardPagination() if directory_cards_enabled() else UserDirectoryPagination()
+
+
+def directory_page_queryset(paginator, request, near):
+    """What a directory page is read from: cards, USER_LIST_VALUES rows on the fast path, or users."""
+    if directory_cards_enabled():
+        cards = DirectoryCard.objects.filter(is_listed=True).values('user_id', 'payload')
+        if near is not None:
+            cards = cards.filter(user_id__in=near_page_ids(
+                paginator, request, near,
+                lambda ids: DirectoryCard.objects.filter(is_listed=True, user_id__in=ids).values_list('user_id', flat=True),
+            ))
+        return cards
+    users = directory_queryset()
+    if near is not None:
+        users = users.filter(id__in=near_page_ids(
+            paginator, request, near, lambda ids: directory_queryset().filter(id__in=ids).values_list('id', flat=True),
+        ))
+    if fast_list_responses():
+        return users.values(*USER_LIST_VALUES)
+    return users.select_related('rating_summary').prefetch_related(
+        Prefetch('userskill_set', queryset=UserSkill.objects.select_related('skill').order_by('id'))
+    )
+
+
+def directory_rows(page, near, skill_rows=None):
+    """Response rows of a page read from directory_page_queryset()."""
+    if directory_cards_enabled():
+        rows = card_rows(page)
+    elif fast_list_responses():
+        rows = user_list_rows(page, skill_rows)
+    else:
+        rows = UserListSerializer(page, many=True).data
+    return rows if near is None else add_distances(rows, near)
+
+
+def directory_page(paginator, request, view):
+    """Serialized page of the user directory, only users near the requester with ``?near_km=``."""
+    near = near_me(request)
+    page = paginator.paginate_queryset(directory_page_queryset(paginator, request, near), request, view=view)
+    return directory_rows(page, near)
+
+
+async def adirectory_page(paginator, request, view):
+    """``directory_page`` reading the page through the async ORM.
+
+    The geo and skill indexes refresh through the sync ORM, so with
+    ``?near_km=`` the ids near the requester are worked out in a thread.
+    """
+    near = await sync_to_async(near_me)(request) if 'near_km' in request.query_params else None
+    if near is None:
+        queryset = directory_page_queryset(paginator, request, None)
+    else:
+        queryset = await sync_to_async(directory_page_queryset)(paginator, request, near)
+    page = await paginator.apaginate_queryset(queryset, request, view=view)
+    skill_rows = None
+    if not directory_cards_enabled() and fast_list_responses():
+        skill_rows = [row async for row in user_skill_rows(page)]
+    return directory_rows(page, near, skill_rows)
+
+
+class FastListRenderingMixin:
+    """Render with ORJSONRenderer when the FAST_LIST_RESPONSES path is on."""
+
+    def get_renderers(self):
+        if fast_list_responses():
+            return [ORJSONRenderer(), BrowsableAPIRenderer()]
+        return super().get_renderers()
+
+
+class AllUsersListView(FastListRenderingMixin, APIView):
+    permission_classes = [IsAuthenticated]
 
-            try:
-                target_user = CustomUser.objects.get(id=user_id)
-            except CustomUser.DoesNotExist:
-                return Response({"detail": "User not found."}, status=404)
+    def get(self, request):
+        paginator = directory_paginator()
+        return paginator.get_paginated_response(directory_page(paginator, request, self))
+    
+from .serializers import SwapRequestSerializer
+from .pagination import SwapSyncPagination
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
 
-            if target_user.is_banned:
-                return Response({"detail": "This user is banned."}, status=403)
+def user_swap_requests_queryset(user):
+    return SwapRequest.objects.filter(models.Q(requester=user) | models.Q(receiver=user))
 
-        serializer = UserProfileSerializer(target_user, context={"request_user": request.user})
-        return Response(serializer.data, status=200)
-    
 
-from .serializers import UserListSerializer
+def swap_sync_page(swaps, position):
+    page = SwapSyncPagination().paginate_queryset(swaps, position)
+    if fast_list_responses():
+        return page.values(*SWAP_VALUES)
+    return page.select_related('requester', 'receiver').prefetch_related(
+        Prefetch('offered_skills', queryset=SwapRequestOfferedSkill.objects.select_related('skill').order_by('id')),
+        Prefetch('wanted_skills', queryset=SwapRequestWantedSkill.objects.select_related('skill').order_by('id')),
+    )
+
+
+def serialize_swap_page(rows):
+    if fast_list_responses():
+        return swap_rows(rows)
+    return SwapRequestSerializer(rows, many=True).data
+
+
+SWAP_SYNC_STATS = {'last_updated': Max('updated_at'), 'count': Count('id')}
+
+def swap_sync_etag(user, since, stats):
+    # Every write to a swap moves updated_at and deletions change the count,
+    # so these identify the user's swap set without reading the rows.
+    # Participant names are read at fetch time and are not tracked.
+    key = f"{user.id}:{since}:{stats['last_updated']}:{stats['count']}"
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
 
-class AllUsersListView(APIView):
+
+def swap_sync_response(response, etag):
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class UserSwapRequestsView(FastListRenderingMixin, APIView):
+    """The user's swaps in ``(updated_at, id)`` order, for delta sync.
+
+    Responses carry a ``cursor``; passing it back as ``?since=`` returns only
+    swaps created or updated after it. Follow ``has_more`` to drain a backlog.
+    Conditional requests with ``If-None-Match`` get a 304 when nothing changed.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        users = CustomUser.objects.filter(is_active=True, is_banned=False, is_public=True).select_related('rating_summary').prefetch_related('userskill_set__skill')
-        serializer = UserListSerializer(users, many=True)
-        return Response(serializer.data)
+        pagination = SwapSyncPagination()
+        since = request.query_params.get('since')
+        try:
+            position = pagination.decode_cursor(since)
+        except ValueError:
+            return Response({"detail": "Invalid since cursor."}, status=400)
+
+        swaps = user_swap_requests_queryset(request.user)
+        etag = swap_sync_etag(request.user, since, swaps.aggregate(**SWAP_SYNC_STATS))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return swap_sync_response(not_modified, etag)
+
+        rows = list(swap_sync_page(swaps, position))
+        data = serialize_swap_page(rows[:pagination.page_size])
+        return swap_sync_response(Response(pagination.get_payload(rows, data, since)), etag)
     
-from .serializers import SwapRequestSerializer
-from django.db import models
 
-class UserSwapRequestsView(APIView):
+def admin_messages_queryset():
+    return PlatformMessage.objects.all()
+
+
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date
+from .pagination import PlatformMessagePagination
+from .utils.message_cache import platform_messages
+
+def platform_messages_page(request, view):
+    """Return ``(data, etag, last_modified)``; data is None when the client's copy is current."""
+    etag, last_modified = platform_messages.validators()
+    if get_conditional_response(request, etag=etag, last_modified=last_modified) is not None:
+        return None, etag, last_modified
+
+    def build():
+        paginator = PlatformMessagePagination()
+        page = paginator.paginate_queryset(admin_messages_queryset(), request, view=view)
+        return paginator.get_paginated_response(PlatformMessageSerializer(page, many=True).data).data
+
+    return platform_messages.page(request.build_absolute_uri(), build), etag, last_modified
+
+
+async def aplatform_messages_page(request, view):
+    """``platform_messages_page`` reading through the async ORM."""
+    etag, last_modified = await platform_messages.avalidators()
+    if get_conditional_response(request, etag=etag, last_modified=last_modified) is not None:
+        return None, etag, last_modified
+
+    async def build():
+        paginator = PlatformMessagePagination()
+        page = await paginator.apaginate_queryset(admin_messages_queryset(), request, view=view)
+        return paginator.get_paginated_response(PlatformMessageSerializer(page, many=True).data).data
+
+    return await platform_messages.apage(request.build_absolute_uri(), build), etag, last_modified
+
+
+def platform_messages_response(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class AdminMessagesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        swap_requests = SwapRequest.objects.filter(
-            models.Q(requester=user) | models.Q(receiver=user)
-        ).prefetch_related('offered_skills__skill', 'wanted_skills__skill', 'requester', 'receiver')
+        data, etag, last_modified = platform_messages_page(request, self)
+        response = HttpResponseNotModified() if data is None else Response(data, status=200)
+        return platform_messages_response(response, etag, last_modified)
 
-        serializer = SwapRequestSerializer(swap_requests, many=True)
-        return Response(serializer.data)
-    
 
-class AdminMessagesView(APIView):
+from .utils.matching import find_matches, DEFAULT_MATCH_LIMIT, MAX_MATCH_LIMIT
+
+class MatchesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        messages = PlatformMessage.objects.all().order_by('-created_at')
-        serializer = PlatformMessageSerializer(messages, many=True)
-        return Response(serializer.data, status=200)
\ No newline at end of file
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_MATCH_LIMIT))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_MATCH_LIMIT))
+
+        return Response(find_matches(request.user, limit=limit, near=near_me(request)), status=200)
+
+
+from .utils.skill_autocomplete import skill_autocomplete, DEFAULT_AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT
+
+class SkillAutocompleteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_AUTOCOMPLETE_LIMIT))
+
+        return Response(skill_autocomplete.search(query, limit=limit), status=200)
+
+
+from .serializers import FeedbackDisplaySerializer
+from .pagination import FeedbackPagination
+
+class UserFeedbackView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, user_id):
+        try:
+            target_user = CustomUser.objects.only('id', 'is_banned').get(id=user_id)
+        except CustomUser.DoesNotExist:
+            return Response({"detail": "User not found."}, status=404)
+
+        if target_user.is_banned and target_user.id != request.user.id:
+            return Response({"detail": "This user is banned."}, status=403)
+
+        feedbacks = Feedback.objects.filter(reviewee_id=user_id).select_related('reviewer')
+        paginator = FeedbackPagination()
+        page = paginator.paginate_queryset(feedbacks, request, view=self)
+        serializer = FeedbackDisplaySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+from django.http import HttpResponse
+from .utils.metrics import registry as metrics_registry
+
+class MetricsView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(metrics_registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .authentication import SimpleJWTAuthentication
+from .renderers import TimedJSONRenderer
+from .utils.profile_cache import aget_profile_payload
+
+class AsyncAPIView(View):
+    """Async read endpoint that speaks the same protocol as the DRF views.
+
+    DRF's APIView is synchronous, so under ASGI each request to it holds a
+    thread for its whole duration. These views authenticate with the same
+    JWT scheme, parse and render with DRF's classes and await the database
+    through the async ORM. Every subclass requires an authenticated user.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            auth = await SimpleJWTAuthentication().aauthenticate(request)
+        except AuthenticationFailed as exc:
+            return self.respond({'detail': exc.detail}, status=403)
+        except APIException as exc:  # UserNotFound
+            return self.respond({'detail': exc.detail}, status=exc.status_code)
+        if auth is None:
+            return self.respond({'detail': NotAuthenticated.default_detail}, status=403)
+
+        request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+        request.user = auth[0]
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:  # e.g. an invalid pagination cursor
+            return self.respond({'detail': exc.detail}, status=exc.status_code)
+
+    def respond(self, data, status=200):
+        renderer = ORJSONRenderer() if fast_list_responses() else TimedJSONRenderer()
+        return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+
+class AsyncAllUsersListView(AsyncAPIView):
+    async def get(self, request):
+        paginator = directory_paginator()
+        data = await adirectory_page(paginator, request, self)
+        return self.respond(paginator.get_paginated_response(data).data)
+
+
+class AsyncUserProfileView(AsyncAPIView):
+    async def post(self, request):
+        target_id, is_self_flag, error = profile_target(request.data, request.user)
+        if error:
+            return self.respond(*error)
+        payload = await aget_profile_payload(target_id, lambda: abuild_profile(request, target_id))
+        return self.respond(*profile_result(payload, target_id, is_self_flag, request.user))
+
+
+class AsyncUserSwapRequestsView(AsyncAPIView):
+    async def get(self, request):
+        pagination = SwapSyncPagination()
+        since = request.query_params.get('since')
+        try:
+            position = pagination.decode_cursor(since)
+        except ValueError:
+            return self.respond({"detail": "Invalid since cursor."}, status=400)
+
+        swaps = user_swap_requests_queryset(request.user)
+        etag = swap_sync_etag(request.user, since, await swaps.aaggregate(**SWAP_SYNC_STATS))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return swap_sync_response(not_modified, etag)
+
+        rows = [swap async for swap in swap_sync_page(swaps, position)]
+        # The fast path looks the skills up per page.
+        data = await sync_to_async(serialize_swap_page)(rows[:pagination.page_size])
+        return swap_sync_response(self.respond(pagination.get_payload(rows, data, since)), etag)
+
+
+class AsyncAdminMessagesView(AsyncAPIView):
+    async def get(self, request):
+        data, etag, last_modified = await aplatform_messages_page(request, self)
+        response = HttpResponseNotModified() if data is None else self.respond(data)
+        return platform_messages_response(response, etag, last_modified)
+
+
+import asyncio
+from .utils.events import get_swap_event_broker
+
+class SwapEventsView(AsyncAPIView):
+    """Server-Sent Events stream of the viewer's swap request changes.
+
+    Sends ``swap.created``, ``swap.accepted``, ``swap.rejected`` and
+    ``swap.cancelled`` events for swaps the viewer takes part in. A
+    ``resync`` event means events were dropped and the client should
+    refetch its swap requests. Long-lived, so serve it over ASGI.
+    """
+
+    HEARTBEAT_INTERVAL = 15.0
+
+    async def get(self, request):
+        broker = get_swap_event_broker()
+        subscription = broker.subscribe(request.user.id)
+
+        async def stream():
+            try:
+                yield 'retry: 5000\n\n'
+                while True:
+                    try:
+                        event = await asyncio.wait_for(subscription.get(), self.HEARTBEAT_INTERVAL)
+                    except asyncio.TimeoutError:
+                        yield ': keepalive\n\n'
+                        continue
+                    if subscription.overflowed:
+                        subscription.overflowed = False
+                        yield 'event: resync\ndata: {}\n\n'
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                broker.unsubscribe(subscription)
+
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response